@@ -0,0 +1,138 @@
+"""
+This script measures how long it takes to import each of the scripts in this directory that can be
+run from the command line, which is most of the time it takes a script to start (e.g., to print its
+--help message), and reports which of the slow-to-import libraries each script loads.
+
+Each import is done in a new Python process, so that modules imported for one script don't make
+importing the next script faster. If the Python interpreter supports `-X importtime` (Python 3.7 and
+later), the reported time is the total of the import times that it prints (not counting the modules
+that the interpreter imports when it starts); otherwise, the time is measured around the import
+statement. Each script is imported several times, and the fastest time
+is reported.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Libraries that are slow to import, and the plotting back ends in this directory, which should only
+# be imported by the code paths that use them.
+HEAVY_MODULES = ["numpy", "matplotlib", "plot_gnuplot", "plot_matplotlib"]
+# Code run in a new process to time an import when -X importtime isn't supported. Prints the time
+# (in microseconds) on the first line, followed by the names of the imported modules.
+TIMED_IMPORT_TEMPLATE = """
+import sys, time
+start = time.time()
+import {module}
+elapsed = time.time() - start
+sys.stdout.write("%d\\n" % (elapsed * 1000000))
+sys.stdout.write("\\n".join(sys.modules.keys()))
+"""
+IMPORTTIME_LINE_REGEX = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def get_entry_points(directory):
+  """ Returns the names of the modules in directory that can be run as scripts. """
+  entry_points = []
+  for filename in sorted(os.listdir(directory)):
+    if not filename.endswith(".py") or filename == os.path.basename(__file__):
+      continue
+    with open(os.path.join(directory, filename), "r") as script:
+      if re.search(r"^if __name__ == .__main__.:", script.read(), re.MULTILINE):
+        entry_points.append(filename[:-len(".py")])
+  return entry_points
+
+
+def get_startup_modules(python):
+  """ Returns the names of the modules that the given Python interpreter imports when it starts, or
+  None if the interpreter doesn't support the -X importtime option. """
+  process = subprocess.Popen([python, "-X", "importtime", "-c", "pass"],
+    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  _, stderr = process.communicate()
+  stderr = stderr.decode("utf-8", "replace")
+  if process.returncode != 0 or "import time:" not in stderr:
+    return None
+  return set(match.group(4) for match in
+    [IMPORTTIME_LINE_REGEX.match(line) for line in stderr.split("\n")] if match)
+
+
+def time_import(python, module, directory, startup_modules):
+  """ Imports module in a new process, and returns a (microseconds, imported module names) tuple.
+
+  startup_modules should be the result of get_startup_modules(python). Raises a
+  subprocess.CalledProcessError if the import fails.
+  """
+  use_importtime = startup_modules is not None
+  if use_importtime:
+    command = [python, "-X", "importtime", "-c", "import {}".format(module)]
+  else:
+    command = [python, "-c", TIMED_IMPORT_TEMPLATE.format(module=module)]
+  process = subprocess.Popen(
+    command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  stdout, stderr = process.communicate()
+  stdout = stdout.decode("utf-8", "replace")
+  stderr = stderr.decode("utf-8", "replace")
+  if process.returncode != 0:
+    raise subprocess.CalledProcessError(process.returncode, " ".join(command), stderr)
+
+  if not use_importtime:
+    lines = stdout.strip().split("\n")
+    return (int(lines[0]), set(lines[1:]))
+  # Each line has the time spent importing the module itself, the time including the modules it
+  # imported, and the module's name (indented by how deeply it's nested); the total is the sum of
+  # the cumulative times of the top-level imports that weren't done when the interpreter started.
+  total_micros = 0
+  module_names = set()
+  for line in stderr.split("\n"):
+    match = IMPORTTIME_LINE_REGEX.match(line)
+    if match and match.group(4) not in startup_modules:
+      module_names.add(match.group(4))
+      if len(match.group(3)) <= 1:
+        total_micros += int(match.group(2))
+  return (total_micros, module_names)
+
+
+def get_heavy_modules(module_names):
+  """ Returns the modules in HEAVY_MODULES that are (or whose submodules are) in module_names. """
+  top_level_names = set(name.split(".")[0] for name in module_names)
+  return [module for module in HEAVY_MODULES if module in top_level_names]
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(
+    description="Reports how long it takes to import each script in this directory")
+  parser.add_argument("-p", "--python", default=sys.executable,
+                      help="Python interpreter to import the scripts with")
+  parser.add_argument("-r", "--repetitions", type=int, default=5,
+                      help="Number of times to import each script (the fastest time is reported)")
+  parser.add_argument("module", nargs="*",
+                      help="Modules to import (by default, every script in this directory)")
+  args = parser.parse_args(argv)
+
+  directory = os.path.dirname(os.path.abspath(__file__))
+  modules = args.module or get_entry_points(directory)
+  startup_modules = get_startup_modules(args.python)
+  print "Import times measured with {}".format(
+    "-X importtime" if startup_modules is not None else "a timer around each import statement")
+
+  name_width = max([len(module) for module in modules] + [len("module")])
+  print "{}\t{:>10}\t{}".format("module".ljust(name_width), "time (ms)", "heavy modules loaded")
+  total_micros = 0
+  for module in modules:
+    try:
+      times_and_module_names = [time_import(args.python, module, directory, startup_modules)
+        for _ in range(args.repetitions)]
+    except subprocess.CalledProcessError as e:
+      print "{}\tfailed to import: {}".format(
+        module.ljust(name_width), e.output.strip().split("\n")[-1])
+      continue
+    micros, module_names = min(times_and_module_names)
+    total_micros += micros
+    print "{}\t{:>10.1f}\t{}".format(module.ljust(name_width), micros / 1000.,
+      ", ".join(get_heavy_modules(module_names)) or "-")
+  print "{}\t{:>10.1f}".format("total".ljust(name_width), total_micros / 1000.)
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,154 @@
+"""
+This file contains functions to combine the continuous monitors from all of the executors in a
+cluster, to show the utilization of the cluster as a whole.
+
+The monitors are merged one sample at a time (ordered by the time each sample was recorded), so
+only the most recent sample from each executor is held in memory. Time is split into fixed-length
+intervals, and for each interval that any executor recorded a sample in, the sum, mean, minimum,
+and maximum of each metric across executors are computed using the most recent sample from each
+executor that's still running.
+"""
+
+import heapq
+import itertools
+import warnings
+
+import numpy
+
+import continuous_monitor
+
+DEFAULT_INTERVAL_MILLIS = 1000
+# Metrics from continuous_monitor.BASE_COLUMN_NAMES that are aggregated across executors.
+AGGREGATED_BASE_METRICS = [
+  "cpu utilization",
+  "bytes received",
+  "bytes transmitted",
+  "running compute monotasks",
+  "running macrotasks",
+]
+# Metrics from continuous_monitor.DISK_METRIC_NAMES that are aggregated across executors, for each
+# disk.
+AGGREGATED_DISK_METRICS = [
+  "utilization",
+  "running disk monotasks",
+]
+STATISTICS = ["sum", "mean", "min", "max"]
+
+
+def get_metric_names(disks):
+  """ Returns the names of the aggregated metrics for a cluster with the given disks. """
+  metric_names = list(AGGREGATED_BASE_METRICS)
+  for disk in sorted(disks):
+    metric_names.extend(["{} {}".format(disk, metric) for metric in AGGREGATED_DISK_METRICS])
+  return metric_names
+
+
+def get_column_names(disks):
+  """ Returns the names of the columns in each row returned by merge(). """
+  column_names = ["time", "executors"]
+  for metric_name in get_metric_names(disks):
+    column_names.extend(["{} {}".format(metric_name, statistic) for statistic in STATISTICS])
+  return column_names
+
+
+def merge(filenames, interval_millis=DEFAULT_INTERVAL_MILLIS):
+  """ Returns a (column names, rows) tuple describing the combined utilization of the executors
+  whose continuous monitor logs are in filenames.
+
+  rows is a generator that yields a list with the value of each column for each interval. The
+  "time" column is the start of the interval, in milliseconds since the beginning of the earliest
+  log, and "executors" is the number of executors that the interval's values describe. Each
+  executor's value is the one from the last sample it recorded in or before the interval, and
+  executors are only included between their first and last samples. Disks are the disks that any
+  executor's first sample described; executors without a disk are excluded from its statistics.
+  """
+  sample_iterators = []
+  first_samples = []
+  for filename in filenames:
+    samples = continuous_monitor.get_samples(filename)
+    first_sample = next(samples, None)
+    if first_sample is not None:
+      sample_iterators.append(samples)
+      first_samples.append(first_sample)
+  disks = set(disk for _, _, disk_to_values in first_samples for disk in disk_to_values)
+  column_names = get_column_names(disks)
+  return (column_names, __get_rows(sample_iterators, first_samples, disks, interval_millis))
+
+
+def __get_rows(sample_iterators, first_samples, disks, interval_millis):
+  base_indices = [
+    continuous_monitor.BASE_COLUMN_NAMES.index(metric) for metric in AGGREGATED_BASE_METRICS]
+  disk_indices = [
+    continuous_monitor.DISK_METRIC_NAMES.index(metric) for metric in AGGREGATED_DISK_METRICS]
+  sorted_disks = sorted(disks)
+  missing_disk_values = [numpy.nan] * len(disk_indices)
+
+  def get_metric_values(base_values, disk_to_values):
+    metric_values = [base_values[i] for i in base_indices]
+    for disk in sorted_disks:
+      disk_values = disk_to_values.get(disk)
+      if disk_values is None:
+        metric_values.extend(missing_disk_values)
+      else:
+        metric_values.extend([disk_values[i] for i in disk_indices])
+    return metric_values
+
+  def get_events(executor, first_sample, samples):
+    """ Yields (time, is finished, executor, metric values) for each of an executor's samples,
+    followed by an event (at the time of the last sample) saying that the executor finished. """
+    time = None
+    for time, base_values, disk_to_values in itertools.chain([first_sample], samples):
+      yield (time, False, executor, get_metric_values(base_values, disk_to_values))
+    yield (time, True, executor, None)
+
+  # Events are ordered by time, and then by executor, with an executor's finished event after its
+  # last sample.
+  events = heapq.merge(*[
+    get_events(executor, first_sample, samples)
+    for executor, (first_sample, samples) in enumerate(zip(first_samples, sample_iterators))])
+  start = min(time for time, _, _ in first_samples) if first_samples else 0
+  executor_to_metric_values = {}
+  finished_executors = []
+  current_interval = None
+  for time, is_finished, executor, metric_values in events:
+    interval = (time - start) // interval_millis
+    if interval != current_interval:
+      if current_interval is not None:
+        yield __get_row(current_interval * interval_millis, executor_to_metric_values)
+      current_interval = interval
+      for finished_executor in finished_executors:
+        del executor_to_metric_values[finished_executor]
+      finished_executors = []
+    if is_finished:
+      # The executor's last sample is still used for the current interval.
+      finished_executors.append(executor)
+    else:
+      executor_to_metric_values[executor] = metric_values
+  if current_interval is not None:
+    yield __get_row(current_interval * interval_millis, executor_to_metric_values)
+
+
+def __get_row(time, executor_to_metric_values):
+  values = numpy.array(executor_to_metric_values.values(), dtype=numpy.float64)
+  with warnings.catch_warnings():
+    # Metrics for disks that none of the executors have are NaN.
+    warnings.simplefilter("ignore", RuntimeWarning)
+    statistics = numpy.vstack((
+      numpy.nansum(values, axis=0),
+      numpy.nanmean(values, axis=0),
+      numpy.nanmin(values, axis=0),
+      numpy.nanmax(values, axis=0)))
+  # Put all of the statistics for each metric next to each other.
+  return [time, len(executor_to_metric_values)] + statistics.T.ravel().tolist()
+
+
+def write_cluster_monitor(filenames, out_filename, interval_millis=DEFAULT_INTERVAL_MILLIS):
+  """ Writes the combined utilization of the executors whose continuous monitor logs are in
+  filenames to a tab-delimited file, and returns the names of the columns in the file. """
+  column_names, rows = merge(filenames, interval_millis)
+  with open(out_filename, "w") as out_file:
+    out_file.write("# {}\n".format("\t".join(column_names)))
+    for row in rows:
+      out_file.write("\t".join([str(value) for value in row]))
+      out_file.write("\n")
+  return column_names
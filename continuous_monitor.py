@@ -0,0 +1,290 @@
+"""
+This file contains a parser for continuous monitor logs, which stores the samples in the log in
+NumPy columns (one per metric) as it reads the log, rather than building a list of Python objects
+for each sample.
+"""
+
+import json
+
+import numpy
+
+import log_files
+
+BYTES_PER_GIGABYTE = float(1024 * 1024 * 1024)
+BYTES_PER_KILOBYTE = 1024 * 1024
+BYTES_PER_GIGABIT = BYTES_PER_GIGABYTE / 8
+CORES = 8.0
+
+# Metrics that are recorded for each sample, in the order of the columns in the utilization file
+# that's plotted with gnuplot.
+BASE_COLUMN_NAMES = [
+  "time",
+  "cpu utilization",
+  "bytes received",
+  "bytes transmitted",
+  "running compute monotasks", # 5
+  "running macrotasks",
+  "gc fraction",
+  "outstanding network bytes",
+  "macrotasks in network",
+  "macrotasks in compute", # 10
+  "cpu system",
+  "macrotasks in disk",
+  "free heap memory",
+  "free off heap memory",
+  "local running macrotasks", # 15
+  "running low priority monotasks",
+  "total started macrotasks",
+]
+# Metrics that are recorded for each disk. The name of each disk's column is the disk name followed
+# by the metric name (e.g., "xvdb utilization"). The columns for each disk follow the base columns,
+# with the disks in sorted order.
+DISK_METRIC_NAMES = [
+  "utilization",
+  "read throughput",
+  "write throughput",
+  "running disk monotasks",
+  "queued read monotasks",
+  "queued remove monotasks",
+  "queued write monotasks",
+]
+# Number of samples that space is initially allocated for. Columns double in size when they fill up.
+INITIAL_CAPACITY = 1024
+
+
+class DiskUtilization:
+  """ Represents the utilization of one disk at one point in time. """
+  def __init__(self, json_entry):
+    assert(len(json_entry) == 1)
+    self.disk_name, utilization_info = json_entry.popitem()
+    self.disk_name = str(self.disk_name)
+    self.total_utilization = utilization_info["Disk Utilization"]
+    self.read_throughput = utilization_info["Read Throughput"]
+    self.write_throughput = utilization_info["Write Throughput"]
+    self.running_disk_monotasks = 0
+    self.queued_read_monotasks = 0
+    self.queued_remove_monotasks = 0
+    self.queued_write_monotasks = 0
+
+  def get_values(self):
+    """ Returns the values of the metrics in DISK_METRIC_NAMES for this disk. """
+    return [
+      self.total_utilization,
+      self.read_throughput,
+      self.write_throughput,
+      self.running_disk_monotasks,
+      self.queued_read_monotasks,
+      self.queued_remove_monotasks,
+      self.queued_write_monotasks,
+    ]
+
+
+def is_valid_disk_name(disk_name):
+  """ Returns true if the given disk name is the name of a physical disk.
+
+  This method is based on knowledge about how the EC2 and r*.millennium
+  machines are configured.
+  """
+  if "ram" in disk_name or "xvda1" in disk_name:
+    # Ignore the ram disks on the millinnium machines, and the S3 mount on the EC2 machines.
+    return False
+  if "sd" in disk_name:
+    # This is a disk on one of the millennium machines! Only the "sbd" and "sda1" disks are valid.
+    if disk_name not in ["sdb", "sda1"]:
+      return False
+  return True
+
+
+class ContinuousMonitor(object):
+  """ The samples in a continuous monitor log, stored as one float64 NumPy column per metric.
+
+  The columns are allocated with space for more samples than have been added, and grow (by
+  doubling) when they fill up, so adding a sample only writes its values into the existing arrays.
+  Disks that don't appear in every sample have NaN in the samples that didn't describe them.
+  """
+
+  def __init__(self, capacity=INITIAL_CAPACITY):
+    self.num_samples = 0
+    # Time (in milliseconds since the epoch) that the "time" column is relative to.
+    self.start_time = 0
+    # Row i of self.__data holds the i-th column (so that each column is contiguous in memory).
+    # The base columns come first, followed by the columns for each disk in the order the disks
+    # were first seen.
+    self.__data = numpy.empty((len(BASE_COLUMN_NAMES), max(capacity, 1)), dtype=numpy.float64)
+    self.__column_name_to_row = {name: row for row, name in enumerate(BASE_COLUMN_NAMES)}
+    self.__disk_to_first_row = {}
+
+  def add_sample(self, base_values, disk_to_values):
+    """ Adds a sample to the end of the columns.
+
+    base_values should have the values of the metrics in BASE_COLUMN_NAMES, and disk_to_values
+    should map the name of each disk described by the sample to the values of the metrics in
+    DISK_METRIC_NAMES.
+    """
+    for disk in disk_to_values:
+      if disk not in self.__disk_to_first_row:
+        self.__add_disk(disk)
+    if self.num_samples == self.__data.shape[1]:
+      self.__grow()
+
+    sample = self.__data[:, self.num_samples]
+    sample[:len(BASE_COLUMN_NAMES)] = base_values
+    for disk, first_row in self.__disk_to_first_row.iteritems():
+      if disk in disk_to_values:
+        sample[first_row:first_row + len(DISK_METRIC_NAMES)] = disk_to_values[disk]
+      else:
+        sample[first_row:first_row + len(DISK_METRIC_NAMES)] = numpy.nan
+    self.num_samples += 1
+
+  def __add_disk(self, disk):
+    self.__disk_to_first_row[disk] = self.__data.shape[0]
+    for offset, metric_name in enumerate(DISK_METRIC_NAMES):
+      self.__column_name_to_row["{} {}".format(disk, metric_name)] = self.__data.shape[0] + offset
+    # Earlier samples didn't describe the disk.
+    disk_rows = numpy.empty((len(DISK_METRIC_NAMES), self.__data.shape[1]), dtype=numpy.float64)
+    disk_rows[:, :self.num_samples] = numpy.nan
+    self.__data = numpy.vstack((self.__data, disk_rows))
+
+  def __grow(self):
+    data = numpy.empty((self.__data.shape[0], 2 * self.__data.shape[1]), dtype=numpy.float64)
+    data[:, :self.num_samples] = self.__data[:, :self.num_samples]
+    self.__data = data
+
+  def get_disks(self):
+    """ Returns the sorted names of the disks that any sample described. """
+    return sorted(self.__disk_to_first_row)
+
+  def get_column_names(self):
+    """ Returns the names of all of the columns, in the order of the columns in get_rows(). """
+    column_names = list(BASE_COLUMN_NAMES)
+    for disk in self.get_disks():
+      column_names.extend(["{} {}".format(disk, metric_name) for metric_name in DISK_METRIC_NAMES])
+    return column_names
+
+  def get_disks_to_index(self):
+    """ Returns a mapping of each disk's name to the 1-indexed column in get_rows() (and in the
+    utilization file plotted with gnuplot) where the information about that disk begins. """
+    return {
+      disk: len(BASE_COLUMN_NAMES) + i * len(DISK_METRIC_NAMES) + 1
+      for i, disk in enumerate(self.get_disks())}
+
+  def get_column(self, name):
+    """ Returns an array with the value of the given metric for each sample. """
+    return self.__data[self.__column_name_to_row[name], :self.num_samples]
+
+  def take(self, samples):
+    """ Returns a ContinuousMonitor with the given samples (an increasing array of indices). """
+    continuous_monitor = ContinuousMonitor(capacity=len(samples))
+    continuous_monitor.__data = self.__data[:, samples]
+    continuous_monitor.__column_name_to_row = dict(self.__column_name_to_row)
+    continuous_monitor.__disk_to_first_row = dict(self.__disk_to_first_row)
+    continuous_monitor.num_samples = len(samples)
+    continuous_monitor.start_time = self.start_time
+    return continuous_monitor
+
+  def get_rows(self):
+    """ Returns a 2-dimensional array where row i has the values of all columns (in the order of
+    get_column_names()) for the i-th sample. """
+    rows = [self.__column_name_to_row[name] for name in self.get_column_names()]
+    return self.__data[rows, :self.num_samples].T
+
+
+def parse(filename):
+  """ Returns a ContinuousMonitor with the samples in the given continuous monitor log. """
+  continuous_monitor = ContinuousMonitor()
+  for time, base_values, disk_to_values in get_samples(filename):
+    if continuous_monitor.num_samples == 0:
+      continuous_monitor.start_time = time - base_values[0]
+    continuous_monitor.add_sample(base_values, disk_to_values)
+  return continuous_monitor
+
+
+def get_samples(filename):
+  """ Yields a (time, base values, disk to values) tuple for each sample in the given log.
+
+  time is the time when the sample was recorded (in milliseconds since the epoch), and the values
+  are in the format expected by ContinuousMonitor.add_sample() (so the "time" value is relative to
+  the beginning of the log).
+
+  The log is read one line at a time (it can be compressed, or inside a tar archive; see
+  log_files.open_log). Samples where the CPU or network utilization is NaN or infinite are skipped,
+  as are non-JSON lines at the beginning of the file; parsing stops at the first non-JSON line after
+  that (which typically happens because the end of the file was cut off when the job stopped).
+  """
+  with log_files.open_log(filename) as log_file:
+    start = -1
+    at_beginning = True
+    for line in log_file:
+      try:
+        json_data = json.loads(line)
+      except ValueError:
+        # This typically happens at the end of the file, which can get cutoff when the job stops.
+        print "Stopping parsing due to incomplete line"
+        if not at_beginning:
+          break
+        else:
+          # There are some non-JSON lines at the beginning of the file.
+          print "Skipping non-JSON line at beginning of file: {}".format(line)
+          continue
+      at_beginning = False
+      time = json_data["Current Time"]
+      if start == -1:
+        start = time
+      raw_disk_utilizations = json_data["Disk Utilization"]["Device Name To Utilization"]
+      disk_to_utilization = {}
+      for utilization_json in raw_disk_utilizations:
+        parsed_utilization = DiskUtilization(utilization_json)
+        disk_name = parsed_utilization.disk_name
+        if (is_valid_disk_name(disk_name)):
+          disk_to_utilization[disk_name] = parsed_utilization
+      cpu_utilization = json_data["Cpu Utilization"]
+      cpu_system = cpu_utilization["Total System Utilization"]
+      cpu_total = (cpu_utilization["Total User Utilization"] +
+        cpu_utilization["Total System Utilization"])
+      network_utilization = json_data["Network Utilization"]
+      bytes_received = network_utilization["Bytes Received Per Second"]
+      if bytes_received == "NaN" or bytes_received == "Infinity":
+        continue
+      bytes_transmitted = network_utilization["Bytes Transmitted Per Second"]
+      if bytes_transmitted == "NaN" or bytes_transmitted == "Infinity":
+        continue
+      if str(cpu_total).find("NaN") > -1 or str(cpu_total).find("Infinity") > -1:
+        continue
+
+      if "Running Disk Monotasks" in json_data:
+        # Parse the number of currently running disk monotasks for each disk.
+        for running_disk_monotasks_info in json_data["Running Disk Monotasks"]:
+          disk_name = running_disk_monotasks_info["Disk Name"].split("/")[-1]
+          if disk_name in disk_to_utilization:
+            disk_utilization = disk_to_utilization[disk_name]
+            disk_utilization.running_disk_monotasks = (
+              running_disk_monotasks_info["Running And Queued Monotasks"])
+            disk_utilization.queued_read_monotasks = (
+              running_disk_monotasks_info["Queued Read Monotasks"])
+            disk_utilization.queued_remove_monotasks = (
+              running_disk_monotasks_info["Queued Remove Monotasks"])
+            disk_utilization.queued_write_monotasks = (
+              running_disk_monotasks_info["Queued Write Monotasks"])
+
+      base_values = [
+        time - start,
+        cpu_total / CORES,
+        bytes_received / BYTES_PER_GIGABIT,
+        bytes_transmitted / BYTES_PER_GIGABIT,
+        json_data.get("Running Compute Monotasks", 0), # 5
+        json_data.get("Running Macrotasks", 0),
+        json_data.get("Fraction GC Time", 0),
+        json_data.get("Outstanding Network Bytes", 0) / BYTES_PER_KILOBYTE,
+        json_data.get("Macrotasks In Network", 0),
+        json_data.get("Macrotasks In Compute", 0), # 10
+        cpu_system / CORES,
+        json_data.get("Macrotasks In Disk", 0),
+        json_data.get("Free Heap Memory Bytes", 0) / BYTES_PER_GIGABYTE,
+        json_data.get("Free Off-Heap Memory Bytes", 0) / BYTES_PER_GIGABYTE,
+        json_data.get("Local Running Macrotasks", 0), # 15
+        json_data.get("Running Low Priority Network Monotasks", 0),
+        json_data.get("Total Started Macrotasks", 0),
+      ]
+      yield (time, base_values, {
+        disk_name: disk_utilization.get_values()
+        for disk_name, disk_utilization in disk_to_utilization.iteritems()})
@@ -4,22 +4,27 @@ The main function expected to be used is copy_logs.
 """
 
 from optparse import OptionParser
-import subprocess
 import sys
-import utils
 
-import plot_continuous_monitor
+import log_collector
 
 def copy_logs(argv):
   """ Copies logs back from a Spark cluster.
 
-  This script copies the JSON event log and JSON continuous monitor back from a Spark
-  driver and Spark executor, respectively, to the local machine.  Returns a two-item
-  tuple with the name of the event log and the continuous monitor log.
+  This script copies the JSON event log and JSON continuous monitors back from a Spark
+  driver and Spark executors, respectively, to the local machine (from all of the machines at
+  once), and plots each continuous monitor.  Returns a two-item tuple with the name of the
+  event log and a dictionary mapping each executor to the name of its continuous monitor log
+  (executors whose continuous monitor couldn't be copied are left out). Raises an exception if the
+  event log couldn't be copied.
+
+  With --summarize, the logs are summarized on the machines where they were written, and only
+  the summaries are copied back (see log_summary.py); the returned names are the summaries' names.
   """
   parser = OptionParser()
   parser.add_option(
-    "-e", "--executor-host", help="Executor from which to copy continuous monitor")
+    "-e", "--executor-host", action="append",
+    help="Executor from which to copy continuous monitor (can be given more than once)")
   parser.add_option(
     "-d", "--driver-host", help="Hostname of driver")
   parser.add_option(
@@ -28,7 +33,13 @@ def copy_logs(argv):
     "-u", "--username", default="root", help="Username to user when logging in")
   parser.add_option(
     "-i", "--identity-file", help="Identity file to use when logging in")
-  (opts, args) = parser.parse_args()
+  parser.add_option(
+    "-n", "--num-threads", type="int", default=log_collector.DEFAULT_NUM_THREADS,
+    help="Number of hosts to copy logs from at once")
+  parser.add_option(
+    "-s", "--summarize", action="store_true", default=False,
+    help="Copy back summaries of the logs (made on the remote machines), rather than the logs")
+  (opts, args) = parser.parse_args(argv)
 
   if not opts.executor_host:
     parser.error("--executor-host must be specified")
@@ -39,33 +50,27 @@ def copy_logs(argv):
   if not opts.filename_prefix:
     parser.error("--filename-prefix must be specified")
 
-  # Copy the event log from the driver back to the local machine.
-  ret = utils.ssh_get_stdout(
-    opts.driver_host,
-    opts.identity_file,
-    opts.username,
-    "ls -t /tmp/spark-events | head -n 1")
-  print ret
-  event_log_relative_filename = ret.strip("\n").strip("\r")
-  event_log_filename = "/tmp/spark-events/{}".format(event_log_relative_filename)
-  local_event_log_file = "{}_event_log".format(opts.filename_prefix)
-  print "Copying event log from file {} on host {} back to {}".format(
-    event_log_filename, opts.driver_host, local_event_log_file)
-  utils.scp_from(
-    opts.driver_host,
-    opts.identity_file,
-    opts.username,
-    event_log_filename,
-    local_event_log_file)
-
-  # Copy the continuous monitor from the driver back to the local machine.
-  local_continuous_monitor_file = utils.copy_latest_continuous_monitor(
-    opts.executor_host,
-    opts.identity_file,
-    opts.filename_prefix,
-    opts.username)
+  # Copy the event log from the driver and the continuous monitors from the executors back to
+  # the local machine.
+  collector = log_collector.LogCollector(opts.identity_file, opts.username, opts.num_threads)
+  try:
+    if opts.summarize:
+      import log_summary
+      local_event_log_file, host_to_continuous_monitor_file = log_summary.summarize_cluster_logs(
+        collector, opts.driver_host, opts.executor_host, opts.filename_prefix)
+    else:
+      local_event_log_file, host_to_continuous_monitor_file = collector.copy_logs(
+        opts.driver_host, opts.executor_host, opts.filename_prefix)
+  finally:
+    collector.close()
 
-  return (local_event_log_file, local_continuous_monitor_file)
+  print "Plotting continuous monitors"
+  import plot_continuous_monitor
+  for continuous_monitor_file in sorted(host_to_continuous_monitor_file.itervalues()):
+    # Only open the graphs when there's one executor, rather than opening a set for each one.
+    plot_continuous_monitor.plot_continuous_monitor(
+      continuous_monitor_file, open_graphs=(len(host_to_continuous_monitor_file) == 1))
+  return (local_event_log_file, host_to_continuous_monitor_file)
 
 if __name__ == "__main__":
   copy_logs(sys.argv[1:])
@@ -0,0 +1,204 @@
+"""
+This file contains functions to reduce the number of continuous monitor samples that are plotted,
+while keeping the points that determine the shape of each line (in particular, short spikes in
+utilization, which are lost if samples are simply skipped or averaged).
+
+Monitors that are used to compute utilizations (e.g., in log summaries) should instead be averaged
+with the MEAN method, which keeps the integral of each metric over time (and so the average
+utilization over any set of buckets) the same.
+"""
+
+import numpy
+
+LTTB = "lttb"
+MIN_MAX = "minmax"
+MEAN = "mean"
+METHODS = [LTTB, MIN_MAX, MEAN]
+# Columns that count events since the beginning of the log, so the value at the end of a bucket
+# (rather than the average over the bucket) is kept when averaging.
+CUMULATIVE_COLUMN_NAMES = ["total started macrotasks"]
+# The smallest number of points that can be kept: the first and last samples, and at least one
+# sample between them.
+MIN_POINTS = 3
+
+
+def downsample(continuous_monitor, max_points, method=LTTB):
+  """ Returns a continuous_monitor.ContinuousMonitor with at most max_points of the given monitor's
+  samples.
+
+  The samples are split into buckets of consecutive samples (with time as the x-axis), which are
+  shared by all of the columns, and the samples kept from each bucket are chosen based on all of the
+  columns whose value changes, so the result has at most max_points samples no matter how many
+  columns the monitor has. With the MEAN method, each bucket is replaced by its average instead
+  (see get_time_weighted_means()).
+  """
+  if method not in METHODS:
+    raise ValueError("Unknown downsampling method {}; should be one of {}".format(method, METHODS))
+  if max_points < MIN_POINTS:
+    raise ValueError("At least {} points are needed to downsample".format(MIN_POINTS))
+  num_samples = continuous_monitor.num_samples
+  if num_samples <= max_points:
+    return continuous_monitor
+  if method == MEAN:
+    return get_time_weighted_means(continuous_monitor, max_points)
+  times = continuous_monitor.get_column("time")
+  columns = []
+  for name in continuous_monitor.get_column_names():
+    if name == "time":
+      continue
+    # Disks that a sample didn't describe are NaN, which would otherwise make every area NaN.
+    values = numpy.nan_to_num(continuous_monitor.get_column(name))
+    if values.min() != values.max():
+      columns.append(values)
+  if not columns:
+    # Only the first and last samples are needed to plot lines that never change.
+    return continuous_monitor.take(numpy.array([0, num_samples - 1]))
+  if method == LTTB:
+    indices = get_lttb_indices(times, columns, max_points)
+  else:
+    indices = get_min_max_indices(columns, max_points)
+  return continuous_monitor.take(indices)
+
+
+def get_time_weighted_means(continuous_monitor, max_points):
+  """ Returns a continuous_monitor.ContinuousMonitor with max_points samples, each of which is the
+  average of a bucket of consecutive samples of the given monitor.
+
+  Each sample describes the time since the previous sample, so the first sample is kept as it is,
+  and each of the remaining max_points - 1 samples has the time of the last sample in its bucket and
+  the average of the bucket's values weighted by the time that each sample describes. The integral
+  of each column up to the end of each bucket is the same as in the given monitor (with NaN counted
+  as 0, as in monitor_utilization); buckets where a column is always NaN are NaN. The columns in
+  CUMULATIVE_COLUMN_NAMES have the value of the bucket's last sample.
+  """
+  num_samples = continuous_monitor.num_samples
+  if num_samples <= max_points:
+    return continuous_monitor
+  if max_points < MIN_POINTS:
+    raise ValueError("At least {} points are needed to downsample".format(MIN_POINTS))
+  # Bucket i has samples edges[i] through edges[i + 1] - 1.
+  edges = numpy.linspace(1, num_samples, max_points).astype(numpy.int64)
+  averaged = continuous_monitor.take(numpy.append(0, edges[1:] - 1))
+  # The time described by each sample after the first, and by each bucket.
+  durations = numpy.diff(continuous_monitor.get_column("time"))
+  bucket_starts = edges[:-1] - 1
+  bucket_durations = numpy.add.reduceat(durations, bucket_starts)
+  # Buckets that describe no time keep the values of their last sample.
+  has_duration = bucket_durations > 0
+  for name in continuous_monitor.get_column_names():
+    if name == "time" or name in CUMULATIVE_COLUMN_NAMES:
+      continue
+    values = continuous_monitor.get_column(name)[1:]
+    present = ~numpy.isnan(values)
+    integrals = numpy.add.reduceat(numpy.where(present, values, 0) * durations, bucket_starts)
+    means = averaged.get_column(name)[1:]
+    means[has_duration] = integrals[has_duration] / bucket_durations[has_duration]
+    means[numpy.add.reduceat(present, bucket_starts) == 0] = numpy.nan
+  return averaged
+
+
+def get_lttb_indices(x, columns, num_points):
+  """ Returns the indices of num_points points chosen with largest-triangle-three-buckets.
+
+  The first and last points are always chosen, and the remaining points are split into
+  num_points - 2 buckets of consecutive points. From each bucket, the algorithm chooses the point
+  that forms the largest triangle with the point chosen from the previous bucket and the average
+  of the points in the next bucket. With more than one column of y values, the point with the
+  largest total area is chosen, after scaling each column to the range [0, 1] (so that columns with
+  larger values don't decide which points are kept).
+  """
+  num_samples = len(x)
+  if num_samples <= num_points:
+    return numpy.arange(num_samples)
+  if num_points < MIN_POINTS:
+    raise ValueError("At least {} points are needed to downsample with LTTB".format(MIN_POINTS))
+  x = numpy.asarray(x, dtype=numpy.float64)
+  y = __get_scaled_columns(columns)
+  # Bucket i has points edges[i] through edges[i + 1] - 1.
+  edges = numpy.linspace(1, num_samples - 1, num_points - 1).astype(numpy.int64)
+  # The average of each bucket, followed by the last point (which is the "next bucket" for the
+  # last bucket).
+  bucket_sizes = numpy.diff(edges).astype(numpy.float64)
+  average_x = numpy.append(numpy.add.reduceat(x[:-1], edges[:-1]) / bucket_sizes, x[-1])
+  average_y = numpy.hstack([
+    numpy.add.reduceat(y[:, :-1], edges[:-1], axis=1) / bucket_sizes, y[:, -1:]])
+
+  indices = numpy.empty(num_points, dtype=numpy.int64)
+  indices[0] = 0
+  indices[-1] = num_samples - 1
+  previous = 0
+  for bucket in xrange(num_points - 2):
+    start = edges[bucket]
+    end = edges[bucket + 1]
+    previous_x = x[previous]
+    previous_y = y[:, previous:previous + 1]
+    next_y = average_y[:, bucket + 1:bucket + 2]
+    # Twice the area of the triangle formed by each candidate point, the previously chosen point,
+    # and the average of the next bucket, summed over the columns.
+    areas = numpy.abs(
+      (previous_x - average_x[bucket + 1]) * (y[:, start:end] - previous_y) -
+      (previous_x - x[start:end]) * (next_y - previous_y)).sum(axis=0)
+    previous = start + numpy.argmax(areas)
+    indices[bucket + 1] = previous
+  return indices
+
+
+def get_min_max_indices(columns, num_points):
+  """ Returns the indices of at most num_points points, chosen by splitting the points into
+  buckets of consecutive points and choosing the minimum and maximum point of each column in each
+  bucket (as well as the first and last points).
+
+  The number of buckets is the largest number for which the chosen points fit in num_points. If
+  the minimum and maximum points of every column don't fit even with one bucket, the points that
+  are the minimum or maximum of the most columns are chosen.
+  """
+  num_samples = len(columns[0])
+  if num_samples <= num_points:
+    return numpy.arange(num_samples)
+  if num_points < MIN_POINTS:
+    raise ValueError("At least {} points are needed to downsample".format(MIN_POINTS))
+  y = numpy.vstack(columns)
+  # Points chosen from the buckets don't include the first and last points.
+  interior = y[:, 1:-1]
+  max_interior_points = num_points - 2
+  # Binary search for the largest number of buckets whose points fit; the candidates from more
+  # buckets are a (nearly always) larger set of points.
+  min_buckets = 1
+  max_buckets = max(max_interior_points / 2, 1)
+  chosen = __get_bucket_min_max_indices(interior, min_buckets)
+  if len(chosen) > max_interior_points:
+    extremes = numpy.concatenate([interior.argmin(axis=1), interior.argmax(axis=1)])
+    candidates, counts = numpy.unique(extremes, return_counts=True)
+    chosen = numpy.sort(candidates[numpy.argsort(-counts, kind="mergesort")][:max_interior_points])
+  while min_buckets < max_buckets:
+    num_buckets = (min_buckets + max_buckets + 1) / 2
+    bucket_indices = __get_bucket_min_max_indices(interior, num_buckets)
+    if len(bucket_indices) <= max_interior_points:
+      min_buckets = num_buckets
+      chosen = bucket_indices
+    else:
+      max_buckets = num_buckets - 1
+  return numpy.concatenate([[0], chosen + 1, [num_samples - 1]])
+
+
+def __get_bucket_min_max_indices(y, num_buckets):
+  """ Returns the sorted, distinct indices of the minimum and maximum point of each row of y in
+  each of num_buckets buckets of consecutive points. """
+  edges = numpy.linspace(0, y.shape[1], num_buckets + 1).astype(numpy.int64)
+  indices = []
+  for start, end in zip(edges[:-1], edges[1:]):
+    if start == end:
+      continue
+    bucket = y[:, start:end]
+    indices.append(start + bucket.argmin(axis=1))
+    indices.append(start + bucket.argmax(axis=1))
+  return numpy.unique(numpy.concatenate(indices))
+
+
+def __get_scaled_columns(columns):
+  """ Returns a 2-D array with one row for each of the given columns, scaled to [0, 1]. """
+  y = numpy.vstack(columns).astype(numpy.float64)
+  minimums = y.min(axis=1)[:, numpy.newaxis]
+  ranges = y.max(axis=1)[:, numpy.newaxis] - minimums
+  ranges[ranges == 0] = 1
+  return (y - minimums) / ranges
@@ -0,0 +1,188 @@
+"""
+This file contains an index of the experiment runs in a results directory, which the scripts that
+parse a sweep of experiments use to find each run's logs and parameters.
+
+Each run's logs are in a subdirectory named "experiment_log_<parameters>_<timestamp>", where the
+parameters are separated by underscores; which parameters are included (and in what order) depends
+on the experiment. The index decodes the parameters (as ints or floats, where possible), and
+records the run's event log, its continuous monitors, and whether the event log's task cache (see
+task_cache) is valid.
+
+The index is saved in a manifest in the results directory, along with the size and modification
+time of each run's directory, event log, and task cache. Runs whose files haven't changed are read
+from the manifest rather than listing their directories and checking their task caches again (which
+requires hashing part of the event log), so only new or changed runs are scanned.
+
+To print the runs in a results directory, run:
+
+    python experiment_index.py <results directory>
+"""
+
+import json
+import logging
+import os
+from os import path
+import sys
+
+import task_cache
+
+INDEX_FILENAME = "experiment_index.json"
+RUN_PREFIX = "experiment_log_"
+# Names of the event log in a run's directory, in order of preference.
+EVENT_LOG_FILENAMES = ["event_log", "event_log.gz", "event_log.bz2"]
+CONTINUOUS_MONITOR_SUFFIX = "executor_monitor"
+# Should be incremented whenever the format of the records in the manifest changes.
+VERSION = 1
+
+
+class ExperimentRun(object):
+  """ One run in a results directory. """
+
+  def __init__(self, results_dir, record):
+    """ record is the run's record in the manifest (see get_record()). """
+    self.name = record["name"]
+    self.directory = path.join(results_dir, self.name)
+    # The parameters from the run's name (e.g., [10, 400, 2] for experiment_log_10_400_2_<time>).
+    self.params = record["params"]
+    self.timestamp = record["timestamp"]
+    # The event log's filename, or None if the run doesn't have one.
+    self.event_log = None
+    if record["event_log"] is not None:
+      self.event_log = path.join(self.directory, record["event_log"])
+    self.continuous_monitors = [path.join(self.directory, filename)
+      for filename in record["continuous_monitors"]]
+    # One of task_cache.VALID, task_cache.STALE, or task_cache.MISSING (or None if the run doesn't
+    # have an event log).
+    self.cache_status = record["cache_status"]
+
+
+def get_typed_value(value):
+  """ Returns the given string as an int or a float, if it's a number, and unchanged otherwise. """
+  for value_type in [int, float]:
+    try:
+      return value_type(value)
+    except ValueError:
+      pass
+  return value
+
+
+def parse_run_name(name):
+  """ Returns a (parameters, timestamp) tuple for the run with the given directory name, or None if
+  the name isn't the name of a run. """
+  if not name.startswith(RUN_PREFIX) or len(name) == len(RUN_PREFIX):
+    return None
+  fields = [get_typed_value(field) for field in name[len(RUN_PREFIX):].split("_")]
+  return (fields[:-1], fields[-1])
+
+
+def get_stat(filename):
+  """ Returns a [size, modification time] list for the given file, or None if it doesn't exist. """
+  if not path.exists(filename):
+    return None
+  stat = os.stat(filename)
+  return [stat.st_size, stat.st_mtime]
+
+
+def get_file_stats(directory, event_log):
+  """ Returns the stats (see get_stat()) of the files that a run's record depends on: the run's
+  directory (which changes when files are added or removed), and its event log and task cache. """
+  file_stats = {".": get_stat(directory)}
+  if event_log is not None:
+    event_log_filename = path.join(directory, event_log)
+    cache_filename = task_cache.get_cache_filename(event_log_filename)
+    file_stats[event_log] = get_stat(event_log_filename)
+    file_stats[path.basename(cache_filename)] = get_stat(cache_filename)
+  return file_stats
+
+
+def get_record(results_dir, name, old_record=None):
+  """ Scans the run in the given directory of results_dir, and returns a record describing it.
+
+  If old_record is the run's previous record, and the run's event log and task cache haven't
+  changed since then (e.g., only output files were added to the run's directory), the task cache's
+  status is copied from old_record rather than checked again.
+  """
+  directory = path.join(results_dir, name)
+  params, timestamp = parse_run_name(name)
+  filenames = set(os.listdir(directory))
+  event_log = next((filename for filename in EVENT_LOG_FILENAMES if filename in filenames), None)
+  file_stats = get_file_stats(directory, event_log)
+  cache_status = None
+  if (old_record is not None and old_record["event_log"] == event_log and
+      all(old_record["file_stats"].get(filename) == stat
+        for filename, stat in file_stats.iteritems() if filename != ".")):
+    cache_status = old_record["cache_status"]
+  elif event_log is not None:
+    cache_status = task_cache.get_status(path.join(directory, event_log))
+  return {
+    "name": name,
+    "params": params,
+    "timestamp": timestamp,
+    "event_log": event_log,
+    "continuous_monitors": sorted([filename for filename in filenames
+      if filename.endswith(CONTINUOUS_MONITOR_SUFFIX)]),
+    "cache_status": cache_status,
+    "file_stats": file_stats,
+  }
+
+
+def get_runs(results_dir):
+  """ Returns an ExperimentRun for each run in results_dir, sorted by name.
+
+  The runs are read from the manifest where possible, and the manifest is updated if any runs were
+  added, removed, or changed since it was saved.
+  """
+  manifest_filename = path.join(results_dir, INDEX_FILENAME)
+  name_to_record = {}
+  if path.exists(manifest_filename):
+    with open(manifest_filename, "r") as manifest_file:
+      manifest = json.load(manifest_file)
+    if manifest.get("version") == VERSION:
+      name_to_record = manifest["runs"]
+
+  changed = False
+  new_name_to_record = {}
+  for name in os.listdir(results_dir):
+    if parse_run_name(name) is None or not path.isdir(path.join(results_dir, name)):
+      continue
+    record = name_to_record.get(name)
+    if (record is None or
+        record["file_stats"] != get_file_stats(path.join(results_dir, name), record["event_log"])):
+      record = get_record(results_dir, name, record)
+      changed = True
+    new_name_to_record[name] = record
+  if changed or len(new_name_to_record) != len(name_to_record):
+    __save(manifest_filename, new_name_to_record)
+  return [ExperimentRun(results_dir, record)
+    for _, record in sorted(new_name_to_record.iteritems())]
+
+
+def __save(manifest_filename, name_to_record):
+  """ Writes the manifest, logging a warning (rather than failing) if that isn't possible. """
+  # Write a new file and then rename it, so that the manifest isn't corrupted if this is
+  # interrupted.
+  temp_filename = "{}.{}.tmp".format(manifest_filename, os.getpid())
+  try:
+    with open(temp_filename, "w") as manifest_file:
+      json.dump({"version": VERSION, "runs": name_to_record}, manifest_file, indent=2,
+        sort_keys=True)
+    os.rename(temp_filename, manifest_filename)
+  except (IOError, OSError) as e:
+    logging.getLogger("ExperimentIndex").warning(
+      "Unable to write experiment index {}: {}".format(manifest_filename, e))
+    if path.exists(temp_filename):
+      os.remove(temp_filename)
+
+
+def main(argv):
+  if len(argv) != 1:
+    print "Usage: experiment_index.py results_directory"
+    sys.exit(1)
+  for run in get_runs(argv[0]):
+    print "{}\tparams: {}\tevent log: {} (cache {})\tcontinuous monitors: {}".format(
+      run.name, ", ".join([str(param) for param in run.params]),
+      "-" if run.event_log is None else path.basename(run.event_log), run.cache_status,
+      len(run.continuous_monitors))
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,27 @@
+set terminal pdfcairo font 'Times,20' rounded dashlength 2 size 10in,6in
+
+# Line style for axes
+set style line 80 lt 1 lc rgb "#808080"
+
+# Line style for grid
+set style line 81 lt 0 # dashed
+set style line 81 lt rgb "#808080"  # grey
+
+set grid xtics back linestyle 81
+set border 3 back linestyle 80 # Remove border on top and right.  These
+             # borders are useless and make it harder
+             # to see plotted lines near the border.
+    # Also, put it in grey; no need for so much emphasis on a border.
+set xtics nomirror
+set ytics nomirror
+
+# Line styles for each resource's monotasks.
+set style line 1 lt 1 lc rgb "#E41A1C" lw 0.5 # Network
+set style line 2 lt 1 lc rgb "#377EB8" lw 0.5 # Compute
+set style line 3 lt 1 lc rgb "#4DAF4A" lw 0.5 # Disk
+
+set style fill solid noborder
+set key above
+
+set xlabel "Time (ms)"
+set ylabel "Monotask"
@@ -0,0 +1,116 @@
+"""
+This file contains GnuplotSession, which makes plots by sending gnuplot scripts to a gnuplot
+process that stays running between plots, rather than starting a new gnuplot process for each plot.
+
+Scripts that generate plots should call plot(), which uses one session for each Python process (so
+each worker in a multiprocessing pool has its own gnuplot process).
+"""
+
+import atexit
+import os
+import subprocess
+
+# Printed (to stderr, which is where gnuplot's print command writes by default) after each script,
+# to mark the end of that script's output.
+DONE_MARKER = "__GNUPLOT_SESSION_DONE__"
+
+
+class GnuplotError(Exception):
+  """ Raised when gnuplot reports an error while running a script. """
+
+  def __init__(self, plot_filename, output):
+    Exception.__init__(self, "gnuplot failed to run {}:\n{}".format(plot_filename, output))
+    self.plot_filename = plot_filename
+    self.output = output
+
+
+class GnuplotSession(object):
+  """ A gnuplot process that runs one script after another.
+
+  Gnuplot's settings are reset before each script, and the output file is closed after each one, so
+  each script behaves as if it were run by a new gnuplot process. The process is started when the
+  first script is run, and if gnuplot exits (which it does when a script it's reading from stdin
+  has an error), a new process is started for the next script.
+  """
+
+  def __init__(self, command="gnuplot"):
+    self.command = command
+    self.__process = None
+
+  def plot(self, plot_filename):
+    """ Runs the given gnuplot script, and raises a GnuplotError if the script has an error.
+
+    Returns any warnings that gnuplot printed while running the script.
+    """
+    if self.__process is None or self.__process.poll() is not None:
+      self.__process = subprocess.Popen(
+        [self.command], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    commands = [
+      "reset",
+      # Relative filenames in the script are relative to the current directory, as they would be
+      # for a new gnuplot process.
+      "cd {}".format(_quote(os.getcwd())),
+      "load {}".format(_quote(os.path.abspath(plot_filename))),
+      # Close the output file, so that the plot is completely written before this returns.
+      "unset output",
+      "set print",
+      "print {}".format(_quote(DONE_MARKER)),
+    ]
+    try:
+      self.__process.stdin.write("\n".join(commands) + "\n")
+      self.__process.stdin.flush()
+    except IOError:
+      # gnuplot exited before reading all of the commands; its output says why.
+      pass
+
+    output_lines = []
+    while True:
+      line = self.__process.stderr.readline()
+      if not line or line.strip() == DONE_MARKER:
+        break
+      output_lines.append(line)
+    output = "".join(output_lines)
+    if not line:
+      self.close()
+      raise GnuplotError(plot_filename, output)
+    if any(line.strip() and "warning" not in line.lower() for line in output_lines):
+      raise GnuplotError(plot_filename, output)
+    return output
+
+  def close(self):
+    """ Stops the gnuplot process (a new one is started if another script is run). """
+    if self.__process is None:
+      return
+    if self.__process.poll() is None:
+      try:
+        self.__process.stdin.write("exit\n")
+        self.__process.stdin.close()
+      except IOError:
+        pass
+    self.__process.wait()
+    self.__process = None
+
+
+def _quote(string):
+  return "\"{}\"".format(string.replace("\\", "\\\\").replace("\"", "\\\""))
+
+
+# The session used by plot(), and the id of the process that created it (a process forked from
+# that one, like a multiprocessing worker, needs its own session).
+_session = None
+_session_pid = None
+
+
+def get_session():
+  """ Returns the GnuplotSession for this process, creating it if necessary. """
+  global _session, _session_pid
+  if _session is None or _session_pid != os.getpid():
+    _session = GnuplotSession()
+    _session_pid = os.getpid()
+    atexit.register(_session.close)
+  return _session
+
+
+def plot(plot_filename):
+  """ Runs the given gnuplot script using this process's GnuplotSession. """
+  return get_session().plot(plot_filename)
@@ -1,15 +1,21 @@
 import collections
+import copy
 import logging
 
 import stage
 
 class Job:
-  def __init__(self, id, name):
+  def __init__(self, id, name, stage_class = stage.Stage):
+    """ stage_class is used to create the job's stages; it can be set to
+    stage_summary.StageSummary to avoid storing every task. """
     self.id = id
     self.name = name
     self.logger = logging.getLogger("Job")
     # Map of stage IDs to Stages.
-    self.stages = collections.defaultdict(stage.Stage)
+    self.stages = collections.defaultdict(stage_class)
+    # Map of method names to (stage versions, result) pairs, where the stage versions describe the
+    # stages when the result was computed (see __get_stage_versions).
+    self.__cached_results = {}
 
   def add_event(self, data):
     event_type = data["Event"]
@@ -17,21 +23,48 @@ class Job:
       stage_id = data["Stage ID"]
       self.stages[stage_id].add_event(data)
 
+  def add_task(self, stage_id, task):
+    self.stages[stage_id].add_task(task)
+
+  def add_stage(self, stage_id, stage):
+    """ Adds a stage, which may be shared with other jobs that depend on the same stage. """
+    self.stages[stage_id] = stage
+
   def initialize_job(self):
     """ Should be called after adding all events to the job. """
     # Drop empty stages.
     stages_to_drop = []
     for id, s in self.stages.iteritems():
-      if len(s.tasks) == 0:
+      if s.num_tasks() == 0:
         stages_to_drop.append(id)
     for id in stages_to_drop:
       print "Dropping stage %s because it is empty" % id
       del self.stages[id]
 
   def all_tasks(self):
-    """ Returns a list of all tasks. """
+    """ Returns a list of all tasks.
+
+    Raises a ValueError if the job's stages don't keep their tasks (because the event log was
+    parsed in streaming mode).
+    """
+    self.__check_stages_keep_tasks()
     return [task for stage in self.stages.values() for task in stage.tasks]
 
+  def get_stage_task_tables(self):
+    """ Returns a list of (stage id, task_table.TaskTable) pairs describing the tasks in each of
+    this job's stages, ordered by stage id.
+
+    The tables are the stages' own (rather than copies), so callers must not modify them. Like
+    all_tasks, this raises a ValueError if the job was parsed in streaming mode.
+    """
+    self.__check_stages_keep_tasks()
+    return [(stage_id, stage.get_task_table())
+      for stage_id, stage in sorted(self.stages.iteritems())]
+
+  def __check_stages_keep_tasks(self):
+    if not all(isinstance(s, stage.Stage) for s in self.stages.itervalues()):
+      raise ValueError("Job %s was parsed in streaming mode, so its tasks weren't kept" % self.id)
+
   def print_stage_info(self):
     for id, stage in self.stages.iteritems():
       print "STAGE %s: %s" % (id, stage.verbose_str())
@@ -39,7 +72,28 @@ class Job:
   def print_heading(self, text):
     print "\n******** %s: %s ********" % (self.id, text)
 
+  def __get_stage_versions(self):
+    """ Returns a value that changes whenever a stage or task is added to or removed from the job.
+
+    Stages may be shared with other jobs, so tasks can be added to them without going through this
+    job. Tasks are only ever appended, so a stage's number of tasks identifies its version.
+    """
+    return tuple((stage_id, stage.num_tasks()) for stage_id, stage in self.stages.iteritems())
+
+  def __get_cached_result(self, name, compute_result):
+    stage_versions = self.__get_stage_versions()
+    if name in self.__cached_results:
+      cached_stage_versions, result = self.__cached_results[name]
+      if cached_stage_versions == stage_versions:
+        return result
+    result = compute_result()
+    self.__cached_results[name] = (stage_versions, result)
+    return result
+
   def runtime(self):
+    return self.__get_cached_result("runtime", self.__compute_runtime)
+
+  def __compute_runtime(self):
     actual_start_time = min([s.start_time for s in self.stages.values()])
     actual_finish_time = max([s.finish_time() for s in self.stages.values()])
     return actual_finish_time - actual_start_time
@@ -47,8 +101,13 @@ class Job:
   def get_executor_id_to_resource_metrics(self):
     """
     Returns a mapping from executor id to a description of how each of its resources was used while
-    this job's tasks were running on that executor.
+    this job's tasks were running on that executor. The result is cached until the job's stages
+    change, so callers must not modify it.
     """
+    return self.__get_cached_result(
+      "get_executor_id_to_resource_metrics", self.__compute_executor_id_to_resource_metrics)
+
+  def __compute_executor_id_to_resource_metrics(self):
     executor_to_job_metrics = {}
     # Aggregate metrics from the job's stages
     for stage in self.stages.itervalues():
@@ -56,7 +115,8 @@ class Job:
         if executor in executor_to_job_metrics:
           executor_to_job_metrics[executor].add_metrics(stage_metrics)
         else:
-          executor_to_job_metrics[executor] = stage_metrics
+          # Copy the stage's metrics, which are cached by (and may be shared with) the stage.
+          executor_to_job_metrics[executor] = copy.deepcopy(stage_metrics)
     return executor_to_job_metrics
 
   def write_data_to_file(self, data, file_handle, newline=True):
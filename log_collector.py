@@ -0,0 +1,442 @@
+"""
+This file contains LogCollector, which copies logs back from the machines in a Spark cluster.
+
+Each host's logs are copied by a separate thread, and all of the ssh and scp commands for a host
+share one SSH connection (using OpenSSH's ControlMaster and ControlPersist options), so collecting
+logs from a large cluster takes about as long as collecting them from one machine. Commands that
+fail are retried, and a summary of what was copied (and what couldn't be) is printed at the end.
+
+Files can also be synced incrementally: a manifest in the local directory records the remote path,
+size, modification time, and checksum of each file that was copied, so files that haven't changed
+aren't copied again, and a file that was partially copied is resumed where it left off.
+
+The ssh and scp commands can be replaced (e.g., with scripts that run the commands on the local
+machine), to try out the collector without a cluster.
+"""
+
+import hashlib
+import json
+from multiprocessing.pool import ThreadPool
+from optparse import OptionParser
+import os
+from os import path
+import pipes
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_NUM_THREADS = 16
+DEFAULT_ATTEMPTS = 3
+# Seconds to wait before retrying a failed command; doubles after each failure.
+DEFAULT_RETRY_DELAY_SECONDS = 1
+# Seconds that each host's shared SSH connection stays open after its last command finishes.
+CONTROL_PERSIST_SECONDS = 60
+
+LATEST_EVENT_LOG_COMMAND = "ls -t /tmp/spark-events | head -n 1"
+LATEST_CONTINUOUS_MONITOR_COMMAND = "ls -t /tmp/ | grep continuous_monitor | head -n 1"
+MANIFEST_FILENAME = "log_manifest.json"
+# Suffix added to the name of a file while it's being copied.
+PARTIAL_SUFFIX = ".part"
+
+
+class Manifest(object):
+  """ A record of the files that have been copied to a local directory, stored in a JSON file.
+
+  The record for each file is a dictionary with the file's size and modification time (in seconds
+  since the epoch) on the remote host, its MD5 checksum (None until the copy is finished), the local
+  file it was copied to, and whether the copy is complete.
+  """
+
+  def __init__(self, filename):
+    self.filename = filename
+    self.__lock = threading.Lock()
+    self.__key_to_record = {}
+    if path.exists(filename):
+      with open(filename, "r") as manifest_file:
+        self.__key_to_record = json.load(manifest_file)
+
+  def get(self, host, remote_file):
+    """ Returns the record for remote_file on host, or None if the file hasn't been copied. """
+    with self.__lock:
+      return self.__key_to_record.get(self.__get_key(host, remote_file))
+
+  def set(self, host, remote_file, size, mtime, checksum, local_file, complete):
+    """ Saves the record for remote_file on host. """
+    with self.__lock:
+      self.__key_to_record[self.__get_key(host, remote_file)] = {
+        "size": size,
+        "mtime": mtime,
+        "checksum": checksum,
+        "local_file": local_file,
+        "complete": complete,
+      }
+      # Write a new file and then rename it, so that the manifest isn't corrupted if this is
+      # interrupted.
+      temp_filename = self.filename + PARTIAL_SUFFIX
+      with open(temp_filename, "w") as manifest_file:
+        json.dump(self.__key_to_record, manifest_file, indent=2, sort_keys=True)
+      os.rename(temp_filename, self.filename)
+
+  def __get_key(self, host, remote_file):
+    return "{}:{}".format(host, remote_file)
+
+
+def get_checksum(filename):
+  """ Returns the MD5 checksum of the given file, as a hex string (like the output of md5sum). """
+  md5 = hashlib.md5()
+  with open(filename, "rb") as f:
+    for block in iter(lambda: f.read(1024 * 1024), ""):
+      md5.update(block)
+  return md5.hexdigest()
+
+
+class LogCollector(object):
+  """ Runs ssh and scp commands on many hosts at once, reusing one SSH connection per host. """
+
+  def __init__(self, identity_file, username="root", num_threads=DEFAULT_NUM_THREADS,
+      attempts=DEFAULT_ATTEMPTS, retry_delay_seconds=DEFAULT_RETRY_DELAY_SECONDS,
+      ssh_command="ssh", scp_command="scp"):
+    self.identity_file = identity_file
+    self.username = username
+    self.num_threads = num_threads
+    self.attempts = attempts
+    self.retry_delay_seconds = retry_delay_seconds
+    self.ssh_command = ssh_command
+    self.scp_command = scp_command
+    # The sockets for the shared connections go in a new directory with a short name, because the
+    # length of a socket's path is limited.
+    self.__control_dir = tempfile.mkdtemp(prefix="ssh-")
+    # Hosts whose shared connection is open.
+    self.__connected_hosts = set()
+    self.__host_to_lock = {}
+    self.__lock = threading.Lock()
+
+  def get_ssh_options(self, control_master="no"):
+    """ Returns the options to pass to ssh and scp.
+
+    By default, commands use the host's shared connection if it's open, and otherwise connect on
+    their own (only the command that opens the shared connection sets control_master, because the
+    process that keeps the connection open holds on to that command's output pipes).
+    """
+    return [
+      "-o", "StrictHostKeyChecking=no",
+      "-o", "BatchMode=yes",
+      "-o", "ControlMaster={}".format(control_master),
+      "-o", "ControlPath={}".format(path.join(self.__control_dir, "%r@%h:%p")),
+      "-o", "ControlPersist={}".format(CONTROL_PERSIST_SECONDS),
+      "-i", self.identity_file,
+    ]
+
+  def get_ssh_command(self, host, command):
+    """ Returns the arguments to run command on host with ssh. """
+    if "ec2" in host:
+      command = "source /root/.bash_profile; {}".format(command)
+    return [self.ssh_command] + self.get_ssh_options() + [
+      "{}@{}".format(self.username, host), command]
+
+  def ssh_get_stdout(self, host, command):
+    """ Runs command on host and returns its output, retrying if ssh fails.
+
+    Raises a subprocess.CalledProcessError if the command fails on every attempt.
+    """
+    return self.__run(host, self.get_ssh_command(host, command))
+
+  def scp_from(self, host, remote_file, local_file):
+    """ Copies remote_file on host to local_file, retrying if scp fails.
+
+    Raises a subprocess.CalledProcessError if the copy fails on every attempt.
+    """
+    self.__run(host, [self.scp_command, "-q"] + self.get_ssh_options() +
+      ["{}@{}:{}".format(self.username, host, remote_file), local_file])
+
+  def scp_to(self, host, local_file, remote_file):
+    """ Copies local_file to remote_file on host, retrying if scp fails.
+
+    Raises a subprocess.CalledProcessError if the copy fails on every attempt.
+    """
+    self.__run(host, [self.scp_command, "-q"] + self.get_ssh_options() +
+      [local_file, "{}@{}:{}".format(self.username, host, remote_file)])
+
+  def __connect(self, host):
+    """ Opens the shared connection to host, if it isn't already open. """
+    with self.__lock:
+      host_lock = self.__host_to_lock.setdefault(host, threading.Lock())
+    with host_lock:
+      if host in self.__connected_hosts:
+        return
+      with open(os.devnull, "w") as devnull:
+        returncode = subprocess.call([self.ssh_command] + self.get_ssh_options("auto") +
+          ["{}@{}".format(self.username, host), "true"], stdout=devnull, stderr=devnull)
+      if returncode == 0:
+        self.__connected_hosts.add(host)
+
+  def __run_once(self, host, command, stdout=subprocess.PIPE):
+    """ Runs command once, and returns a (return code, stdout, stderr) tuple. """
+    self.__connect(host)
+    process = subprocess.Popen(command, stdout=stdout, stderr=subprocess.PIPE)
+    output, stderr = process.communicate()
+    if process.returncode != 0:
+      # Reopen the shared connection for the next command, in case it was closed.
+      with self.__lock:
+        self.__connected_hosts.discard(host)
+    return (process.returncode, output, stderr.strip())
+
+  def __run(self, host, command):
+    for attempt in range(self.attempts):
+      returncode, stdout, stderr = self.__run_once(host, command)
+      if returncode == 0:
+        return stdout
+      self.__wait_to_retry(host, attempt, stderr)
+    raise subprocess.CalledProcessError(returncode, " ".join(command), stderr)
+
+  def __wait_to_retry(self, host, attempt, error):
+    if attempt + 1 < self.attempts:
+      self.__print("Retrying on {} (attempt {} failed): {}".format(host, attempt + 1, error))
+      time.sleep(self.retry_delay_seconds * 2 ** attempt)
+
+  def __print(self, message):
+    with self.__lock:
+      print message
+      sys.stdout.flush()
+
+  def run_all(self, tasks):
+    """ Runs each of the given (description, function, args) tasks using a pool of threads.
+
+    A task that fails doesn't stop the other tasks. Prints the progress as tasks finish, followed
+    by a summary, and returns a (description to result, description to error) tuple, where the
+    results are the values returned by the tasks that succeeded and the errors describe why the
+    others failed.
+    """
+    description_to_result = {}
+    description_to_error = {}
+    if not tasks:
+      return (description_to_result, description_to_error)
+    start = time.time()
+
+    def run_task(task):
+      description, function, args = task
+      try:
+        result = function(*args)
+      except Exception as e:
+        error = getattr(e, "output", None) or str(e)
+        with self.__lock:
+          description_to_error[description] = error
+          finished = len(description_to_result) + len(description_to_error)
+        self.__print("[{}/{}] FAILED {}: {}".format(finished, len(tasks), description, error))
+        return
+      with self.__lock:
+        description_to_result[description] = result
+        finished = len(description_to_result) + len(description_to_error)
+      self.__print("[{}/{}] {} ({:.1f}s)".format(
+        finished, len(tasks), description, time.time() - start))
+
+    pool = ThreadPool(min(self.num_threads, len(tasks)))
+    try:
+      pool.map(run_task, tasks)
+    finally:
+      pool.close()
+      pool.join()
+
+    print "Finished {} of {} tasks in {:.1f}s".format(
+      len(description_to_result), len(tasks), time.time() - start)
+    for description, error in sorted(description_to_error.iteritems()):
+      print "  FAILED {}: {}".format(description, error)
+    return (description_to_result, description_to_error)
+
+  def copy_latest_file(self, host, list_command, remote_dir, local_file):
+    """ Copies the file in remote_dir on host that's named by the output of list_command (which
+    should print a filename relative to remote_dir) to local_file, and returns local_file. """
+    remote_filename = self.ssh_get_stdout(host, list_command).strip()
+    if not remote_filename:
+      raise Exception("No file found in {} on {}".format(remote_dir, host))
+    self.scp_from(host, path.join(remote_dir, remote_filename), local_file)
+    return local_file
+
+  def copy_logs(self, driver_host, executor_hosts, filename_prefix):
+    """ Copies the latest event log from driver_host and the latest continuous monitor from each
+    of executor_hosts, all at once.
+
+    The event log is copied to <filename_prefix>_event_log, and the continuous monitor from each
+    executor is copied to <filename_prefix>_<host>_executor_monitor. Returns a (local event log,
+    host to local continuous monitor) tuple; the dictionary only includes the continuous monitors
+    that were copied. Raises an exception if the event log couldn't be copied.
+    """
+    event_log_description = "event log from {}".format(driver_host)
+    local_event_log_file = "{}_event_log".format(filename_prefix)
+    tasks = [(event_log_description, self.copy_latest_file,
+      (driver_host, LATEST_EVENT_LOG_COMMAND, "/tmp/spark-events", local_event_log_file))]
+    description_to_host = {}
+    for host in executor_hosts:
+      description = "continuous monitor from {}".format(host)
+      description_to_host[description] = host
+      tasks.append((description, self.copy_latest_file, (host, LATEST_CONTINUOUS_MONITOR_COMMAND,
+        "/tmp", "{}_{}_executor_monitor".format(filename_prefix, host))))
+
+    description_to_result, description_to_error = self.run_all(tasks)
+    if event_log_description in description_to_error:
+      raise Exception("Unable to copy the event log from {}: {}".format(
+        driver_host, description_to_error[event_log_description]))
+    host_to_monitor_file = {description_to_host[description]: local_file
+      for description, local_file in description_to_result.iteritems()
+      if description in description_to_host}
+    return (description_to_result[event_log_description], host_to_monitor_file)
+
+  def copy_files(self, host, remote_files, local_dir):
+    """ Copies each of remote_files from host to local_dir, all at once (over one connection).
+    Returns a list of the files that were copied. """
+    description_to_local_file = {}
+    tasks = []
+    for remote_file in remote_files:
+      description = "{} from {}".format(remote_file, host)
+      local_file = path.join(local_dir, path.basename(remote_file))
+      description_to_local_file[description] = local_file
+      tasks.append((description, self.scp_from, (host, remote_file, local_file)))
+    description_to_result, _ = self.run_all(tasks)
+    return sorted([description_to_local_file[description]
+      for description in description_to_result])
+
+  def get_file_stats(self, host, list_command):
+    """ Returns a list with a (path, size, modification time) tuple for each file listed by
+    list_command on host (which should print absolute paths, one per line), in the same order. """
+    output = self.ssh_get_stdout(host, "{} | xargs -r stat -c '%s %Y %n'".format(list_command))
+    file_stats = []
+    for line in output.strip().split("\n"):
+      if line.strip():
+        size, mtime, remote_file = line.strip().split(" ", 2)
+        file_stats.append((remote_file, int(size), int(mtime)))
+    return file_stats
+
+  def sync_files(self, host, list_command, local_dir):
+    """ Copies the files listed by list_command on host (see get_file_stats()) to local_dir, all at
+    once, and returns a list of the files that were copied.
+
+    Files that were already copied (according to the manifest in local_dir) and haven't changed
+    since are skipped, and files that were partially copied are resumed. Raises an exception if any
+    of the files couldn't be copied (after the others have been copied, so that calling this again
+    only copies the files that failed).
+    """
+    manifest = Manifest(path.join(local_dir, MANIFEST_FILENAME))
+    tasks = []
+    for remote_file, size, mtime in self.get_file_stats(host, list_command):
+      local_file = path.join(local_dir, path.basename(remote_file))
+      record = manifest.get(host, remote_file)
+      if (record is not None and record["complete"] and record["size"] == size and
+          record["mtime"] == mtime and path.exists(local_file) and
+          path.getsize(local_file) == size):
+        print "Skipping {} from {} (already copied)".format(remote_file, host)
+        continue
+      tasks.append(("{} from {}".format(remote_file, host), self.fetch_file,
+        (host, remote_file, size, mtime, local_file, manifest)))
+    description_to_result, description_to_error = self.run_all(tasks)
+    if description_to_error:
+      raise Exception("Unable to copy {} of {} files from {}: {}".format(
+        len(description_to_error), len(tasks), host, "; ".join(
+          "{} ({})".format(description, error)
+          for description, error in sorted(description_to_error.iteritems()))))
+    return sorted(description_to_result.itervalues())
+
+  def fetch_file(self, host, remote_file, size, mtime, local_file, manifest):
+    """ Copies remote_file (which has the given size and modification time) from host to
+    local_file, resuming a previous copy if the manifest shows that one was started, and returns
+    local_file.
+
+    The file is copied to local_file + PARTIAL_SUFFIX, and renamed once the copy is finished and
+    its checksum matches the remote file's.
+    """
+    partial_file = local_file + PARTIAL_SUFFIX
+    record = manifest.get(host, remote_file)
+    if (record is not None and not record["complete"] and record["size"] == size and
+        record["mtime"] == mtime and path.exists(partial_file) and
+        path.getsize(partial_file) <= size):
+      print "Resuming copy of {} from {} at byte {}".format(
+        remote_file, host, path.getsize(partial_file))
+    else:
+      open(partial_file, "w").close()
+      manifest.set(host, remote_file, size, mtime, None, local_file, False)
+
+    for attempt in range(self.attempts):
+      offset = path.getsize(partial_file)
+      if offset >= size:
+        break
+      # Append the rest of the file to what's been copied so far.
+      command = self.get_ssh_command(
+        host, "tail -c +{} {}".format(offset + 1, pipes.quote(remote_file)))
+      with open(partial_file, "ab") as f:
+        returncode, _, stderr = self.__run_once(host, command, stdout=f)
+      if returncode == 0:
+        break
+      self.__wait_to_retry(host, attempt, stderr)
+    else:
+      raise subprocess.CalledProcessError(returncode, " ".join(command), stderr)
+
+    remote_checksum = self.ssh_get_stdout(
+      host, "md5sum {}".format(pipes.quote(remote_file))).split()[0]
+    checksum = get_checksum(partial_file)
+    if checksum != remote_checksum:
+      # Start over next time.
+      os.remove(partial_file)
+      manifest.set(host, remote_file, size, mtime, None, local_file, False)
+      raise Exception("Copy of {} from {} has checksum {}, but the original has checksum {}".format(
+        remote_file, host, checksum, remote_checksum))
+    os.rename(partial_file, local_file)
+    manifest.set(host, remote_file, size, mtime, checksum, local_file, True)
+    return local_file
+
+  def close(self):
+    """ Closes the shared SSH connections. """
+    for host in self.__connected_hosts:
+      subprocess.call([self.ssh_command] + self.get_ssh_options() +
+        ["-O", "exit", "{}@{}".format(self.username, host)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    self.__connected_hosts = set()
+    shutil.rmtree(self.__control_dir, ignore_errors=True)
+
+
+def main(argv):
+  parser = OptionParser(usage="usage: %prog [options] executor_host...")
+  parser.add_option(
+    "-d", "--driver-host", help="Hostname of driver")
+  parser.add_option(
+    "-f", "--filename-prefix", help="Filename prefix to use for files copied back")
+  parser.add_option(
+    "-u", "--username", default="root", help="Username to user when logging in")
+  parser.add_option(
+    "-i", "--identity-file", help="Identity file to use when logging in")
+  parser.add_option(
+    "--executors-file",
+    help="File with the executor hostnames (one per line), in addition to any given as arguments")
+  parser.add_option(
+    "-n", "--num-threads", type="int", default=DEFAULT_NUM_THREADS,
+    help="Number of hosts to copy logs from at once")
+  parser.add_option(
+    "-a", "--attempts", type="int", default=DEFAULT_ATTEMPTS,
+    help="Number of times to try each ssh or scp command")
+  parser.add_option(
+    "--ssh-command", default="ssh", help="Command to use instead of ssh")
+  parser.add_option(
+    "--scp-command", default="scp", help="Command to use instead of scp")
+  (opts, args) = parser.parse_args(argv)
+
+  if not opts.driver_host:
+    parser.error("--driver-host must be specified")
+  if not opts.identity_file:
+    parser.error("--identity-file must be specified")
+  if not opts.filename_prefix:
+    parser.error("--filename-prefix must be specified")
+  executor_hosts = list(args)
+  if opts.executors_file:
+    with open(opts.executors_file, "r") as executors_file:
+      executor_hosts.extend([line.strip() for line in executors_file if line.strip()])
+
+  collector = LogCollector(opts.identity_file, opts.username, opts.num_threads, opts.attempts,
+    ssh_command=opts.ssh_command, scp_command=opts.scp_command)
+  try:
+    return collector.copy_logs(opts.driver_host, executor_hosts, opts.filename_prefix)
+  finally:
+    collector.close()
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -0,0 +1,126 @@
+"""
+This file contains functions to read logs that are compressed, or that are inside a tar archive,
+without first extracting them to disk.
+
+A log inside an archive is named by the archive's path followed by the member's name within the
+archive (e.g., "experiment_log_1.tar.gz/mnt/experiment_log_1/event_log"). The log is decompressed
+as it's read, and the archive is only read up to the end of the member being read, without
+extracting the other members.
+"""
+
+import bz2
+import gzip
+import os
+from os import path
+import tarfile
+
+# Suffixes of the tar archives that can contain logs.
+TAR_SUFFIXES = [".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2"]
+# Number of bytes of a compressed log that are decompressed at once.
+BLOCK_SIZE = 1024 * 1024
+
+
+def split_archive_path(filename):
+  """ Returns an (archive path, member name) tuple if filename names a member of a tar archive,
+  and (None, None) otherwise. """
+  if path.exists(filename):
+    return (None, None)
+  parts = path.normpath(filename).split(os.sep)
+  for i in xrange(1, len(parts)):
+    archive = os.sep.join(parts[:i]) or os.sep
+    if any(archive.endswith(suffix) for suffix in TAR_SUFFIXES) and path.isfile(archive):
+      return (archive, "/".join(parts[i:]))
+  return (None, None)
+
+
+def is_plain_file(filename):
+  """ Returns true if the given log is an uncompressed file (so it can be seeked within). """
+  return (split_archive_path(filename)[0] is None and
+    not filename.endswith(".gz") and not filename.endswith(".bz2"))
+
+
+def get_output_prefix(filename):
+  """ Returns the prefix to use for the files that describe the given log.
+
+  This is the log's filename, except for logs inside archives, where it's the name of the member
+  (with each "/" replaced by "_") in the archive's directory.
+  """
+  archive, member = split_archive_path(filename)
+  if archive is None:
+    return filename
+  return path.join(path.dirname(archive), member.replace("/", "_"))
+
+
+def open_log(filename):
+  """ Opens the given log for reading, and returns a file-like object that can be iterated over
+  to get the log's lines.
+
+  Logs whose names end in .gz or .bz2 are decompressed, and logs inside tar archives (see
+  split_archive_path) are read directly from the archive; other logs are opened as normal files.
+  Raises an IOError if the log doesn't exist.
+  """
+  archive, member = split_archive_path(filename)
+  if archive is not None:
+    return _open_archive_member(archive, member)
+  if filename.endswith(".gz"):
+    return CompressedLog(gzip.GzipFile(filename, "rb"))
+  if filename.endswith(".bz2"):
+    return CompressedLog(bz2.BZ2File(filename, "rb"))
+  return open(filename, "r")
+
+
+def _open_archive_member(archive, member):
+  # Open the archive as a stream, so that it's read once from the beginning, and stop at the
+  # member being read.
+  tar = tarfile.open(archive, "r|*")
+  try:
+    for tar_info in tar:
+      name = tar_info.name
+      if name.startswith("./"):
+        name = name[len("./"):]
+      if name == member and tar_info.isfile():
+        return CompressedLog(tar.extractfile(tar_info), [tar])
+  except:
+    tar.close()
+    raise
+  tar.close()
+  raise IOError("No file named {} in {}".format(member, archive))
+
+
+class CompressedLog(object):
+  """ A log that's decompressed as it's read.
+
+  Iterating over the log returns its lines (with their newlines), like iterating over a file. The
+  decompressed data is read in large blocks and split into lines here, which is much faster than
+  the line-at-a-time methods of the gzip and tarfile file objects.
+  """
+
+  def __init__(self, fileobj, resources=None):
+    """ fileobj is the file object that returns the decompressed data, and resources are other
+    objects (e.g., the tar archive that fileobj reads from) to close when the log is closed. """
+    self.fileobj = fileobj
+    self.resources = resources or []
+
+  def __iter__(self):
+    remainder = ""
+    while True:
+      block = self.fileobj.read(BLOCK_SIZE)
+      if not block:
+        break
+      lines = (remainder + block).split("\n")
+      remainder = lines.pop()
+      for line in lines:
+        yield line + "\n"
+    if remainder:
+      yield remainder
+
+  def close(self):
+    self.fileobj.close()
+    for resource in self.resources:
+      resource.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
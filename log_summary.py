@@ -0,0 +1,268 @@
+"""
+This file contains an agent that summarizes an event log and a continuous monitor on the machine
+where they were written, so that only the summary (which is much smaller than the logs) needs to be
+copied back.
+
+The summary of an event log has the aggregates that the Analyzer keeps for each stage when it
+parses a log in streaming mode (see stage_summary.StageSummary), and the summary of a continuous
+monitor has the time-weighted averages of buckets of its samples (see
+downsample.get_time_weighted_means), so the utilizations computed from it are the same as from the
+monitor, apart from windows that start or end in the middle of a bucket. A summary file can be
+passed to the Analyzer (and to plot_continuous_monitor) in place of the log it summarizes.
+
+The agent is copied to remote machines as a single zip file that has this file and the other files
+in this directory that it uses, and that Python can run as a script, so the remote machine only
+needs Python and NumPy. To summarize logs on the local machine (e.g., to try out the agent), run
+this file directly:
+
+    python log_summary.py -e <event log> -m <continuous monitor> -o <summary file>
+
+Summaries are pickled, so they should only be loaded from machines that are trusted.
+"""
+
+import cPickle
+import modulefinder
+from optparse import OptionParser
+from os import path
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+import zlib
+
+import log_collector
+import log_files
+
+MAGIC = "MONOTASKS LOG SUMMARY\n"
+# Should be incremented whenever the format of the summary (or of the objects it contains)
+# changes, so that summaries written by an older agent aren't misread.
+VERSION = 4
+SUMMARY_SUFFIX = ".summary"
+# Maximum number of (averaged) continuous monitor samples to keep in a summary.
+DEFAULT_MAX_MONITOR_POINTS = 2000
+# Where the agent is copied to on remote machines.
+REMOTE_AGENT_FILENAME = "/tmp/log_summary_agent.zip"
+# Run when Python runs the agent's zip file.
+AGENT_MAIN = "import sys\nimport log_summary\nlog_summary.main(sys.argv[1:])\n"
+
+
+class LogSummary(object):
+  """ A summary of an event log and a continuous monitor (either of which can be missing). """
+
+  def __init__(self):
+    self.event_log_filename = None
+    # A (job starts, stage segments, skipped event counts) tuple, as returned by
+    # parse_event_logs.summarize_events, or None if no event log was summarized. Each stage
+    # segment has the aggregates of the tasks from one stage between two job starts, so that the
+    # Analyzer can give each job the same tasks as when it parses the event log.
+    self.event_log_summary = None
+    self.continuous_monitor_filename = None
+    # A downsampled continuous_monitor.ContinuousMonitor, or None if no continuous monitor was
+    # summarized.
+    self.continuous_monitor = None
+
+
+def summarize(event_log_filename=None, continuous_monitor_filename=None,
+    max_monitor_points=DEFAULT_MAX_MONITOR_POINTS):
+  """ Returns a LogSummary of the given logs (which can be compressed, or inside a tar archive; see
+  log_files.open_log). If max_monitor_points is None, every continuous monitor sample is kept. """
+  # parse_event_logs imports this file, so it's imported here (along with the modules that use
+  # NumPy, so that scripts that only load summaries don't import them).
+  import numpy
+  import continuous_monitor
+  import downsample
+  import parse_event_logs
+  summary = LogSummary()
+  if event_log_filename is not None:
+    summary.event_log_filename = event_log_filename
+    with log_files.open_log(event_log_filename) as event_log:
+      summary.event_log_summary = parse_event_logs.summarize_events(event_log)
+  if continuous_monitor_filename is not None:
+    summary.continuous_monitor_filename = continuous_monitor_filename
+    monitor = continuous_monitor.parse(continuous_monitor_filename)
+    if max_monitor_points is not None:
+      monitor = downsample.downsample(monitor, max_monitor_points, downsample.MEAN)
+    # Copy just the samples, so the space allocated for more samples isn't included.
+    summary.continuous_monitor = monitor.take(numpy.arange(monitor.num_samples))
+  return summary
+
+
+def dumps(summary):
+  """ Returns the summary as a string: MAGIC, VERSION, and the compressed, pickled attributes of
+  the LogSummary. """
+  # The attributes are pickled rather than the LogSummary, so that summaries written when this
+  # file is run as a script (where the class is __main__.LogSummary) can be loaded elsewhere.
+  return (MAGIC + struct.pack("<I", VERSION) +
+    zlib.compress(cPickle.dumps(summary.__dict__, cPickle.HIGHEST_PROTOCOL)))
+
+
+def loads(data):
+  """ Returns the LogSummary in a string returned by dumps().
+
+  Anything before MAGIC (e.g., output printed by the remote shell) or after the end of the
+  compressed data is ignored. Raises a ValueError if data doesn't have a summary from this version.
+  """
+  start = data.find(MAGIC)
+  if start == -1:
+    raise ValueError("Data does not include a log summary")
+  version_start = start + len(MAGIC)
+  version = struct.unpack("<I", data[version_start:version_start + 4])[0]
+  if version != VERSION:
+    raise ValueError("Log summary is from version {} (expected version {})".format(
+      version, VERSION))
+  summary = LogSummary()
+  summary.__dict__.update(
+    cPickle.loads(zlib.decompressobj().decompress(data[version_start + 4:])))
+  return summary
+
+
+def write(summary, filename):
+  with open(filename, "wb") as summary_file:
+    summary_file.write(dumps(summary))
+
+
+def load(filename):
+  with open(filename, "rb") as summary_file:
+    return loads(summary_file.read())
+
+
+def is_summary_file(filename):
+  """ Returns true if the given file is a summary written by this file (rather than a log). """
+  if not log_files.is_plain_file(filename) or not path.isfile(filename):
+    return False
+  with open(filename, "rb") as f:
+    return f.read(len(MAGIC)) == MAGIC
+
+
+def load_continuous_monitor(filename):
+  """ Returns a continuous_monitor.ContinuousMonitor with the samples from the given continuous
+  monitor log, or from the continuous monitor summarized in the given summary file. """
+  if not is_summary_file(filename):
+    import continuous_monitor
+    return continuous_monitor.parse(filename)
+  summary = load(filename)
+  if summary.continuous_monitor is None:
+    raise ValueError("{} does not summarize a continuous monitor".format(filename))
+  return summary.continuous_monitor
+
+
+def write_agent_bundle(bundle_filename):
+  """ Writes a zip file with this file and the other files in this directory that it uses, which
+  Python can run as a script (with the same arguments as this file). """
+  scripts_dir = path.dirname(path.abspath(__file__))
+  # The finder only looks for modules in this directory, and treats others (e.g., the standard
+  # library and NumPy, which should already be installed) as missing.
+  finder = modulefinder.ModuleFinder(path=[scripts_dir])
+  finder.run_script(path.join(scripts_dir, "log_summary.py"))
+  # Built-in modules don't have a file, and this file is found twice (as __main__ and as
+  # log_summary, which parse_event_logs imports).
+  module_files = set(module.__file__ for module in finder.modules.itervalues()
+    if module.__file__ is not None)
+  with zipfile.ZipFile(bundle_filename, "w", zipfile.ZIP_DEFLATED) as bundle:
+    bundle.writestr("__main__.py", AGENT_MAIN)
+    for module_file in sorted(module_files):
+      bundle.write(module_file, path.basename(module_file))
+
+
+def summarize_remote_logs(collector, host, bundle_filename, agent_args, local_file):
+  """ Copies the agent to host, runs it there with agent_args (which is interpreted by the remote
+  shell, so it can include commands that find the logs), and writes the summary to local_file.
+
+  collector is the log_collector.LogCollector used to run the ssh and scp commands. Returns
+  local_file.
+  """
+  collector.scp_to(host, bundle_filename, REMOTE_AGENT_FILENAME)
+  output = collector.ssh_get_stdout(
+    host, "python {} {}".format(REMOTE_AGENT_FILENAME, agent_args))
+  write(loads(output), local_file)
+  return local_file
+
+
+def summarize_cluster_logs(collector, driver_host, executor_hosts, filename_prefix,
+    max_monitor_points=DEFAULT_MAX_MONITOR_POINTS):
+  """ Summarizes the latest event log on driver_host and the latest continuous monitor on each of
+  executor_hosts (on the hosts themselves, all at once), and copies back the summaries.
+
+  This is an alternative to log_collector.LogCollector.copy_logs. The event log's summary is
+  written to <filename_prefix>_event_log.summary, and each executor's continuous monitor summary is
+  written to <filename_prefix>_<host>_executor_monitor.summary. Returns a (local event log summary,
+  host to local continuous monitor summary) tuple; the dictionary only includes the continuous
+  monitor summaries that were copied. Raises an exception if the event log couldn't be summarized.
+  If max_monitor_points is None, every continuous monitor sample is kept.
+  """
+  bundle_dir = tempfile.mkdtemp()
+  try:
+    bundle_filename = path.join(bundle_dir, path.basename(REMOTE_AGENT_FILENAME))
+    write_agent_bundle(bundle_filename)
+    if max_monitor_points is None:
+      points_arg = "--all-points"
+    else:
+      points_arg = "-p {}".format(max_monitor_points)
+
+    event_log_description = "event log summary from {}".format(driver_host)
+    local_event_log_file = "{}_event_log{}".format(filename_prefix, SUMMARY_SUFFIX)
+    event_log_args = "-e \"/tmp/spark-events/$({})\"".format(
+      log_collector.LATEST_EVENT_LOG_COMMAND)
+    tasks = [(event_log_description, summarize_remote_logs,
+      (collector, driver_host, bundle_filename, event_log_args, local_event_log_file))]
+    description_to_host = {}
+    monitor_args = "-m \"/tmp/$({})\" {}".format(
+      log_collector.LATEST_CONTINUOUS_MONITOR_COMMAND, points_arg)
+    for host in executor_hosts:
+      description = "continuous monitor summary from {}".format(host)
+      description_to_host[description] = host
+      local_file = "{}_{}_executor_monitor{}".format(filename_prefix, host, SUMMARY_SUFFIX)
+      tasks.append((description, summarize_remote_logs,
+        (collector, host, bundle_filename, monitor_args, local_file)))
+
+    description_to_result, description_to_error = collector.run_all(tasks)
+  finally:
+    shutil.rmtree(bundle_dir, ignore_errors=True)
+  if event_log_description in description_to_error:
+    raise Exception("Unable to summarize the event log on {}: {}".format(
+      driver_host, description_to_error[event_log_description]))
+  host_to_monitor_file = {description_to_host[description]: local_file
+    for description, local_file in description_to_result.iteritems()
+    if description in description_to_host}
+  return (description_to_result[event_log_description], host_to_monitor_file)
+
+
+def main(argv):
+  parser = OptionParser(usage="usage: %prog [options]")
+  parser.add_option(
+    "-e", "--event-log", help="Event log to summarize")
+  parser.add_option(
+    "-m", "--continuous-monitor", help="Continuous monitor log to summarize")
+  parser.add_option(
+    "-p", "--max-points", type="int", default=DEFAULT_MAX_MONITOR_POINTS,
+    help="Maximum number of (averaged) continuous monitor samples to keep")
+  parser.add_option(
+    "-a", "--all-points", action="store_true", default=False,
+    help="Keep every continuous monitor sample, rather than averaging them (overrides -p)")
+  parser.add_option(
+    "-o", "--output", help="File to write the summary to (by default, it's written to stdout)")
+  parser.add_option(
+    "-b", "--bundle", help="Write the agent's zip file to the given file, rather than summarizing")
+  (opts, args) = parser.parse_args(argv)
+
+  if opts.bundle:
+    write_agent_bundle(opts.bundle)
+    return
+  if not opts.event_log and not opts.continuous_monitor:
+    parser.error("--event-log or --continuous-monitor must be specified")
+  max_points = None
+  if not opts.all_points:
+    import downsample
+    if opts.max_points < downsample.MIN_POINTS:
+      parser.error("--max-points must be at least {}".format(downsample.MIN_POINTS))
+    max_points = opts.max_points
+  summary = summarize(opts.event_log, opts.continuous_monitor, max_points)
+  if opts.output:
+    write(summary, opts.output)
+  else:
+    sys.stdout.write(dumps(summary))
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+  main(sys.argv[1:])
@@ -1,6 +1,8 @@
 import subprocess
 import sys
 
+import gnuplot_session
+
 def main(argv):
   if len(argv) < 1:
     print "Usage: make_utilization_box_whiskers.py event_log_filename"
@@ -19,7 +21,7 @@ def main(argv):
   output_plot_file.close()
 
   # Make the plot.
-  subprocess.check_call("gnuplot %s" % output_plot_filename, shell=True)
+  gnuplot_session.plot(output_plot_filename)
   subprocess.check_call("open %s.pdf" % output_prefix, shell=True)
 
 
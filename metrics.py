@@ -190,8 +190,71 @@ class ExecutorResourceMetrics(object):
     during the time period from when the first task started running on the
     executor until the last task finished on the executor.
     """
-    first_task_to_start = sorted(tasks, key=lambda task: task.start_time)[0]
-    last_task_to_finish = sorted(tasks, key=lambda task: task.finish_time)[-1]
+    # Break ties in the same way as a stable sort by time would: the earliest task in the list
+    # wins for the start time, and the latest one wins for the finish time.
+    first_task_to_start = tasks[0]
+    last_task_to_finish = tasks[0]
+    for task in tasks:
+      if task.start_time < first_task_to_start.start_time:
+        first_task_to_start = task
+      if task.finish_time >= last_task_to_finish.finish_time:
+        last_task_to_finish = task
+    return ExecutorResourceMetrics.get_resource_metrics_for_task_range(
+      first_task_to_start=first_task_to_start,
+      last_task_to_finish=last_task_to_finish,
+      num_tasks=len(tasks),
+      hdfs_deser_decomp_millis=sum([t.hdfs_deser_decomp_millis for t in tasks]),
+      hdfs_ser_comp_millis=sum([t.hdfs_ser_comp_millis for t in tasks]))
+
+  @staticmethod
+  def get_resource_metrics_for_task_table(task_table):
+    """Creates an ExecutorResourceMetrics object for each executor that ran the provided tasks.
+
+    task_table should be a task_table.TaskTable describing the tasks. Returns a mapping from
+    executor id to the same ExecutorResourceMetrics that get_resource_metrics_for_executor_tasks
+    would return for the executor's tasks, but finds the first and last task on every executor,
+    and the executors' HDFS (de)serialization totals, with one vectorized pass over the table. Only
+    the first and last tasks are created (as views of their rows).
+    """
+    # NumPy is imported here, rather than when this file is imported, because this file is
+    # imported (through task) by scripts that don't otherwise need NumPy.
+    import numpy
+    columns = task_table.columns
+    executor_indices = columns["executor_index"]
+    row_indices = numpy.arange(len(task_table))
+    # Sort the rows by executor, then by time, then by position, so that each executor's first
+    # task to start begins its group and its last task to finish ends its group (with ties broken
+    # in the same way as get_resource_metrics_for_executor_tasks).
+    start_order = numpy.lexsort((row_indices, columns["start_time"], executor_indices))
+    finish_order = numpy.lexsort((row_indices, columns["finish_time"], executor_indices))
+    _, offsets = task_table.get_executor_groups()
+    first_rows = start_order[offsets[:-1]]
+    last_rows = finish_order[offsets[1:] - 1]
+    return {executor_id: ExecutorResourceMetrics.get_resource_metrics_for_task_range(
+        first_task_to_start=task_table.get_task(first_row),
+        last_task_to_finish=task_table.get_task(last_row),
+        num_tasks=num_tasks,
+        hdfs_deser_decomp_millis=hdfs_deser_decomp_millis,
+        hdfs_ser_comp_millis=hdfs_ser_comp_millis)
+      for executor_id, first_row, last_row, num_tasks, hdfs_deser_decomp_millis,
+        hdfs_ser_comp_millis in zip(
+          task_table.executor_ids,
+          first_rows.tolist(),
+          last_rows.tolist(),
+          task_table.get_executor_task_counts().tolist(),
+          task_table.sum_by_executor("hdfs_deser_decomp_millis").tolist(),
+          task_table.sum_by_executor("hdfs_ser_comp_millis").tolist())}
+
+  @staticmethod
+  def get_resource_metrics_for_task_range(first_task_to_start, last_task_to_finish, num_tasks,
+      hdfs_deser_decomp_millis, hdfs_ser_comp_millis):
+    """Creates an ExecutorResourceMetrics object from the executor's first and last tasks.
+
+    The OS counters reported by the first task to start and the last task to finish on an executor
+    are sufficient to describe the executor's resource usage over that period, so callers that
+    aggregate tasks incrementally only need to keep those two tasks, the number of tasks, and the
+    total HDFS (de)serialization times.
+    """
     start_millis = first_task_to_start.start_time
     end_millis = last_task_to_finish.finish_time
     elapsed_millis = end_millis - start_millis
@@ -202,8 +265,8 @@ class ExecutorResourceMetrics(object):
       elapsed_millis=elapsed_millis,
       cpu_millis=cpu_millis,
       num_cores=8,
-      hdfs_deser_decomp_millis=sum([t.hdfs_deser_decomp_millis for t in tasks]),
-      hdfs_ser_comp_millis=sum([t.hdfs_ser_comp_millis for t in tasks])
+      hdfs_deser_decomp_millis=hdfs_deser_decomp_millis,
+      hdfs_ser_comp_millis=hdfs_ser_comp_millis
     )
 
     transmit_idle_millis = (last_task_to_finish.end_network_transmit_idle_millis -
@@ -228,7 +291,7 @@ class ExecutorResourceMetrics(object):
     return ExecutorResourceMetrics(
       start_millis=start_millis,
       end_millis=end_millis,
-      num_tasks=len(tasks),
+      num_tasks=num_tasks,
       cpu_metrics=cpu_metrics,
       network_metrics=network_metrics,
       disk_name_to_metrics=disk_name_to_metrics,
@@ -0,0 +1,159 @@
+"""
+This file contains functions to compute the actual utilization of each machine while a stage (or
+job) was running, by overlaying the time when the stage's tasks ran on each executor onto the
+continuous monitor from that executor's machine.
+
+Each continuous monitor sample describes the utilization since the previous sample, so each
+monitor is treated as a step function whose value over (t[i - 1], t[i]] is the value of sample i.
+Averages over a window are computed from prefix sums of the integral of that function, using a
+binary search to find where each end of the window falls, so joining W windows onto a monitor with
+N samples takes O(N + W log N) time.
+"""
+
+import numpy
+
+import weighted_percentiles
+
+# Resources whose utilization is computed from the continuous monitor.
+CPU = "cpu"
+NETWORK_RECEIVED = "network_recv"
+NETWORK_TRANSMITTED = "network_transmit"
+DISK = "disk"
+RESOURCES = [CPU, NETWORK_RECEIVED, NETWORK_TRANSMITTED, DISK]
+PERCENTILES = [0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class MonitorTimeSeries(object):
+  """ The utilization of each of the RESOURCES over time on one machine. """
+
+  def __init__(self, continuous_monitor):
+    """ Creates a MonitorTimeSeries from a continuous_monitor.ContinuousMonitor. """
+    self.times = continuous_monitor.get_column("time") + continuous_monitor.start_time
+    # The network columns are in gigabits per second, which is the utilization of a 1Gbps link.
+    self.resource_to_values = {
+      CPU: continuous_monitor.get_column("cpu utilization"),
+      NETWORK_RECEIVED: continuous_monitor.get_column("bytes received"),
+      NETWORK_TRANSMITTED: continuous_monitor.get_column("bytes transmitted"),
+      DISK: self.__get_mean_disk_utilization(continuous_monitor),
+    }
+    # The integral of each resource's utilization from the first sample to each sample.
+    durations = numpy.diff(self.times)
+    self.resource_to_integrals = {}
+    for resource, values in self.resource_to_values.iteritems():
+      integrals = numpy.zeros(len(self.times))
+      numpy.cumsum(values[1:] * durations, out=integrals[1:])
+      self.resource_to_integrals[resource] = integrals
+
+  def __get_mean_disk_utilization(self, continuous_monitor):
+    disks = continuous_monitor.get_disks()
+    if not disks:
+      return numpy.zeros(continuous_monitor.num_samples)
+    disk_utilizations = numpy.vstack([
+      numpy.nan_to_num(continuous_monitor.get_column("{} utilization".format(disk)))
+      for disk in disks])
+    return disk_utilizations.mean(axis=0)
+
+  def clip(self, start_times, end_times):
+    """ Returns the given windows (arrays of start and end times), restricted to the time that the
+    monitor describes. Windows outside of that time have the same start and end time. """
+    if len(self.times) == 0:
+      return (numpy.zeros(len(start_times)), numpy.zeros(len(end_times)))
+    start_times = numpy.clip(start_times, self.times[0], self.times[-1])
+    end_times = numpy.clip(end_times, start_times, self.times[-1])
+    return (start_times, end_times)
+
+  def get_integrals(self, resource, start_times, end_times):
+    """ Returns the integral of the given resource's utilization over each of the given windows,
+    which must already be clipped (using clip()). """
+    return (self.__get_integral_up_to(resource, end_times) -
+      self.__get_integral_up_to(resource, start_times))
+
+  def __get_integral_up_to(self, resource, times):
+    """ Returns the integral of the resource's utilization from the first sample to each time. """
+    times = numpy.asarray(times, dtype=numpy.float64)
+    if len(self.times) < 2:
+      # The monitor doesn't describe any time.
+      return numpy.zeros(len(times))
+    # The first sample whose time is at or after each time; the time falls in that sample's step.
+    samples = numpy.clip(
+      numpy.searchsorted(self.times, times, side="left"), 1, len(self.times) - 1)
+    integrals = self.resource_to_integrals[resource]
+    values = self.resource_to_values[resource]
+    return integrals[samples - 1] + values[samples] * (times - self.times[samples - 1])
+
+  def get_step_durations(self, start, end):
+    """ Returns a (samples, durations) tuple describing the steps that overlap the given window:
+    samples has the indices of the samples whose steps overlap the window, and durations has the
+    length of each overlap. """
+    first = numpy.searchsorted(self.times, start, side="right")
+    last = min(numpy.searchsorted(self.times, end, side="left"), len(self.times) - 1)
+    if first > last:
+      return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0))
+    samples = numpy.arange(first, last + 1)
+    durations = (numpy.minimum(self.times[samples], end) -
+      numpy.maximum(self.times[samples - 1], start))
+    return (samples, durations)
+
+
+class UtilizationSummary(object):
+  """ The time-averaged utilization of each resource over a set of windows on different machines,
+  and the distribution of the utilization during those windows. """
+
+  def __init__(self):
+    self.total_millis = 0
+    self.resource_to_integral = {resource: 0 for resource in RESOURCES}
+    self.resource_to_values = {resource: [] for resource in RESOURCES}
+    self.weights = []
+
+  def add_windows(self, time_series, start_times, end_times):
+    """ Adds the given windows (arrays of start and end times) on the machine described by the
+    given MonitorTimeSeries. """
+    start_times, end_times = time_series.clip(
+      numpy.asarray(start_times, dtype=numpy.float64),
+      numpy.asarray(end_times, dtype=numpy.float64))
+    self.total_millis += numpy.sum(end_times - start_times)
+    for resource in RESOURCES:
+      self.resource_to_integral[resource] += numpy.sum(
+        time_series.get_integrals(resource, start_times, end_times))
+    for start, end in zip(start_times, end_times):
+      samples, durations = time_series.get_step_durations(start, end)
+      self.weights.append(durations)
+      for resource in RESOURCES:
+        self.resource_to_values[resource].append(
+          time_series.resource_to_values[resource][samples])
+
+  def get_mean(self, resource):
+    """ Returns the time-averaged utilization of the resource, or NaN if no windows overlapped the
+    continuous monitors. """
+    if self.total_millis <= 0:
+      return float("nan")
+    return self.resource_to_integral[resource] / self.total_millis
+
+  def get_percentiles(self, resource):
+    """ Returns the utilization of the resource at each of PERCENTILES, weighting each sample by
+    the time it describes (see weighted_percentiles.get_weighted_percentiles). """
+    if self.total_millis <= 0:
+      return []
+    values, _ = weighted_percentiles.get_weighted_percentiles(
+      numpy.concatenate(self.resource_to_values[resource]), numpy.concatenate(self.weights),
+      PERCENTILES)
+    return values
+
+
+def get_utilization_summary(host_to_time_series, executor_id_to_window, executor_id_to_host):
+  """ Returns a UtilizationSummary describing the given windows.
+
+  executor_id_to_window should map executor ids to a (start time, finish time) tuple, and
+  executor_id_to_host should have the host of each executor. Executors on hosts without a
+  MonitorTimeSeries in host_to_time_series are ignored.
+  """
+  host_to_windows = {}
+  for executor_id, (start, finish) in executor_id_to_window.iteritems():
+    host = executor_id_to_host[executor_id]
+    if host in host_to_time_series:
+      host_to_windows.setdefault(host, []).append((start, finish))
+  summary = UtilizationSummary()
+  for host, windows in sorted(host_to_windows.iteritems()):
+    start_times, end_times = zip(*windows)
+    summary.add_windows(host_to_time_series[host], start_times, end_times)
+  return summary
@@ -1,104 +1,385 @@
 """
 This file contains utilities to parse the JSON event log output by Spark.
+
+Many scripts import this file, so the modules that store and analyze the parsed stages (which use
+NumPy) are imported by the functions that use them, rather than when this file is imported, so
+that the scripts start quickly (e.g., to print their --help message).
 """
 
 import collections
 import json
 import logging
-import numpy
+import multiprocessing
 from optparse import OptionParser
+import os
+import re
 import shuffle_job_filterer
 import sys
 
-import metrics
-from job import Job
+import log_files
+import log_summary
+import task_cache
+from task import Task
+
+# The only events used by the Analyzer. Other events (some of which, like
+# SparkListenerEnvironmentUpdate and SparkListenerStageSubmitted, are very large) are skipped
+# without decoding their JSON.
+PARSED_EVENT_TYPES = frozenset(["SparkListenerJobStart", "SparkListenerTaskEnd"])
+EVENT_TYPE_REGEX = re.compile(r'"Event"\s*:\s*"([^"\\]*)"')
 
 def get_json(line):
-  # Need to first strip the trailing newline, and then escape newlines (which can appear
-  # in the middle of some of the JSON) so that JSON library doesn't barf.
-  return json.loads(line.strip("\n").replace("\n", "\\n"))
+  # Newlines can appear in the middle of some of the JSON, and need to be escaped so that the JSON
+  # library doesn't barf. The JSON library ignores the trailing newline, so avoid copying the line
+  # when there aren't any others.
+  if line.find("\n", 0, len(line) - 1) != -1:
+    line = line.strip("\n").replace("\n", "\\n")
+  return json.loads(line)
+
+def get_event_type(line):
+  """ Returns the type of the event on the given line of the event log, without decoding the line.
+
+  Returns None if the line doesn't have an event type, in which case it should be decoded with
+  get_json to find out what's wrong with it.
+  """
+  match = EVENT_TYPE_REGEX.search(line)
+  if match is None:
+    return None
+  return match.group(1)
+
+def get_job_name(job_start_data):
+  """ Returns the name to use for the job started by the given SparkListenerJobStart event. """
+  # Use the name of the stage with the highest ID as the job's name (this seems to be
+  # what the Spark UI does).
+  max_stage_id = max([int(id) for id in job_start_data["Stage IDs"]])
+  for stage_info in job_start_data["Stage Infos"]:
+    if int(stage_info["Stage ID"]) == max_stage_id:
+      return stage_info["Stage Name"]
+
+def get_line_aligned_chunks(filename, num_chunks):
+  """ Splits the given file into (start offset, end offset) byte ranges that begin on a new line.
+
+  Returns at most num_chunks ranges, which together cover the whole file.
+  """
+  file_size = os.path.getsize(filename)
+  chunk_starts = [0]
+  with open(filename, "r") as f:
+    for i in xrange(1, num_chunks):
+      f.seek(max(i * file_size / num_chunks, chunk_starts[-1]))
+      # Skip to the beginning of the next line.
+      f.readline()
+      chunk_start = f.tell()
+      if chunk_start >= file_size:
+        break
+      if chunk_start > chunk_starts[-1]:
+        chunk_starts.append(chunk_start)
+  return zip(chunk_starts, chunk_starts[1:] + [file_size])
+
+def summarize_events(lines):
+  """ Parses the given lines of an event log, and returns compact results that are cheap to send
+  to another process (or machine): a list of (job id, job name, stage ids) tuples describing each
+  job that started, a list of (position, stage id, StageSummary) tuples describing the stages'
+  tasks, and a Counter with the number of events of each type that were skipped without being
+  decoded.
+
+  Each StageSummary describes a segment of the stage's tasks: a new segment is started whenever a
+  job that depends on the stage starts, because that job only includes the tasks that finish after
+  it starts (see Analyzer.__share_stages). The position of a segment is the number of the
+  job starts that were read before its first task, and the segments are in order of position.
+
+  This is used to parse each chunk of an event log that's parsed with multiple processes, and to
+  summarize event logs on the machine where they were written (see log_summary).
+  """
+  from stage_summary import StageSummary
+  job_starts = []
+  stage_segments = []
+  # For each stage, the StageSummary for the segment that the stage's next task is added to.
+  stage_id_to_summary = {}
+  skipped_event_counts = collections.Counter()
+  for line in lines:
+    event_type = get_event_type(line)
+    if event_type is not None and event_type not in PARSED_EVENT_TYPES:
+      skipped_event_counts[event_type] += 1
+      continue
+    try:
+      json_data = get_json(line)
+    except:
+      logging.getLogger("Analyzer").error("BAD DATA: %s" % line)
+      continue
+    event_type = json_data["Event"]
+    if event_type == "SparkListenerJobStart":
+      stage_ids = json_data["Stage IDs"]
+      job_starts.append((json_data["Job ID"], get_job_name(json_data), stage_ids))
+      for stage_id in stage_ids:
+        stage_id_to_summary.pop(stage_id, None)
+    elif event_type == "SparkListenerTaskEnd":
+      stage_id = json_data["Stage ID"]
+      if stage_id not in stage_id_to_summary:
+        stage_id_to_summary[stage_id] = StageSummary()
+        stage_segments.append((len(job_starts), stage_id, stage_id_to_summary[stage_id]))
+      stage_id_to_summary[stage_id].add_event(json_data)
+  return (job_starts, stage_segments, skipped_event_counts)
+
+def get_lines_in_range(f, start_offset, end_offset):
+  """ Yields the lines of f (which should be positioned at start_offset) that start before
+  end_offset. """
+  line_offset = start_offset
+  for line in f:
+    if line_offset >= end_offset:
+      break
+    line_offset += len(line)
+    yield line
+
+def parse_event_log_chunk(filename_and_chunk):
+  """ Parses the lines that start in the given byte range of an event log, and returns the
+  results of summarize_events.
+
+  This is used as the worker function when parsing an event log with multiple processes.
+  """
+  filename, (start_offset, end_offset) = filename_and_chunk
+  with open(filename, "r") as f:
+    f.seek(start_offset)
+    return summarize_events(get_lines_in_range(f, start_offset, end_offset))
 
 class Analyzer:
-  def __init__(self, filename, job_filterer = lambda x: x):
+  def __init__(self, filename, job_filterer = lambda x: x, streaming = False, num_processes = 1,
+      use_cache = True):
     """ The job_filterer function here accepts a dictionary mapping job ids to jobs, and returns
     a new dictionary mapping job_ids to jobs. It can be used to filter out particular jobs from
-    the set of jobs that are analyzed. """
+    the set of jobs that are analyzed.
+
+    If streaming is true, each stage keeps running aggregates rather than a Task object for every
+    task, so memory use does not grow with the number of tasks in the event log (see
+    stage_summary.StageSummary). All of the output_* reports are supported in either mode, and
+    give the same results, except that in streaming mode, the percentiles in the utilization
+    reports and the compute monotask CDFs of stages with more than a few thousand tasks are
+    approximate (to within 1%; see weighted_percentiles.WeightedHistogram).
+
+    If num_processes is greater than 1, the event log is split into chunks that are parsed in
+    parallel by a pool of num_processes worker processes. Parallel parsing always uses streaming
+    stages, because those are what the workers send back to be merged.
+
+    If use_cache is true, the stages are loaded from the columnar cache next to the event log (see
+    task_cache) when it is valid, rather than parsing the JSON. The cached stages keep every task
+    (in either mode), but their columns are memory-mapped, so they don't need to fit in memory.
+    When the cache is missing or out of date, a sequential, non-streaming parse writes a new one.
+
+    The event log can be compressed with gzip or bzip2, or be inside a tar archive (see
+    log_files.open_log), in which case it's decompressed as it's read. Compressed logs are always
+    parsed by one process, and logs inside archives don't use the cache.
+
+    filename can also be a summary written by log_summary (e.g., by running the summarizer on the
+    machine where the event log was written), in which case the stages are streaming, because the
+    summary only has each stage's aggregates.
+    """
     self.filename = filename
     self.logger = logging.getLogger("Analyzer")
     self.jobs = {}
     # For each stage, jobs that rely on the stage.
     self.jobs_for_stage = {}
+    # For each stage, a list of (Stage, job ids) pairs describing the Stage objects that the
+    # stage's tasks are added to, and the jobs that share each one. Usually all of the jobs that
+    # rely on a stage share a single Stage, so each task is only stored once. A job that starts
+    # after some of the stage's tasks have finished only includes the tasks that finish after it
+    # starts, so it gets a new Stage.
+    self.shared_stages_for_stage = {}
+    # Number of events of each type that were skipped without decoding their JSON, because the
+    # Analyzer doesn't use them.
+    self.skipped_event_counts = collections.Counter()
 
-    f = open(filename, "r")
-    for line in f:
-      try:
-        json_data = get_json(line)
-      except:
-        logger.error("BAD DATA: %s" % line)
-        continue
-      event_type = json_data["Event"]
-      if event_type == "SparkListenerJobStart":
-        stage_ids = json_data["Stage IDs"]
-        job_id = json_data["Job ID"]
-        # Use the name of the stage with the highest ID as the job's name (this seems to be
-        # what the Spark UI does).
-        max_stage_id = max([int(id) for id in stage_ids])
-        for stage_info in json_data["Stage Infos"]:
-          if int(stage_info["Stage ID"]) == max_stage_id:
-            # Use the name of the stage to set the name of the job.
-            self.jobs[job_id] = Job(job_id, stage_info["Stage Name"])
-        for stage_id in stage_ids:
-          if stage_id not in self.jobs_for_stage:
-            self.jobs_for_stage[stage_id] = []
-          self.jobs_for_stage[stage_id].append(job_id)
-      elif event_type == "SparkListenerTaskEnd":
-        stage_id = json_data["Stage ID"]
-        # Add the event to all of the jobs that depend on the stage.
-        for job_id in self.jobs_for_stage[stage_id]:
-          self.jobs[job_id].add_event(json_data)
+    from stage import Stage
+    from stage_summary import StageSummary
+    stage_class = StageSummary if streaming else Stage
+    if use_cache and log_files.split_archive_path(filename)[0] is not None:
+      # There's nowhere to put a cache for a log inside an archive.
+      use_cache = False
+    if num_processes > 1 and not log_files.is_plain_file(filename):
+      # Parallel parsing splits the event log into byte ranges, which doesn't work for compressed
+      # logs. Parallel parsing always uses streaming stages, so a sequential parse does too.
+      self.logger.info("Parsing compressed event log %s with one process" % filename)
+      num_processes = 1
+      stage_class = StageSummary
+    is_summary = log_summary.is_summary_file(filename)
+    cache = task_cache.load(filename) if use_cache and not is_summary else None
+    if is_summary:
+      self.__load_from_summary(log_summary.load(filename))
+    elif cache is not None:
+      self.__load_from_cache(cache)
+    elif num_processes > 1:
+      self.__parse_in_parallel(num_processes)
+    else:
+      # The cache has the stages' TaskTables, so it's not written by streaming parses.
+      cache_writer = None
+      if use_cache and stage_class == Stage:
+        cache_writer = task_cache.TaskCacheWriter(filename)
+      self.__parse(stage_class, cache_writer)
+      if cache_writer is not None:
+        cache_writer.write([(stage_id, job_ids, stage.get_task_table())
+          for stage_id, shared_stages in sorted(self.shared_stages_for_stage.iteritems())
+          for stage, job_ids in shared_stages if stage.num_tasks() > 0])
+    for event_type, count in sorted(self.skipped_event_counts.iteritems()):
+      self.logger.info("Skipped %s %s events without decoding them" % (count, event_type))
 
     self.logger.debug("Filtering jobs based on passed in filter function")
     self.jobs = job_filterer(self.jobs)
     self.logger.debug("Finished reading input data:")
     for job_id, job in self.jobs.iteritems():
       job.initialize_job()
-      job_tasks= job.all_tasks()
-      job_start_time = min([task.start_time for task in job_tasks])
-      job_finish_time = max([task.finish_time for task in job_tasks])
-      job_runtime = (job_finish_time - job_start_time) / 1000.0
+      job_runtime = job.runtime() / 1000.0
       stage_str = ["%s (%sm)" % (stage_id, stage.runtime() / 60000.0)
         for (stage_id, stage) in job.stages.iteritems()]
       self.logger.debug("Job %s has stages: %s and runtime %sm (%ss)" %
         (job_id, stage_str, job_runtime / 60., job_runtime))
 
+  def __parse(self, stage_class, cache_writer):
+    """ Reads the event log in this process, using stage_class to create each job's stages.
+
+    If cache_writer is not None, each job start is also passed to it.
+    """
+    with log_files.open_log(self.filename) as f:
+      for line in f:
+        event_type = get_event_type(line)
+        if event_type is not None and event_type not in PARSED_EVENT_TYPES:
+          self.skipped_event_counts[event_type] += 1
+          continue
+        try:
+          json_data = get_json(line)
+        except:
+          self.logger.error("BAD DATA: %s" % line)
+          continue
+        event_type = json_data["Event"]
+        if event_type == "SparkListenerJobStart":
+          job_id = json_data["Job ID"]
+          job_name = get_job_name(json_data)
+          stage_ids = json_data["Stage IDs"]
+          self.__add_job(job_id, job_name, stage_ids, stage_class)
+          self.__share_stages(job_id, stage_ids, stage_class)
+          if cache_writer is not None:
+            cache_writer.add_job_start(job_id, job_name, stage_ids)
+        elif event_type == "SparkListenerTaskEnd":
+          stage_id = json_data["Stage ID"]
+          task = Task(json_data)
+          self.__add_task(stage_id, task)
+
+  def __load_from_cache(self, cache):
+    """ Adds the jobs and stages saved in a task_cache.TaskCache. """
+    from stage import Stage
+    for job_id, job_name, stage_ids in cache.job_starts:
+      self.__add_job(job_id, job_name, stage_ids, Stage)
+    for stage_id, job_ids, task_table in cache.get_stages():
+      stage = Stage(task_table)
+      self.shared_stages_for_stage.setdefault(stage_id, []).append((stage, job_ids))
+      for job_id in job_ids:
+        self.jobs[job_id].add_stage(stage_id, stage)
+
+  def __load_from_summary(self, summary):
+    """ Adds the jobs and stages from the event log summarized in a log_summary.LogSummary. """
+    if summary.event_log_summary is None:
+      raise ValueError("%s does not summarize an event log" % self.filename)
+    job_starts, stage_segments, skipped_event_counts = summary.event_log_summary
+    self.skipped_event_counts.update(skipped_event_counts)
+    self.__add_summarized_events(job_starts, stage_segments)
+
+  def __add_job(self, job_id, job_name, stage_ids, stage_class):
+    from job import Job
+    self.jobs[job_id] = Job(job_id, job_name, stage_class)
+    for stage_id in stage_ids:
+      if stage_id not in self.jobs_for_stage:
+        self.jobs_for_stage[stage_id] = []
+      self.jobs_for_stage[stage_id].append(job_id)
+
+  def __share_stages(self, job_id, stage_ids, stage_class):
+    """ Finds (or creates) the Stage objects that the given job shares with other jobs. """
+    for stage_id in stage_ids:
+      shared_stages = self.shared_stages_for_stage.setdefault(stage_id, [])
+      if shared_stages and shared_stages[-1][0].num_tasks() == 0:
+        shared_stages[-1][1].append(job_id)
+      else:
+        shared_stages.append((stage_class(), [job_id]))
+
+  def __add_task(self, stage_id, task):
+    # Add the task to the stages shared by all of the jobs that depend on the stage.
+    for stage, job_ids in self.shared_stages_for_stage[stage_id]:
+      if stage.num_tasks() == 0:
+        # Only add stages to jobs once they have a task, so that jobs don't include stages that
+        # were skipped.
+        for job_id in job_ids:
+          self.jobs[job_id].add_stage(stage_id, stage)
+      stage.add_task(task)
+
+  def __add_stage_summary(self, stage_id, summary):
+    """ Like __add_task, for a StageSummary describing some of the stage's tasks. """
+    if stage_id not in self.shared_stages_for_stage:
+      self.logger.warning("Ignoring tasks from stage %s, which is not part of any job" % stage_id)
+      return
+    for stage, job_ids in self.shared_stages_for_stage[stage_id]:
+      if stage.num_tasks() == 0:
+        for job_id in job_ids:
+          self.jobs[job_id].add_stage(stage_id, stage)
+      stage.merge(summary)
+
+  def __add_summarized_events(self, job_starts, stage_segments):
+    """ Adds the jobs and stages described by the results of summarize_events.
+
+    The job starts and the stage segments are added in the order they were read from the event
+    log, in the same way as a sequential parse adds them, so each job gets the tasks that finished
+    after it started. When an event log is summarized in chunks, this should be called for each
+    chunk in order.
+    """
+    from stage_summary import StageSummary
+    segment_index = 0
+    for position, (job_id, job_name, stage_ids) in enumerate(job_starts):
+      while segment_index < len(stage_segments) and stage_segments[segment_index][0] <= position:
+        _, stage_id, summary = stage_segments[segment_index]
+        self.__add_stage_summary(stage_id, summary)
+        segment_index += 1
+      self.__add_job(job_id, job_name, stage_ids, StageSummary)
+      self.__share_stages(job_id, stage_ids, StageSummary)
+    for _, stage_id, summary in stage_segments[segment_index:]:
+      self.__add_stage_summary(stage_id, summary)
+
+  def __parse_in_parallel(self, num_processes):
+    """ Parses the event log using a pool of num_processes worker processes.
+
+    Each worker returns the job starts and stage segments from one chunk of the log (see
+    summarize_events), which are added in file order, so a stage's tasks and its job's start event
+    can be parsed by different workers.
+    """
+    # Use more chunks than processes so that one slow chunk doesn't hold up the whole parse.
+    chunks = get_line_aligned_chunks(self.filename, 4 * num_processes)
+    self.logger.debug("Parsing %s in %s chunks using %s processes" %
+      (self.filename, len(chunks), num_processes))
+    pool = multiprocessing.Pool(num_processes)
+    try:
+      for job_starts, stage_segments, chunk_skipped_event_counts in pool.imap(
+          parse_event_log_chunk, [(self.filename, chunk) for chunk in chunks]):
+        self.skipped_event_counts.update(chunk_skipped_event_counts)
+        self.__add_summarized_events(job_starts, stage_segments)
+    finally:
+      pool.close()
+      pool.join()
+
   def write_summary_file(self, values, filename):
+    import numpy
     summary_file = open(filename, "w")
     for percentile in [5, 25, 50, 75, 95]:
       summary_file.write("%f\t" % numpy.percentile(values, percentile))
     summary_file.write("%f\t%f\n" % (min(values), max(values)))
     summary_file.close()
 
-  def __write_utilization_summary_file(self, utilization_pairs, filename):
-    utilization_pairs.sort()
-    current_total_runtime = 0
-    percentiles = [0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
-    output = []
-    percentile_index = 0
-    # Add this up here rather than passing it in, because for some types of utilization
-    # (e.g., network, disk), each task appears multiple times.
-    total_runtime = sum([x[1] for x in utilization_pairs])
-    for (utilization, runtime) in utilization_pairs:
-      current_total_runtime += runtime
-      current_total_runtime_fraction = float(current_total_runtime) / total_runtime
-      if current_total_runtime_fraction > percentiles[percentile_index]:
-        output.append(utilization)
-        percentile_index += 1
-        if percentile_index >= len(percentiles):
-          break
-
-    utilizations = [x[0] for x in utilization_pairs]
-    weights = [x[1] for x in utilization_pairs]
-    weighted_average = numpy.average(utilizations, weights=weights)
+  def __write_distribution_summary_file(self, distribution, filename):
+    """ Like write_summary_file, for a weighted_percentiles.WeightedValues or WeightedHistogram. """
+    summary_file = open(filename, "w")
+    for value in distribution.get_percentiles([0.05, 0.25, 0.5, 0.75, 0.95]):
+      summary_file.write("%f\t" % value)
+    summary_file.write("%f\t%f\n" % (distribution.get_min(), distribution.get_max()))
+    summary_file.close()
+
+  def __write_utilization_summary_file(self, distribution, filename):
+    # The distribution has the utilization while each task was running, weighted by the task's
+    # runtime (for some types of utilization, e.g., network and disk, each task appears multiple
+    # times).
+    output, weighted_average = distribution.get_weighted_percentiles(
+      [0.05, 0.25, 0.5, 0.75, 0.95, 0.99])
     output.append(weighted_average)
     f = open(filename, "w")
     f.write("Utilization\t0\t")
@@ -135,10 +416,9 @@ class Analyzer:
     is_first = True
     for job_id, job in self.jobs.iteritems():
       for stage_id, stage in job.stages.iteritems():
-        compute_monotask_times = [t.compute_monotask_millis for t in stage.tasks]
         output_filename = "{}_{}_{}".format(output_prefix, job_id, stage_id)
         with open(output_filename, "w") as runtimes_file:
-          for index, time in enumerate(sorted(compute_monotask_times)):
+          for index, time in stage.get_compute_monotask_distribution().get_cdf():
             runtimes_file.write("{}\t{}\n".format(index, time))
         if not is_first:
           gnuplot_file.write(", ")
@@ -150,67 +430,65 @@ class Analyzer:
     # TODO: This function outputs the distribution of utilizations while tasks were running by
     # calculating a weighted average of the utilizations while tasks were running, using the
     # macrotask duration as the weight. This is just an estimate of the average on the machine;
-    # instead, we should just directly compute the average utilization using the continuous monitor.
+    # instead, we should just directly compute the average utilization using the continuous monitor
+    # (as output_monitor_utilizations does, when the continuous monitors are available).
+    from stage import UTILIZATION_DISTRIBUTION_NAMES
     self.logger.debug("Outputting utilizations")
-    disk_utilizations = []
-    disk_throughputs = []
-    process_user_cpu_utilizations = []
-    process_system_cpu_utilizations = []
-    cpu_utilizations = []
-    network_utilizations = []
-    network_utilizations_recv_only = []
-    network_utilizations_fetch_only = []
-    task_runtimes = []
-    # Divide by 8 to convert to bytes!
-    NETWORK_BANDWIDTH_BPS = 1.0e9 / 8
+    name_to_distribution = {}
+    for job in self.jobs.itervalues():
+      for stage in job.stages.itervalues():
+        for name, distribution in stage.get_utilization_distributions().iteritems():
+          # Start with an empty distribution, because the stage's distributions may be cached (and
+          # shared with other jobs).
+          name_to_distribution.setdefault(name, distribution.new_empty()).merge(distribution)
 
-    for job_id, job in self.jobs.iteritems():
-      for stage_id, stage in job.stages.iteritems():
-        stage_runtime = (max([t.finish_time for t in stage.tasks]) -
-          min([t.start_time for t in stage.tasks]))
-        for task in stage.tasks:
-          task_runtimes.append(task.runtime())
-          cpu_utilizations.append((task.total_cpu_utilization / 8., task.runtime()))
-          process_user_cpu_utilizations.append(
-            (task.process_user_cpu_utilization / 8., task.runtime()))
-          process_system_cpu_utilizations.append(
-            (task.process_system_cpu_utilization / 8., task.runtime()))
-          for name, disk_utilization in task.disk_utilization.iteritems():
-            if name in ["xvdb", "xvdf"]:
-              disk_utilizations.append((disk_utilization.utilization, task.runtime()))
-              disk_throughputs.append((
-                disk_utilization.read_throughput_Bps + disk_utilization.write_throughput_Bps,
-                task.runtime()))
-          received_utilization = (task.network_utilization.bytes_received_ps /
-            NETWORK_BANDWIDTH_BPS, task.runtime())
-          network_utilizations.append(received_utilization)
-          transmitted_utilization = (task.network_utilization.bytes_transmitted_ps /
-            NETWORK_BANDWIDTH_BPS, task.runtime())
-          network_utilizations.append(transmitted_utilization)
-          network_utilizations_recv_only.append(received_utilization)
-          if task.has_fetch:
-            network_utilizations_fetch_only.append(received_utilization)
-            network_utilizations_fetch_only.append(transmitted_utilization)
-
-    self.write_summary_file(task_runtimes, "%s_%s" % (prefix, "task_runtimes"))
-    self.__write_utilization_summary_file(
-      disk_utilizations, "%s_%s" % (prefix, "disk_utilization"))
-    self.__write_utilization_summary_file(
-      disk_throughputs, "%s_%s" % (prefix, "disk_throughput"))
-    self.__write_utilization_summary_file(
-      network_utilizations, "%s_%s" % (prefix, "network_utilization"))
-    self.__write_utilization_summary_file(
-      network_utilizations_recv_only, "%s_%s" % (prefix, "network_utilization_recv"))
-    if network_utilizations_fetch_only:
-      self.__write_utilization_summary_file(
-        network_utilizations_fetch_only,
-        "%s_%s" % (prefix, "network_utilization_fetch_only"))
-    self.__write_utilization_summary_file(
-      cpu_utilizations, "%s_%s" % (prefix, "cpu_utilization"))
-    self.__write_utilization_summary_file(
-      process_user_cpu_utilizations, "%s_%s" % (prefix, "cpu_process_user_utilization"))
-    self.__write_utilization_summary_file(
-      process_system_cpu_utilizations, "%s_%s" % (prefix, "cpu_process_system_utilization"))
+    self.__write_distribution_summary_file(
+      name_to_distribution["task_runtimes"], "%s_%s" % (prefix, "task_runtimes"))
+    for name in UTILIZATION_DISTRIBUTION_NAMES:
+      # The fetch-only distribution is empty if no tasks read shuffle data.
+      if name == "task_runtimes" or len(name_to_distribution[name]) == 0:
+        continue
+      self.__write_utilization_summary_file(name_to_distribution[name], "%s_%s" % (prefix, name))
+
+  def output_monitor_utilizations(self, prefix, host_to_monitor_filename):
+    """
+    Writes files with the actual CPU, network, and disk utilization while each stage and each job
+    were running, computed from the continuous monitors in host_to_monitor_filename (which maps
+    executor hosts to the continuous monitor log from that host, or to a summary of the log
+    written by log_summary). For each executor, the utilization is averaged over the time from when
+    the stage's (or job's) first task on the executor started until its last task on the executor
+    finished. Each line has the time-averaged utilization followed by the utilization at each of
+    monitor_utilization.PERCENTILES.
+    """
+    import monitor_utilization
+    self.logger.debug("Outputting utilizations from continuous monitors")
+    host_to_time_series = {
+      host: monitor_utilization.MonitorTimeSeries(
+        log_summary.load_continuous_monitor(monitor_filename))
+      for host, monitor_filename in host_to_monitor_filename.iteritems()}
+    executor_id_to_host = self.get_executor_id_to_host()
+
+    def write_summary(output, description, executor_id_to_window):
+      summary = monitor_utilization.get_utilization_summary(
+        host_to_time_series, executor_id_to_window, executor_id_to_host)
+      for resource in monitor_utilization.RESOURCES:
+        output.write("{}\t{}\t{}\t{}\n".format(description, resource,
+          summary.get_mean(resource),
+          "\t".join([str(x) for x in summary.get_percentiles(resource)])))
+
+    with open("{}_stage_monitor_utilization".format(prefix), "w") as stage_output:
+      with open("{}_job_monitor_utilization".format(prefix), "w") as job_output:
+        for job_id, job in sorted(self.jobs.iteritems()):
+          job_executor_id_to_window = {}
+          for stage_id, stage in sorted(job.stages.iteritems()):
+            executor_id_to_window = stage.get_executor_id_to_task_window()
+            write_summary(stage_output, "Job {}, Stage {}".format(job_id, stage_id),
+              executor_id_to_window)
+            for executor_id, (start, finish) in executor_id_to_window.iteritems():
+              job_start, job_finish = job_executor_id_to_window.get(executor_id, (start, finish))
+              job_executor_id_to_window[executor_id] = (
+                min(start, job_start), max(finish, job_finish))
+          write_summary(job_output, "Job {}".format(job_id), job_executor_id_to_window)
 
   def output_stage_resource_metrics(self, filename):
     """
@@ -240,9 +518,11 @@ class Analyzer:
             job_id, executor_id, executor_id_to_host[executor_id], resource_metrics))
 
   def get_executor_id_to_host(self):
-    return {task.executor_id: task.executor
-      for job in self.jobs.itervalues()
-      for task in job.all_tasks()}
+    executor_id_to_host = {}
+    for job in self.jobs.itervalues():
+      for stage in job.stages.itervalues():
+        executor_id_to_host.update(stage.get_executor_id_to_host())
+    return executor_id_to_host
 
   def output_ideal_time_metrics(self, filename, fix_executors = False):
     """
@@ -250,6 +530,7 @@ class Analyzer:
     Then, ideal job runtime is reported as the sum of the runtimes of the bottleneck resource in
     each of the job's stages.
     """
+    import metrics
     if not fix_executors:
       output_filename = "{}_{}".format(filename, "ideal_time_metrics")
     else:
@@ -297,6 +578,21 @@ def main(argv):
   parser.add_option(
       "-d", "--debug", action="store_true", default=True,
       help="Enable additional debug logging")
+  parser.add_option(
+      "-s", "--streaming", action="store_true", default=False,
+      help="Aggregate each stage as the log is read, rather than storing every task (the " +
+        "utilization percentiles and compute monotask CDFs of stages with more than a few " +
+        "thousand tasks are then approximate, to within 1%)")
+  parser.add_option(
+      "-p", "--num-processes", type="int", default=1,
+      help="Number of processes to use to parse the event log (implies --streaming if > 1)")
+  parser.add_option(
+      "-n", "--no-cache", action="store_true", default=False,
+      help="Always parse the JSON event log, rather than using (or writing) the task cache")
+  parser.add_option(
+      "-m", "--continuous-monitor", action="append", default=[], metavar="HOST=FILENAME",
+      help="Continuous monitor log from the given executor host, used to output the actual " +
+        "utilization during each stage and job (may be given once for each host)")
   (opts, args) = parser.parse_args()
   if len(args) != 1:
     parser.print_help()
@@ -311,14 +607,21 @@ def main(argv):
     parser.print_help()
     sys.exit(1)
 
-  analyzer = Analyzer(filename)
+  analyzer = Analyzer(filename, streaming = opts.streaming, num_processes = opts.num_processes,
+    use_cache = not opts.no_cache)
 
-  analyzer.output_utilizations(filename)
-  analyzer.output_load_balancing_badness(filename)
-  analyzer.output_runtimes(filename)
-  analyzer.output_job_resource_metrics(filename)
-  analyzer.output_stage_resource_metrics(filename)
-  analyzer.output_ideal_time_metrics(filename)
+  # For an event log inside an archive, the output files go next to the archive.
+  prefix = log_files.get_output_prefix(filename)
+  analyzer.output_utilizations(prefix)
+  analyzer.output_load_balancing_badness(prefix)
+  analyzer.output_runtimes(prefix)
+  analyzer.output_job_resource_metrics(prefix)
+  analyzer.output_stage_resource_metrics(prefix)
+  analyzer.output_ideal_time_metrics(prefix)
+  if opts.continuous_monitor:
+    host_to_monitor_filename = dict(
+      host_and_filename.split("=", 1) for host_and_filename in opts.continuous_monitor)
+    analyzer.output_monitor_utilizations(prefix, host_to_monitor_filename)
 
 if __name__ == "__main__":
   main(sys.argv[1:])
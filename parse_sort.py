@@ -6,6 +6,7 @@ results.
 import os
 import sys
 
+import experiment_index
 import parse_event_logs
 import utils
 
@@ -50,18 +51,17 @@ def main(argv):
     utils.copy_latest_zipped_logs(driver_hostname, identity_file, output_prefix, num_experiments,
                                   username)
 
-  # Find all of the directories with experiment data.
-  all_dirnames = [d for d in os.listdir(output_prefix)
-    if os.path.isdir(os.path.join(output_prefix, d))]
-  all_dirnames.sort(key = lambda d: -int(d.split("_")[4]))
+  # Find all of the runs with an event log. The first parameter of each run is the number of tasks,
+  # and the fourth is the number of shuffle values.
+  runs = [run for run in experiment_index.get_runs(output_prefix) if run.event_log is not None]
+  runs.sort(key = lambda run: -run.params[2])
 
   map_data_file = open(os.path.join(output_prefix, "map_times"), "w")
   reduce_data_file = open(os.path.join(output_prefix, "reduce_times"), "w")
   total_data_file = open(os.path.join(output_prefix, "total_times"), "w")
-  for dirname in all_dirnames:
-    utils.plot_continuous_monitors(os.path.join(output_prefix, dirname))
-
-    local_event_log_filename = os.path.join(output_prefix, dirname, "event_log")
+  utils.plot_continuous_monitors_in_dirs([run.directory for run in runs])
+  for run in runs:
+    local_event_log_filename = run.event_log
     print "Parsing event log in %s" % local_event_log_filename
     analyzer = parse_event_logs.Analyzer(local_event_log_filename, job_filterer = filter)
     analyzer.output_job_resource_metrics(local_event_log_filename)
@@ -155,9 +155,8 @@ def main(argv):
       output_file.write("Reduce {}\n".format(reduce_data))
       output_file.write("Total {}\n".format(total_data))
 
-      job_params = dirname.split("_")
-      num_shuffle_values = int(job_params[5])
-      num_tasks = int(job_params[2])
+      num_shuffle_values = run.params[3]
+      num_tasks = run.params[0]
       map_data_file.write("{} {} {} {}\n".format(
         num_shuffle_values,
         num_tasks,
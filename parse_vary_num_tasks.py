@@ -7,10 +7,11 @@ of the number of tasks used.
 import logging
 import numpy
 import os
-import re
 import subprocess
 import sys
 
+import experiment_index
+import gnuplot_session
 import metrics
 import parse_event_logs
 import utils
@@ -48,19 +49,20 @@ def main(argv):
       username = "root"
     utils.copy_latest_zipped_logs(driver_hostname, identity_file, output_prefix, num_experiments, username)
 
-  all_dirnames = [d for d in os.listdir(output_prefix) if "experiment" in d and "tar.gz" not in d]
-  all_dirnames.sort(key = lambda d: int(re.search('experiment_log_([0-9]*)_', d).group(1)))
+  # The first parameter of each run is the number of tasks.
+  runs = [run for run in experiment_index.get_runs(output_prefix) if run.event_log is not None]
+  runs.sort(key = lambda run: run.params[0])
 
   output_filename = os.path.join(output_prefix, "actual_runtimes")
   output_file = open(output_filename, "w")
 
-  for dirname in all_dirnames:
-    local_event_log_filename = os.path.join(output_prefix, dirname, "event_log")
+  for run in runs:
+    local_event_log_filename = run.event_log
     print "Parsing event log in %s" % local_event_log_filename
     analyzer = parse_event_logs.Analyzer(local_event_log_filename, job_filterer = filter)
 
     all_jobs = analyzer.jobs.values()
-    num_tasks_values = [len(stage.tasks) for job in all_jobs
+    num_tasks_values = [stage.num_tasks() for job in all_jobs
       for (stage_id, stage) in job.stages.iteritems()]
     # Assumes all of the map and reduce staages use the same number of tasks.
     num_tasks = num_tasks_values[0]
@@ -139,7 +141,7 @@ def plot(output_prefix, data_filename, plot_filename, plot_base):
     plot_file.write(new_line)
   plot_file.close()
 
-  subprocess.check_call("gnuplot %s" % absolute_plot_filename, shell=True)
+  gnuplot_session.plot(absolute_plot_filename)
   output_filename = absolute_plot_filename[:-3]
   subprocess.check_call("open %s.pdf" % output_filename, shell=True)
 
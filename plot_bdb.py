@@ -32,11 +32,10 @@ directory structure in which the event log files are stored should be:
 
 import argparse
 import functools
-import numpy
 import os
 from os import path
-import subprocess
 
+import gnuplot_session
 import parse_event_logs
 import utils
 
@@ -106,6 +105,9 @@ def __find_event_logs(args):
   spark_branch = args.spark_branch
   plot_continuous_monitors = args.plot_continuous_monitors
   queries = {}
+  # Directories whose continuous monitors should be plotted (which are all plotted at once, so that
+  # the plots can be made in parallel).
+  monitor_dirs = []
 
   for query_name in os.listdir(results_dir):
     # For every query...
@@ -123,7 +125,7 @@ def __find_event_logs(args):
         branch_dir = path.join(query_dir, branch_name)
         if (path.isdir(branch_dir)):
           if plot_continuous_monitors:
-            utils.plot_continuous_monitors(branch_dir)
+            monitor_dirs.append(branch_dir)
 
           event_log = path.join(branch_dir, "event_log")
           if is_monotasks_branch:
@@ -140,6 +142,8 @@ def __find_event_logs(args):
 
       queries[query_name] = (monotasks_event_log, spark_event_log)
 
+  if monitor_dirs:
+    utils.plot_continuous_monitors_in_dirs(monitor_dirs)
   return queries
 
 
@@ -182,7 +186,7 @@ def __generate_graphs(queries, args):
       i += 1
 
   # Generate the graph.
-  subprocess.check_call("gnuplot {}".format(plot_filepath), shell=True)
+  gnuplot_session.plot(plot_filepath)
 
 
 def __drop_warmup_filterer(num_warmup_jobs, all_jobs_dict):
@@ -229,6 +233,7 @@ def __add_jct_results(data_file, event_log, query_name, num_warmup_trials, x_coo
   if has_two_jobs_per_trial:
     # We sum adjacent JCTs together in order to get the total JCT for each trial.
     jcts = __sum_adjacent_items(jcts)
+  import numpy
   data_values = [numpy.median(jcts), min(jcts), max(jcts)]
   data_file.write(__build_data_line(query_name, x_coordinate, data_values))
 
@@ -35,8 +35,8 @@ import functools
 import numpy
 import os
 from os import path
-import subprocess
 
+import gnuplot_session
 import parse_event_logs
 import utils
 
@@ -99,6 +99,9 @@ def __find_event_logs(args):
   monotasks_branch = args.monotasks_branch
   plot_continuous_monitors = args.plot_continuous_monitors
   queries = {}
+  # Directories whose continuous monitors should be plotted (which are all plotted at once, so that
+  # the plots can be made in parallel).
+  monitor_dirs = []
 
   for query_name in os.listdir(results_dir):
     # For every query...
@@ -114,7 +117,7 @@ def __find_event_logs(args):
         branch_dir = path.join(query_dir, branch_name)
         if (path.isdir(branch_dir)):
           if plot_continuous_monitors:
-            utils.plot_continuous_monitors(branch_dir)
+            monitor_dirs.append(branch_dir)
 
           event_log = path.join(branch_dir, "event_log")
           if is_monotasks_branch:
@@ -127,6 +130,8 @@ def __find_event_logs(args):
 
       queries[query_name] = monotasks_event_log
 
+  if monitor_dirs:
+    utils.plot_continuous_monitors_in_dirs(monitor_dirs)
   return queries
 
 
@@ -169,7 +174,7 @@ def __generate_graphs(queries, args):
       i += 1
 
   # Generate the graph.
-  subprocess.check_call("gnuplot {}".format(plot_filepath), shell=True)
+  gnuplot_session.plot(plot_filepath)
 
 
 def __drop_warmup_filterer(num_warmup_jobs, all_jobs_dict):
@@ -2,19 +2,30 @@ import inspect
 from os import path
 import subprocess
 
-LINE_TEMPLATE = "\"{}\" using 1:{} with l ls {} title \"{}\""
+import numpy
 
-def plot(cm_data, file_prefix, open_graphs, disk_to_index):
+import gnuplot_session
+
+# The first field is a data source returned by get_data_source().
+LINE_TEMPLATE = "{} using 1:{} with l ls {} title \"{}\""
+
+def plot(cm_data, file_prefix, open_graphs, binary_data=False):
   """
   Creates gnuplot files that can be used to generate plots with data for
-  various continuous monitor attributes, and uses those files to generate PDFs
-  of each plot
+  various continuous monitor attributes (from the given
+  continuous_monitor.ContinuousMonitor), and uses those files to generate PDFs
+  of each plot. If binary_data is true, the data file that gnuplot reads is
+  written in binary rather than as text.
   """
-  # Write continuous monitor data to tab deliminated data file.
   out_filename = "{}_utilization".format(file_prefix)
-  with open(out_filename, 'w') as out_file:
-    for data in cm_data:
-      write_data(out_file, [val[1] for val in data])
+  if binary_data:
+    write_binary_data(out_filename, cm_data)
+    data_source = get_data_source(out_filename, len(cm_data.get_column_names()))
+  else:
+    # Write continuous monitor data to tab deliminated data file.
+    write_data(out_filename, cm_data)
+    data_source = get_data_source(out_filename)
+  disk_to_index = cm_data.get_disks_to_index()
 
   # Get the location of the monotasks-scripts repository by getting the
   # directory containing the file that is currently being executed.
@@ -22,13 +33,27 @@ def plot(cm_data, file_prefix, open_graphs, disk_to_index):
   attributes = ['utilization', 'monotasks', 'memory']
 
   for attribute in attributes:
-    plot_gnuplot_attribute(attribute, file_prefix, open_graphs, scripts_dir, disk_to_index)
+    plot_gnuplot_attribute(
+      attribute, file_prefix, open_graphs, scripts_dir, disk_to_index, data_source)
 
   for disk_name, index in disk_to_index.iteritems():
-    plot_single_disk(disk_name, index, file_prefix, open_graphs, scripts_dir, out_filename)
+    plot_single_disk(disk_name, index, file_prefix, open_graphs, scripts_dir, data_source)
+
+
+def get_data_source(data_filename, num_binary_columns=None):
+  """
+  Returns the string that gnuplot scripts should use to refer to the given
+  data file. If num_binary_columns is set, the file has that many columns of
+  binary data (as written by write_binary_data) rather than text.
+  """
+  if num_binary_columns is None:
+    return '"{}"'.format(data_filename)
+  return '"{}" binary format="%{}float64" endian=little'.format(
+    data_filename, num_binary_columns)
 
 
-def plot_gnuplot_attribute(attribute, file_prefix, open_graphs, scripts_dir, disk_to_index):
+def plot_gnuplot_attribute(attribute, file_prefix, open_graphs, scripts_dir, disk_to_index,
+                           data_source):
   """ Create a gnuplot file and associated pdf for a some attribute (like utilization) """
   data_filename = '{}_utilization'.format(file_prefix)
   plot_filename = '{}_{}.gp'.format(file_prefix, attribute)
@@ -36,23 +61,54 @@ def plot_gnuplot_attribute(attribute, file_prefix, open_graphs, scripts_dir, dis
   pdf_filename = '{}_{}.pdf'.format(file_prefix, attribute)
   with open(plot_filename, 'w') as plot_file:
     for line in open(base_plot_filename, 'r'):
-      new_line = line.replace('__OUT_FILENAME__', pdf_filename).replace('__NAME__', data_filename)
+      # Other files whose names start with the data file's name (like the
+      # started macrotasks file) are always text.
+      new_line = line.replace('__OUT_FILENAME__', pdf_filename).replace(
+        '"__NAME__"', data_source).replace('__NAME__', data_filename)
       plot_file.write(new_line)
 
     color = 6
     if attribute == "utilization":
       for disk, index in sorted(disk_to_index.iteritems()):
         plot_file.write(",\\\n{}".format(LINE_TEMPLATE.format(
-          data_filename, index, color, "{} Utilization".format(disk))))
+          data_source, index, color, "{} Utilization".format(disk))))
         color += 1
 
-  subprocess.check_call('gnuplot {}'.format(plot_filename), shell=True)
+  gnuplot_session.plot(plot_filename)
   if open_graphs and attribute != 'memory':
     subprocess.check_call('open {}'.format(pdf_filename), shell=True)
 
 
+def plot_cluster_utilization(data_filename, column_names, open_graphs):
+  """
+  Plots the mean utilization across executors from a file written by
+  cluster_monitor.write_cluster_monitor(), which has the given columns.
+  """
+  scripts_dir = path.dirname(inspect.stack()[0][1])
+  plot_filename = '{}.gp'.format(data_filename)
+  pdf_filename = '{}.pdf'.format(data_filename)
+  base_plot_filename = path.join(scripts_dir, 'gnuplot_files/plot_cluster_utilization_base.gp')
+  with open(plot_filename, 'w') as plot_file:
+    for line in open(base_plot_filename, 'r'):
+      new_line = line.replace('__OUT_FILENAME__', pdf_filename).replace('__NAME__', data_filename)
+      plot_file.write(new_line)
+
+    color = 6
+    for column_name in column_names:
+      if column_name.endswith(' utilization mean') and column_name != 'cpu utilization mean':
+        disk = column_name[:-len(' utilization mean')]
+        plot_file.write(",\\\n{}".format(LINE_TEMPLATE.format(
+          get_data_source(data_filename), column_names.index(column_name) + 1, color,
+          "{} Utilization".format(disk))))
+        color += 1
+
+  gnuplot_session.plot(plot_filename)
+  if open_graphs:
+    subprocess.check_call('open {}'.format(pdf_filename), shell=True)
+
+
 def plot_single_disk(disk_to_plot, start_index, file_prefix, open_graphs, scripts_dir,
-                     util_filename):
+                     data_source):
   """ Plots the utilization for a single disk. """
   disk_plot_filename_prefix = '{}_{}_disk_utilization'.format(file_prefix, disk_to_plot)
   disk_plot_filename = '{}.gp'.format(disk_plot_filename_prefix)
@@ -64,29 +120,40 @@ def plot_single_disk(disk_to_plot, start_index, file_prefix, open_graphs, script
     # Write lines to plot the information about one disk.
     line_template_y2 = "{} axes x1y2".format(LINE_TEMPLATE)
     disk_plot_file.write("plot ")
-    disk_plot_file.write(LINE_TEMPLATE.format(util_filename, start_index, 2, "Utilization"))
+    disk_plot_file.write(LINE_TEMPLATE.format(data_source, start_index, 2, "Utilization"))
     disk_plot_file.write(",\\\n")
     disk_plot_file.write(line_template_y2.format(
-      util_filename, start_index + 1, 3, "Read Throughput"))
+      data_source, start_index + 1, 3, "Read Throughput"))
     disk_plot_file.write(",\\\n")
     disk_plot_file.write(line_template_y2.format(
-      util_filename, start_index + 2, 4, "Write Throughput"))
+      data_source, start_index + 2, 4, "Write Throughput"))
     disk_plot_file.write(",\\\n")
-    disk_plot_file.write(LINE_TEMPLATE.format(util_filename, start_index + 3, 5, "Monotasks"))
+    disk_plot_file.write(LINE_TEMPLATE.format(data_source, start_index + 3, 5, "Monotasks"))
     disk_plot_file.write(",\\\n")
     disk_plot_file.write(LINE_TEMPLATE.format(
-      util_filename, start_index + 4, 7, "Queued Read Monotasks"))
+      data_source, start_index + 4, 7, "Queued Read Monotasks"))
     disk_plot_file.write(",\\\n")
     disk_plot_file.write(
-      LINE_TEMPLATE.format(util_filename, start_index + 6, 8, "Queued Write Monotasks"))
+      LINE_TEMPLATE.format(data_source, start_index + 6, 8, "Queued Write Monotasks"))
 
-  subprocess.check_call('gnuplot {}'.format(disk_plot_filename), shell=True)
+  gnuplot_session.plot(disk_plot_filename)
   if open_graphs:
     subprocess.check_call('open {}'.format(disk_plot_output), shell=True)
   return disk_plot_output
 
 
-def write_data(out_file, data):
-  stringified = [str(x) for x in data]
-  out_file.write('\t'.join(stringified))
-  out_file.write('\n')
+def write_data(out_filename, cm_data):
+  """
+  Writes one tab-delimited line for each continuous monitor sample, with the
+  columns in the order of cm_data.get_column_names(). Disks that a sample
+  didn't describe are written as NaN, which gnuplot skips.
+  """
+  numpy.savetxt(out_filename, cm_data.get_rows(), fmt='%.12g', delimiter='\t')
+
+
+def write_binary_data(out_filename, cm_data):
+  """
+  Writes the same values as write_data, as consecutive records of
+  little-endian float64 values (one record per sample).
+  """
+  numpy.ascontiguousarray(cm_data.get_rows(), dtype='<f8').tofile(out_filename)
@@ -1,17 +1,42 @@
-import matplotlib.pyplot as pyplot
+"""
+This file plots continuous monitor data with matplotlib.
 
-from matplotlib.backends import backend_pdf
+matplotlib is only imported when a plot is rendered (so importing this file is fast), and always
+uses the non-interactive Agg backend, so plots can be made on machines without a display. One
+figure is reused for all of a monitor's graphs and closed afterwards, so plotting many monitors in
+one process doesn't accumulate open figures.
+"""
+
+import subprocess
+
+
+def get_pyplot():
+  """ Returns the matplotlib.pyplot module, importing it (with the Agg backend) if necessary. """
+  import matplotlib
+  # Has no effect if pyplot was already imported (e.g., by a script that shows graphs itself).
+  matplotlib.use('Agg')
+  from matplotlib import pyplot
+  return pyplot
 
 
 def continuous_monitor_col(continuous_monitor, key):
   """
-  For a given key, returns a list of data from continuous monitor entries
-  corresponding to that key.
+  For a given key, returns an array of data from a
+  continuous_monitor.ContinuousMonitor corresponding to that key.
   """
-  return [data[key] for data in continuous_monitor]
+  return continuous_monitor.get_column(key)
 
 
-def plot(cm_data, file_prefix, open_graphs, disks):
+def plot(cm_data, file_prefix, open_graphs, single_pdf=False):
+  """
+  Plots the given continuous_monitor.ContinuousMonitor. Each graph is written to
+  its own PDF, or, if single_pdf is true, all of the graphs are written as pages
+  of one PDF named <file_prefix>_graphs.pdf.
+  """
+  pyplot = get_pyplot()
+  from matplotlib.backends import backend_pdf
+
+  disks = cm_data.get_disks()
   disk_utilization_params = ['{0} utilization'.format(disk) for disk in disks]
   disk_params = (
     disk_utilization_params +
@@ -39,35 +64,54 @@ def plot(cm_data, file_prefix, open_graphs, disks):
     'gc fraction'
   ] + disk_utilization_params
 
-  def plot_params(params_to_plot, title):
+  graphs = [
+    (disk_params, 'Disk Utilization'),
+    (memory_params, 'Memory'),
+    (monotasks_params, 'Monotasks'),
+    (utilization_params, 'Utilization'),
+  ]
+  for disk in disks:
+    graphs.append((['{0} running disk monotasks'.format(disk),
+                    '{0} write throughput'.format(disk),
+                    '{0} read throughput'.format(disk),
+                    '{0} utilization'.format(disk)],
+                   '{0} Utilization'.format(disk)))
+
+  figure = pyplot.figure()
+  times = continuous_monitor_col(cm_data, key='time')
+
+  def plot_params(params_to_plot, title, pdf):
     """
-    Creates a matplotlib graph using continuous monitor data.
+    Draws a graph of continuous monitor data on the figure and saves it to pdf.
     Time is the x axis and data corresponding to each parameter is used to
     generate a new line on the line graph.
     """
-    pyplot.figure(title)
-    pyplot.title(title)
-    pyplot.grid(b=True, which='both')
-    times = continuous_monitor_col(cm_data, key='time')
+    figure.clf()
+    axes = figure.add_subplot(111)
+    axes.set_title(title)
+    axes.grid(b=True, which='both')
     for key in params_to_plot:
-      pyplot.plot(times, continuous_monitor_col(cm_data, key), label=key)
-    legend = pyplot.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+      axes.plot(times, continuous_monitor_col(cm_data, key), label=key)
+    legend = axes.legend(loc='center left', bbox_to_anchor=(1, 0.5))
+    pdf.savefig(figure, bbox_extra_artists=[legend], bbox_inches='tight')
 
-    pdf_filepath = '{0}_{1}_graphs.pdf'.format(file_prefix, title.lower().replace(' ', '_'))
-    with backend_pdf.PdfPages(pdf_filepath) as pdf:
-      pdf.savefig(additional_artists=[legend], bbox_inches='tight')
-
-  plot_params(disk_params, title='Disk Utilization')
-  plot_params(memory_params, title='Memory')
-  plot_params(monotasks_params, title='Monotasks')
-  plot_params(utilization_params, title='Utilization')
-
-  for disk in disks:
-    disk_params = ['{0} running disk monotasks'.format(disk),
-                   '{0} write throughput'.format(disk),
-                   '{0} read throughput'.format(disk),
-                   '{0} utilization'.format(disk)]
-    plot_params(disk_params, title='{0} Utilization'.format(disk))
+  pdf_filepaths = []
+  try:
+    if single_pdf:
+      pdf_filepath = '{0}_graphs.pdf'.format(file_prefix)
+      with backend_pdf.PdfPages(pdf_filepath) as pdf:
+        for params_to_plot, title in graphs:
+          plot_params(params_to_plot, title, pdf)
+      pdf_filepaths.append(pdf_filepath)
+    else:
+      for params_to_plot, title in graphs:
+        pdf_filepath = '{0}_{1}_graphs.pdf'.format(file_prefix, title.lower().replace(' ', '_'))
+        with backend_pdf.PdfPages(pdf_filepath) as pdf:
+          plot_params(params_to_plot, title, pdf)
+        pdf_filepaths.append(pdf_filepath)
+  finally:
+    pyplot.close(figure)
 
   if open_graphs:
-    pyplot.show()
+    for pdf_filepath in pdf_filepaths:
+      subprocess.check_call('open {}'.format(pdf_filepath), shell=True)
@@ -1,102 +1,283 @@
-import sys
-
-# Add this if the milliseconds are included in the log output.
-offset = 0
-
-input_filename = sys.argv[1]
-LINE_TEMPLATE = ("set arrow from {start_x},{y} to {end_x},{y} ls {style} nohead\n" +
-  "set label \"{runtime} ({macrotask_id})\" at {end_x},{y} left font 'Times,5'\n")
-
-def write_stage_data(stage_data, plot_file):
-  # Sort the monotasks by start time so that they plot more nicely.
-  stage_data.sort(key = lambda entry: entry[1])
-  for (current_y, (line_style, start_millis, runtime_millis, macrotask_id)) in enumerate(stage_data):
-    plot_file.write(LINE_TEMPLATE.format(
-      start_x = start_millis,
-      end_x = start_millis + runtime_millis,
-      runtime = runtime_millis,
-      macrotask_id = macrotask_id,
-      y = current_y,
-      style = line_style))
-
-def get_first_start(data_filename):
-  with open(data_filename, "r") as data_file:
-    line = data_file.readline()
-    items = line.split(" ")
-    return int(items[offset + 19][:-3])
-
-def write_monotask_times(data_filename, plot_file, first_start):
-  max_y = 0
-  current_stage = 0
-  last_end = 0
-  first_task_id = 0
-  last_network_monotask_end = 0
-  # TODO: Keep track of when the last network monotask ended, so we can just plot the delta.
-  with open(data_filename, "r") as data_file:
-    # Line style, start time, runtime, and macrotask id for each monotask in the stage.
-    stage_data = []
-    for line in data_file:
-      items = line.split(" ")
-      start_millis = int(items[offset + 19][:-3])
-
-      runtime_millis = int(items[offset + 15])
-      macrotask_id = int(items[offset + 9])
-
-      if line.find("network") != -1 and line.find("NetworkResponse") == -1:
-        line_style = 1
-        finish_time = start_millis + runtime_millis
-        # This is the old code -- but with the zero runtime monotasks (the ones that got
-        # short-circuited) it doesn't work correctly.
-        #start_millis = max(start_millis, last_network_monotask_end)
-        runtime_millis = finish_time - start_millis
-        last_network_monotask_end = finish_time
-        # Use the reduce ID as the macrotask ID, so it's easier to correlate them.
-        macrotask_id = int(items[offset + 12].strip("}").strip(")"))
-      elif line.find("compute") != -1:
-        line_style = 2
-
-        # Only roll over the stage for compute monotasks, because of complexities with the
-        # pipelined network ones.
-        stage = int(items[offset + 12].strip(")").strip("}"))
-        if current_stage != stage:
-          write_stage_data(stage_data, plot_file)
-          max_y = max(max_y, len(stage_data))
-          stage_data = []
-          first_task_id = macrotask_id
-          current_stage = stage
+"""
+This script makes a waterfall plot of the monotasks in a Spark executor log (with the monotask
+debug logging turned on): each monotask is drawn as a horizontal bar from when it started to when
+it finished.
 
-      else:
+The log is read one line at a time, and the monotasks are written to a data file that gnuplot
+plots with the vectors (or boxxyerror) style, rather than as one gnuplot arrow per monotask (which
+is unusably slow for more than a few thousand monotasks). Only one stage's monotasks are held in
+memory at once.
+
+By default, the monotasks in each stage are drawn one per row, sorted by start time, with each
+stage's rows starting at the bottom of the graph. With --lanes, each resource's monotasks are drawn
+in a separate lane, and each monotask is drawn in a row of its lane that's free when it starts, so
+the height of a lane is the most monotasks that used the resource at once.
+"""
+
+import argparse
+import collections
+import heapq
+import inspect
+from os import path
+import re
+
+import gnuplot_session
+
+NETWORK = "network"
+COMPUTE = "compute"
+DISK = "disk"
+# Resources in the order that their lanes are drawn (from the bottom of the graph).
+RESOURCES = [COMPUTE, NETWORK, DISK]
+RESOURCE_TO_LINE_STYLE = {NETWORK: 1, COMPUTE: 2, DISK: 3}
+VECTORS = "vectors"
+BOXES = "boxes"
+STYLES = [VECTORS, BOXES]
+
+# Times are in milliseconds since the epoch (so monotasks sort by start time). stage_id is the id of
+# a compute monotask's stage, and is None for other monotasks. For network monotasks, macrotask_id
+# is the id of the reduce task that the data was fetched for, so that it's easier to match them with
+# the compute monotasks that use the data.
+Monotask = collections.namedtuple(
+  "Monotask", ["start", "end", "resource", "macrotask_id", "stage_id"])
+
+
+def get_monotask_line_regex(offset=0):
+  """ Returns a regex that matches a monotask's log line.
+
+  The values are at fixed positions in the line (counting whitespace-separated fields): the
+  macrotask id is field 9, the stage id (or, for network monotasks, the reduce id) is field 12, the
+  runtime is field 15, and the start time (in milliseconds since the epoch) is field 19. offset is
+  the number of extra fields at the beginning of each line (e.g., 1 if the log's timestamps include
+  milliseconds).
+  """
+  return re.compile(
+    r"\s*(?:\S+\s+){%d}(?P<macrotask_id>\d+)\s+(?:\S+\s+){2}(?P<stage_or_reduce_id>\d+)[)}]*\s+"
+    r"(?:\S+\s+){2}(?P<runtime>\d+)\s+(?:\S+\s+){3}(?P<start>\d+)" % (offset + 9))
+
+
+def get_resource(line):
+  """ Returns the resource used by the monotask described by the given log line, or None if the
+  line doesn't describe a monotask. """
+  if "network" in line and "NetworkResponse" not in line:
+    return NETWORK
+  if "compute" in line:
+    return COMPUTE
+  if "disk" in line:
+    return DISK
+  return None
+
+
+def get_monotasks(filename, offset=0):
+  """ Yields a Monotask for each monotask in the given log, in the order they were logged. """
+  line_regex = get_monotask_line_regex(offset)
+  with open(filename, "r") as log_file:
+    for line in log_file:
+      resource = get_resource(line)
+      if resource is None:
+        continue
+      match = line_regex.match(line)
+      if match is None:
         continue
-      stage_data.append([
-        line_style,
-        start_millis - first_start,
-        runtime_millis,
-        macrotask_id])
-      last_end = max(last_end, start_millis + runtime_millis - first_start)
+      macrotask_id, stage_or_reduce_id, runtime, start = match.groups()
+      start = int(start)
+      end = start + int(runtime)
+      if resource == COMPUTE:
+        yield Monotask(start, end, resource, int(macrotask_id), int(stage_or_reduce_id))
+      elif resource == NETWORK:
+        yield Monotask(start, end, resource, int(stage_or_reduce_id), None)
+      else:
+        yield Monotask(start, end, resource, int(macrotask_id), None)
+
+
+def get_stages(monotasks):
+  """ Yields a list of the monotasks in each stage.
+
+  A new stage begins at each compute monotask from a different stage than the previous compute
+  monotask. Other monotasks are put in the stage of the compute monotask before them (network
+  monotasks can't be used to find stages, because they're pipelined with the previous stage).
+  """
+  current_stage_id = 0
+  stage = []
+  for monotask in monotasks:
+    if monotask.stage_id is not None and monotask.stage_id != current_stage_id:
+      if stage:
+        yield stage
+      stage = []
+      current_stage_id = monotask.stage_id
+    stage.append(monotask)
+  if stage:
+    yield stage
+
+
+class Lane(object):
+  """ Assigns a resource's monotasks to rows, so that monotasks in the same row don't overlap. """
+
+  def __init__(self):
+    self.num_rows = 0
+    # A heap with the time when each row becomes free and the row.
+    self.__row_free_times = []
+
+  def add(self, start, end):
+    """ Returns the row for a monotask that runs from start to end: the row that became free
+    first, if it's free at start, and otherwise a new row. """
+    if self.__row_free_times and self.__row_free_times[0][0] <= start:
+      row = self.__row_free_times[0][1]
+      heapq.heapreplace(self.__row_free_times, (end, row))
+    else:
+      row = self.num_rows
+      self.num_rows += 1
+      heapq.heappush(self.__row_free_times, (end, row))
+    return row
+
+
+def write_waterfall_data(monotasks, data_filename, use_lanes=False, window_start=None,
+    window_end=None):
+  """ Writes the waterfall plot's data file, and returns a (first start, last end, number of rows,
+  resource to first row) tuple describing it.
+
+  Times are in milliseconds since the first monotask started. Only monotasks that ran during the
+  window from window_start to window_end (either of which can be None, to not limit the window
+  on that side) are written. Each line in the data file has the start time, end time, row,
+  resource (as an index into RESOURCES), runtime, and macrotask id of a monotask; the row is
+  relative to the first row for the monotask's resource (which is 0 unless use_lanes is true).
+  """
+  resource_to_lane = {resource: Lane() for resource in RESOURCES}
+  resource_to_index = {resource: index for index, resource in enumerate(RESOURCES)}
+  first_start = None
+  last_end = 0
+  max_stage_rows = 0
+  with open(data_filename, "w") as data_file:
+    data_file.write("# start\tend\trow\tresource\truntime\tmacrotask id\n")
+    for stage in get_stages(monotasks):
+      if first_start is None:
+        first_start = stage[0].start
+      if window_start is not None or window_end is not None:
+        stage = [monotask for monotask in stage
+          if ((window_start is None or monotask.end - first_start >= window_start) and
+              (window_end is None or monotask.start - first_start <= window_end))]
+      # Sort the monotasks by start time so that they plot more nicely.
+      stage.sort()
+      lines = []
+      for row, (start, end, resource, macrotask_id, _) in enumerate(stage):
+        if use_lanes:
+          row = resource_to_lane[resource].add(start, end)
+        lines.append("%d\t%d\t%d\t%d\t%d\t%d\n" % (
+          start - first_start, end - first_start, row, resource_to_index[resource], end - start,
+          macrotask_id))
+        last_end = max(last_end, end - first_start)
+      data_file.writelines(lines)
+      max_stage_rows = max(max_stage_rows, len(stage))
+
+  resource_to_first_row = {}
+  num_rows = 0
+  for resource in RESOURCES:
+    resource_to_first_row[resource] = num_rows
+    if use_lanes:
+      num_rows += resource_to_lane[resource].num_rows
+  if not use_lanes:
+    num_rows = max_stage_rows
+  return (first_start, last_end, num_rows, resource_to_first_row)
+
+
+def get_plot_element(data_filename, resource, first_row, style):
+  """ Returns the gnuplot plot element that draws the given resource's monotasks. """
+  # Monotasks for other resources have an undefined y value, so they're skipped.
+  y = "($4 == {} ? $3 + {} : 1/0)".format(RESOURCES.index(resource), first_row + 0.5)
+  if style == VECTORS:
+    using = "1:{}:($2 - $1):(0) with vectors nohead".format(y)
+  else:
+    using = "(($1 + $2) / 2):{0}:1:2:({0} - 0.4):({0} + 0.4) with boxxyerror".format(y)
+  return "\"{}\" using {} ls {} title \"{}\"".format(
+    data_filename, using, RESOURCE_TO_LINE_STYLE[resource], resource.capitalize())
+
+
+def get_labels_element(data_filename, resource, first_row):
+  """ Returns a gnuplot plot element that labels each of the given resource's monotasks with its
+  runtime and macrotask id. """
+  return ("\"{}\" using 2:($4 == {} ? $3 + {} : 1/0):(sprintf(\"%d (%d)\", $5, $6)) "
+    "with labels left font 'Times,5' notitle").format(
+      data_filename, RESOURCES.index(resource), first_row + 0.5)
+
 
-    # Don't forget to plot the last stage!
-    write_stage_data(stage_data, plot_file)
+def plot_monotask_times(filename, offset=0, use_lanes=False, style=VECTORS, window_start=None,
+    window_end=None, labels=False, run_gnuplot=False):
+  """ Writes a waterfall plot of the monotasks in the given log to <filename>_monotask_waterfall.gp
+  (along with the data file it plots), and returns the name of the gnuplot file. If run_gnuplot is
+  true, also runs gnuplot to make <filename>_monotask_waterfall.pdf. """
+  plot_prefix = "{}_monotask_waterfall".format(filename)
+  data_filename = "{}_data".format(plot_prefix)
+  first_start, last_end, num_rows, resource_to_first_row = write_waterfall_data(
+    get_monotasks(filename, offset), data_filename, use_lanes, window_start, window_end)
+  if first_start is None:
+    print "No monotasks found in {}".format(filename)
 
-  return (last_end, max_y)
+  scripts_dir = path.dirname(inspect.stack()[0][1])
+  plot_filename = "{}.gp".format(plot_prefix)
+  with open(plot_filename, "w") as plot_file:
+    with open(path.join(scripts_dir, "gnuplot_files/waterfall_base.gp"), "r") as base_file:
+      for line in base_file:
+        plot_file.write(line)
+    plot_file.write("set output \"{}.pdf\"\n".format(plot_prefix))
+    plot_file.write("set xrange [{}:{}]\n".format(
+      0 if window_start is None else window_start,
+      last_end if window_end is None else window_end))
+    plot_file.write("set yrange [0:{}]\n".format(max(num_rows, 1)))
+    if use_lanes:
+      # Label each lane with its resource, instead of labeling the rows.
+      plot_file.write("set ylabel \"\"\n")
+      plot_file.write("set ytics ({})\n".format(", ".join([
+        "\"{}\" {}".format(resource.capitalize(), resource_to_first_row[resource])
+        for resource in RESOURCES])))
+      plot_file.write("set grid ytics back linestyle 81\n")
 
-first_start = get_first_start(input_filename)
+    elements = [get_plot_element(data_filename, resource, resource_to_first_row[resource], style)
+      for resource in RESOURCES]
+    if labels:
+      elements.extend([get_labels_element(data_filename, resource, resource_to_first_row[resource])
+        for resource in RESOURCES])
+    plot_file.write("plot {}\n".format(",\\\n".join(elements)))
 
-# Write the basic information to generate the waterfall plot.
-plot_prefix = "{}_monotask_waterfall".format(input_filename)
-# Write the template.
-plot_file = open("{}.gp".format(plot_prefix), "w")
-with open("gnuplot_files/waterfall_base.gp", "r") as base_file:
-  for line in base_file:
-    plot_file.write(line)
+  if run_gnuplot:
+    gnuplot_session.plot(plot_filename)
+  return plot_filename
 
-plot_file.write("set output \"{}.pdf\"\n".format(plot_prefix))
 
-# Write one line for each monotask.
-last_end, max_y = write_monotask_times(input_filename, plot_file, first_start)
+def parse_args():
+  parser = argparse.ArgumentParser(description="Makes a waterfall plot of the monotasks in a log.")
+  parser.add_argument("filename", help="The path to an executor log with monotask runtimes.")
+  parser.add_argument("--offset",
+                      help="number of extra fields at the beginning of each log line (e.g., 1 "
+                           "if the timestamps include milliseconds)",
+                      type=int, default=0)
+  parser.add_argument("-l", "--lanes",
+                      help="draw each resource's monotasks in a separate lane",
+                      action="store_true", default=False)
+  parser.add_argument("-s", "--style",
+                      help="how to draw each monotask (as a line or a box)",
+                      choices=STYLES, default=VECTORS)
+  parser.add_argument("--start",
+                      help="beginning of the time window to plot (in milliseconds since the "
+                           "first monotask started)",
+                      type=int, default=None)
+  parser.add_argument("--end",
+                      help="end of the time window to plot (in milliseconds since the first "
+                           "monotask started)",
+                      type=int, default=None)
+  parser.add_argument("--labels",
+                      help="label each monotask with its runtime and macrotask id (only "
+                           "readable for small logs)",
+                      action="store_true", default=False)
+  parser.add_argument("-g", "--gnuplot",
+                      help="run gnuplot to make the PDF",
+                      action="store_true", default=False)
+  return parser.parse_args()
 
-plot_file.write("set xrange [0:{}]\n".format(last_end))
-plot_file.write("set yrange [0:{}]\n".format(max_y))
-plot_file.write("plot -1 ls 2 title \"Compute\", -1 ls 1 title \"Network\"\n")
 
-plot_file.close()
+def main():
+  args = parse_args()
+  plot_filename = plot_monotask_times(args.filename, args.offset, args.lanes, args.style,
+    args.start, args.end, args.labels, args.gnuplot)
+  print "Wrote {}".format(plot_filename)
 
+if __name__ == "__main__":
+  main()
@@ -20,11 +20,9 @@ generated by the run_basic_disk_job.py script.
 
 import argparse
 import math
-from matplotlib import pyplot
-from matplotlib.backends import backend_pdf
-import os
 from os import path
 
+import experiment_index
 import parse_event_logs
 import utils
 
@@ -34,13 +32,15 @@ def main():
   num_threads_to_jcts = {}
 
   log_dir = args.log_dir
-  for trial_log_dir in os.listdir(log_dir):
-    trial_log_dir_filepath = path.join(log_dir, trial_log_dir)
-    if path.isdir(trial_log_dir_filepath):
-      utils.plot_continuous_monitors(trial_log_dir_filepath)
-      num_threads = __get_num_threads_from_log_dir(trial_log_dir)
-      jcts = __get_jcts_from_logs(trial_log_dir_filepath, args.warmup_count)
-      num_threads_to_jcts[num_threads] = jcts
+  runs = experiment_index.get_runs(log_dir)
+  utils.plot_continuous_monitors_in_dirs([run.directory for run in runs])
+  for run in runs:
+    if run.event_log is None:
+      continue
+    # The last parameter of each run is the number of threads per disk.
+    num_threads = run.params[-1]
+    jcts = __get_jcts_from_logs(run.event_log, args.warmup_count)
+    num_threads_to_jcts[num_threads] = jcts
 
   assert len(num_threads_to_jcts) > 0, "No valid logs found in {}".format(log_dir)
 
@@ -81,12 +81,11 @@ def __parse_args():
   return args
 
 
-def __get_jcts_from_logs(log_dir, warmup_count):
+def __get_jcts_from_logs(event_log_filepath, warmup_count):
   """
-  Returns a tuple of (list of write job JCTs, list of read job JCTs) parsed from the event log
-  contained in the provided directory.
+  Returns a tuple of (list of write job JCTs, list of read job JCTs) parsed from the provided event
+  log.
   """
-  event_log_filepath = path.join(log_dir, "event_log")
   sorted_job_pairs = sorted(parse_event_logs.Analyzer(event_log_filepath).jobs.iteritems())
   return (__get_jcts_for_phase(sorted_job_pairs, warmup_count, phase="write"),
     __get_jcts_for_phase(sorted_job_pairs, warmup_count, phase="read"))
@@ -104,14 +103,6 @@ def __get_jcts_for_phase(sorted_job_pairs, warmup_count, phase):
   return [job.runtime() / 1000.0 for job in filterer(warmup_count, sorted_job_pairs)]
 
 
-def __get_num_threads_from_log_dir(log_dir):
-  """
-  Extracts the number of threads per disk from the specified log directory name. log_dir should
-  be of the form: experiment_log_<experiment parameters>_<num threads per disk>_<timestamp>
-  """
-  return int(log_dir.split("_")[-2])
-
-
 def __create_num_threads_vs_jct_graph(num_threads_to_jcts, output_dir, phase):
   """
   Create a graph of num threads per disk vs. JCT for the specified phase, which must be either
@@ -119,6 +110,9 @@ def __create_num_threads_vs_jct_graph(num_threads_to_jcts, output_dir, phase):
     { num threads : ( list of write JCTs, list of read JCTs ) }
   """
   assert phase in ["write", "read"]
+  import plot_matplotlib
+  pyplot = plot_matplotlib.get_pyplot()
+  from matplotlib.backends import backend_pdf
 
   num_ticks = len(num_threads_to_jcts) + 2
   xmax = num_ticks - 1
@@ -19,13 +19,9 @@ This script graphs the runtimes of a series of experiments with different number
 
 import argparse
 import functools
-from matplotlib import pyplot
-from matplotlib.backends import backend_pdf
-import numpy
-import os
 from os import path
-import re
 
+import experiment_index
 import parse_event_logs
 
 
@@ -68,21 +64,11 @@ def __parse_args():
 def __get_num_tasks_to_event_log(log_dir):
   """
   Returns a mapping from a number of tasks to the path to an event log file, for each experiment
-  result directory in log_dir. The name of each directory in log_dir must start with
-  "experiment_log".
+  run in log_dir that has an event log (see experiment_index). The parameters of each run must
+  be of the form "<num workers>_<num tasks>_<other params>".
   """
-  all_dirs = [path.join(log_dir, dirname)
-    for dirname in os.listdir(log_dir) if "experiment_log" in dirname]
-  return {__extract_num_tasks(dirpath): path.join(log_dir, dirpath, "event_log")
-    for dirpath in all_dirs if "event_log" in os.listdir(dirpath)}
-
-
-def __extract_num_tasks(dirpath):
-  """
-  Extracts the number of tasks from the provided result directory path. The result directory name
-  must be of the form "experiment_log_<num workers>_<num tasks>_<other params>".
-  """
-  return int(re.search('experiment_log_[0-9]*_([0-9]*)_', dirpath).group(1))
+  return {run.params[1]: run.event_log
+    for run in experiment_index.get_runs(log_dir) if run.event_log is not None}
 
 
 def __get_num_tasks_to_jcts(log_dir, num_warmup_trials):
@@ -110,6 +96,9 @@ def __filterer(num_warmup_trials, all_jobs_dict):
 
 def __plot_num_tasks_vs_jct(monotasks_num_tasks_to_jcts, spark_num_tasks_to_jcts, output_dir):
   """ Creates a graph of num tasks vs. JCT, with a line for Monotasks and a line for Spark. """
+  import plot_matplotlib
+  pyplot = plot_matplotlib.get_pyplot()
+  from matplotlib.backends import backend_pdf
   pyplot.title("Num tasks vs. JCT")
   pyplot.xlabel("Num tasks")
   pyplot.ylabel("JCT (s)")
@@ -134,6 +123,9 @@ def __get_max_jct(num_tasks_to_jcts):
 
 def __plot_single_num_tasks_vs_jcts(num_tasks_to_jcts, label):
   """ Adds a line to the current graph of num tasks vs. JCT. """
+  import numpy
+  import plot_matplotlib
+  pyplot = plot_matplotlib.get_pyplot()
   all_num_tasks, all_jcts = zip(*sorted(num_tasks_to_jcts.iteritems()))
   medians = [numpy.median(jcts) for jcts in all_jcts]
   yerr = zip(*[[medians[i] - min(all_jcts[i]), max(all_jcts[i]) - medians[i]]
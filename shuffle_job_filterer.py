@@ -5,7 +5,7 @@ def filter(all_jobs_dict):
     if len(job.stages) > 1:
       continue
     for stage_id, stage in job.stages.iteritems():
-      if len(stage.tasks) > 5:
+      if stage.num_tasks() > 5:
         filtered_jobs.append((job_id, job))
         continue
   return {k:v for (k,v) in filtered_jobs}
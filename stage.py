@@ -1,124 +1,52 @@
 import logging
+import numpy
 
 import metrics
 from task import Task
-
-
-class Stage:
-  def __init__(self):
-    self.start_time = -1
-    self.tasks = []
-
-  def average_task_runtime(self):
-    return sum([t.runtime() for t in self.tasks]) * 1.0 / len(self.tasks)
+from task_table import TaskTableBuilder
+import weighted_percentiles
+
+# Disks whose per-task utilization is summarized by Analyzer.output_utilizations.
+UTILIZATION_DISK_NAMES = ["xvdb", "xvdf"]
+# Used to convert network throughputs (in bytes per second) and CPU utilizations (summed over the
+# cores) to utilizations.
+NETWORK_BANDWIDTH_BPS = 1.0e9 / 8
+NUM_CORES = 8.
+# Names of the distributions returned by get_utilization_distributions().
+UTILIZATION_DISTRIBUTION_NAMES = [
+  "task_runtimes",
+  "disk_utilization",
+  "disk_throughput",
+  "network_utilization",
+  "network_utilization_recv",
+  "network_utilization_fetch_only",
+  "cpu_utilization",
+  "cpu_process_user_utilization",
+  "cpu_process_system_utilization",
+]
+
+
+class BaseStage(object):
+  """ Methods shared by Stage and stage_summary.StageSummary.
+
+  These only use the aggregates that both kinds of stage provide (e.g., num_tasks(), input_mb(),
+  and get_executor_id_to_resource_metrics()), and not the stage's individual tasks.
+  """
 
   def __str__(self):
-    max_task_runtime = max([t.runtime() for t in self.tasks])
-    if self.tasks[0].has_fetch:
-      input_method = "shuffle"
-    else:
-      input_method = self.tasks[0].input_read_method
     return (("%s tasks (avg runtime: %s, max runtime: %s) Start: %s, runtime: %s, "
-      "Max concurrency: %s, "
-      "Input MB: %s (from %s), Output MB: %s, Straggers: %s, Progress rate straggers: %s, "
-      "Progress rate stragglers explained by scheduler delay (%s), HDFS read (%s), "
-      "HDFS and read (%s), GC (%s), Network (%s), JIT (%s), output rate stragglers: %s") %
-      (len(self.tasks), self.average_task_runtime(), max_task_runtime, self.start_time,
-       self.finish_time() - self.start_time, concurrency.get_max_concurrency(self.tasks),
-       self.input_mb(), input_method, self.output_mb(),
-       self.traditional_stragglers(), self.progress_rate_stragglers()[0],
-       self.scheduler_delay_stragglers()[0], self.hdfs_read_stragglers()[0],
-       self.hdfs_read_and_scheduler_delay_stragglers()[0], self.gc_stragglers()[0],
-       # Do not compute the JIT stragglers here! Screws up the calculation.
-       self.network_stragglers()[0], -1,
-       self.output_progress_rate_stragglers()[0]))
+      "Input MB: %s (from %s), Output MB: %s") %
+      (self.num_tasks(), self.average_task_runtime(), self.max_task_runtime(), self.start_time,
+       self.runtime(), self.input_mb(), self.input_read_method(), self.output_mb()))
 
   def verbose_str(self):
-    # Get info about the longest task.
-    max_index = -1
-    max_runtime = -1
-    for i, task in enumerate(self.tasks):
-      if task.runtime() > max_runtime:
-        max_runtime = task.runtime()
-        max_index = i
-    return "%s\n    Longest Task: %s" % (self, self.tasks[i])
-
-  def get_executor_id_to_resource_metrics(self):
-    """Compiles a description of this stage's resource usage on each executor.
-
-    Returns a mapping from executor id to an ExecutorResourceMetrics object containing the
-    executor's CPU, network, and GC resource usage while this stage was running.
-    """
-    return {executor: metrics.ExecutorResourceMetrics.get_resource_metrics_for_executor_tasks(tasks)
-      for executor, tasks in self.get_executor_id_to_tasks().iteritems()}
-
-  def get_executor_id_to_tasks(self):
-    """
-    Returns a mapping from executor id to a list of all the tasks from this stage that ran on that
-    executor.
-    """
-    executor_id_to_tasks = {}
-    for task in self.tasks:
-      if task.executor_id not in executor_id_to_tasks:
-        executor_id_to_tasks[task.executor_id] = []
-      executor_id_to_tasks[task.executor_id].append(task)
-    return executor_id_to_tasks
-
-  def load_balancing_badness(self):
-    executor_id_to_tasks = self.get_executor_id_to_tasks()
-    total_time = 0
-    for executor_id, tasks in executor_id_to_tasks.iteritems():
-      min_start_time = min([t.start_time for t in tasks])
-      max_finish_time = max([t.finish_time for t in tasks])
-      total_time += max_finish_time - min_start_time
-
-    ideal_time = total_time / len(executor_id_to_tasks)
-    return float(self.runtime()) / ideal_time
+    return "%s\n    Longest Task: %s" % (self, self.get_longest_task())
 
   def runtime(self):
     return self.finish_time() - self.start_time
 
-  def has_shuffle_read(self):
-    total_shuffle_read_bytes = sum(
-      [t.remote_mb_read + t.local_mb_read for t in self.tasks if t.has_fetch])
-    return total_shuffle_read_bytes > 0
-
-  def finish_time(self):
-    return max([t.finish_time for t in self.tasks])
-
-  def total_runtime(self):
-    return sum([t.finish_time - t.start_time for t in self.tasks])
-
-  def input_mb(self):
-    """ Returns the total input size for this stage.
-
-    This is only valid if the stage read data from a shuffle.
-    """
-    total_input_bytes = sum([t.remote_mb_read + t.local_mb_read for t in self.tasks if t.has_fetch])
-    total_input_bytes += sum([t.input_mb for t in self.tasks])
-    return total_input_bytes
-
-  def output_mb(self):
-    """ Returns the total output size for this stage.
-
-    This is only valid if the output data was written for a shuffle.
-    TODO: Add HDFS / in-memory RDD output size.
-    """
-    total_output_size = sum([t.shuffle_mb_written for t in self.tasks])
-    return total_output_size
-
-  def get_network_mb(self):
-    return sum([t.remote_mb_read for t in self.tasks if t.has_fetch])
-
   def add_event(self, data):
-    task = Task(data)
-
-    if self.start_time == -1:
-      self.start_time = task.start_time
-    else:
-      self.start_time = min(self.start_time, task.start_time)
-
-    self.tasks.append(task)
+    self.add_task(Task(data))
 
   def ideal_time_s(self, network_throughput_gigabits_per_executor, num_cores_per_executor):
     ideal_times = self.get_ideal_times_from_metrics(
@@ -127,9 +55,9 @@ class Stage:
     return max(ideal_times)
 
   def get_ideal_ser_deser_time_s(self, num_cores_per_executor = 8):
-    num_executors = len(self.get_executor_id_to_tasks())
-    total_ser_time_millis = sum([t.hdfs_ser_comp_millis for t in self.tasks])
-    total_deser_time_millis = sum([t.hdfs_deser_decomp_millis for t in self.tasks])
+    num_executors = self.num_executors()
+    total_ser_time_millis = self.total_hdfs_ser_comp_millis()
+    total_deser_time_millis = self.total_hdfs_deser_decomp_millis()
     return (float(total_ser_time_millis + total_deser_time_millis) /
       (num_executors * num_cores_per_executor * 1000))
 
@@ -197,8 +125,8 @@ class Stage:
       # about whether the shuffle data was in-memory or on-disk.
       if total_disk_throughput_Bps > 0:
          # Hardcode: this is roughly the ec2 disk throughput.
-        ideal_disk_s = float(total_disk_bytes_read_written) /
-          (metrics.AWS_DISK_BYTES_PER_SECOND * num_executors * len(disks)) #total_disk_throughput_Bps
+        ideal_disk_s = (float(total_disk_bytes_read_written) /
+          (metrics.AWS_DISK_BYTES_PER_SECOND * num_executors * len(disks))) #total_disk_throughput_Bps
       else:
         ideal_disk_s = 0
         if total_disk_bytes_read_written > 0:
@@ -224,61 +152,72 @@ class Stage:
     monotask just has the total disk time, but doesn't break that into local versus remote
     time, or into how much time was spent on each local disk.
     """
-    max_executor_cpu_millis = 0
-    max_network_seconds = 0
-    max_disk_seconds = 0
-
     executor_id_to_metrics = self.get_executor_id_to_resource_metrics()
-    network_throughput_Bps = network_throughput_gigabits_per_executor * 1024 * 1024 * 1024 / 8.0
-    for executor_id, executor_metrics in executor_id_to_metrics.iteritems():
-      tasks_for_executor = [t for t in self.tasks if t.executor_id == executor_id]
+    executor_id_to_monotask_millis = self.get_executor_id_to_monotask_millis()
+    executor_ids = executor_id_to_metrics.keys()
+    executor_metrics = [executor_id_to_metrics[executor_id] for executor_id in executor_ids]
 
+    # The CPU time only needs one division per executor, so it uses Python numbers (which keeps the
+    # integer division when the monotask totals are integers).
+    max_executor_cpu_millis = 0
+    for executor_id, metrics in zip(executor_ids, executor_metrics):
       # For monotasks, always use the monotask time (not the underlying OS counters) to
       # compute the ideal time, for consistency with the model described in the paper.
-      executor_cpu_millis = (sum([t.compute_monotask_millis for t in tasks_for_executor]) /
-        num_cores_per_executor)
+      executor_cpu_millis = executor_id_to_monotask_millis[executor_id][0] / num_cores_per_executor
       if executor_cpu_millis == 0:
         # This is a Spark job, so use the CPU counters.
-        executor_cpu_millis = (float(executor_metrics.cpu_metrics.cpu_millis) /
-          num_cores_per_executor)
+        executor_cpu_millis = float(metrics.cpu_metrics.cpu_millis) / num_cores_per_executor
       max_executor_cpu_millis = max(max_executor_cpu_millis, executor_cpu_millis)
 
-      # Use the bytes transmitted to calculate the network time. Could alternately use the
-      # bytes received (this won't include any packets that were dropped).
-      executor_network_seconds = (
-        float(executor_metrics.network_metrics.bytes_transmitted) / network_throughput_Bps)
-      max_network_seconds = max(max_network_seconds, executor_network_seconds)
+    # Use the bytes transmitted to calculate the network time. Could alternately use the
+    # bytes received (this won't include any packets that were dropped).
+    network_throughput_Bps = network_throughput_gigabits_per_executor * 1024 * 1024 * 1024 / 8.0
+    bytes_transmitted = numpy.array(
+      [m.network_metrics.bytes_transmitted for m in executor_metrics], dtype=numpy.float64)
+    max_network_seconds = self.__max_or_zero(bytes_transmitted / network_throughput_Bps)
 
-      # For the disks, also assume there's no flexibility in which disk data gets written to.
-      # TODO: Should be calculating the disk time based on the disk monotasks, not based on the OS
-      # counters.
-      disks = set()
-      for disk_name, disk_metrics in executor_metrics.disk_name_to_metrics.iteritems():
-        if disk_name in ["xvdb", "xvdc", "xvdf"]:
-          disks.add(disk_name)
-          disk_bytes_read_written = disk_metrics.bytes_read + disk_metrics.bytes_written
-          if not use_disk_monotask_times:
-            # TODO: Don't use the effective throughput! This can be wrong.
-            disk_throughput = disk_metrics.effective_throughput_Bps()
-            if disk_bytes_read_written > 0 and disk_throughput > 0:
-              disk_seconds = disk_bytes_read_written / disk_throughput
-              max_disk_seconds = max(max_disk_seconds, disk_seconds)
-      if use_disk_monotask_times:
-        # Calcuate the ideal disk time based on the monotask times.
-        # TODO: Remote reads aren't calculated correctly: when there's a shuffle read, some of the
-        # task's data was read from remote disks, so it's not correct to count it as for the local
-        # disk.
-        total_disk_monotask_millis = sum([t.disk_monotask_millis for t in tasks_for_executor])
-        disk_seconds = float(total_disk_monotask_millis) / (len(disks) * 1000)
+    # For the disks, also assume there's no flexibility in which disk data gets written to.
+    # TODO: Should be calculating the disk time based on the disk monotasks, not based on the OS
+    # counters.
+    executor_disk_metrics = [
+      [disk_metrics for disk_name, disk_metrics in m.disk_name_to_metrics.iteritems()
+        if disk_name in ["xvdb", "xvdc", "xvdf"]]
+      for m in executor_metrics]
+    if use_disk_monotask_times:
+      # Calcuate the ideal disk time based on the monotask times.
+      # TODO: Remote reads aren't calculated correctly: when there's a shuffle read, some of the
+      # task's data was read from remote disks, so it's not correct to count it as for the local
+      # disk.
+      max_disk_seconds = 0
+      for executor_id, disk_metrics in zip(executor_ids, executor_disk_metrics):
+        disk_seconds = (float(executor_id_to_monotask_millis[executor_id][1]) /
+          (len(disk_metrics) * 1000))
         max_disk_seconds = max(max_disk_seconds, disk_seconds)
+    else:
+      all_disk_metrics = [disk_metrics for disk_metrics_for_executor in executor_disk_metrics
+        for disk_metrics in disk_metrics_for_executor]
+      disk_bytes_read_written = numpy.array(
+        [d.bytes_read + d.bytes_written for d in all_disk_metrics], dtype=numpy.float64)
+      # TODO: Don't use the effective throughput! This can be wrong.
+      disk_throughputs = numpy.array(
+        [d.effective_throughput_Bps() for d in all_disk_metrics], dtype=numpy.float64)
+      used_disks = (disk_bytes_read_written > 0) & (disk_throughputs > 0)
+      max_disk_seconds = self.__max_or_zero(
+        disk_bytes_read_written[used_disks] / disk_throughputs[used_disks])
 
     return (max_executor_cpu_millis / 1000., max_network_seconds, max_disk_seconds)
 
+  def __max_or_zero(self, values):
+    """ Returns the largest of the given NumPy array of values, or 0 if none are positive. """
+    if len(values) == 0:
+      return 0
+    return max(0, float(numpy.max(values)))
+
   def __get_ideal_cpu_s(self, total_cpu_millis_os_counters, num_executors, num_cores_per_executor):
     # Attempt to use the CPU monotask time to compute the ideal time. If the CPU monotask time
     # is 0, that means this was a Spark job, in which case we have no choice but to use the OS
     # counters.
-    total_cpu_monotask_millis = sum([t.compute_monotask_millis for t in self.tasks])
+    total_cpu_monotask_millis = self.total_compute_monotask_millis()
     if total_cpu_monotask_millis > 0:
       # The compute monotask time should be very close to the time from the OS counters.
       self.__check_times_within_error_bound(
@@ -302,7 +241,7 @@ class Stage:
     TODO: Ideally we'd have the disk each monotask ran on, so we could calculate the degree to which
     issues were because of load balancing issues across the disks.
     """
-    total_disk_monotask_millis = sum([t.disk_monotask_millis for t in self.tasks])
+    total_disk_monotask_millis = self.total_disk_monotask_millis()
     return float(total_disk_monotask_millis) / (num_executors * disks_per_executor * 1000)
 
   def __get_ideal_network_s(self, total_network_bytes_os_counters, total_network_throughput_Bps):
@@ -334,3 +273,282 @@ class Stage:
       if base_time > 0 and second_time > 0:
         logging.warning(error_message)
 
+
+class Stage(BaseStage):
+  """ A stage that keeps every task's attributes, so that its tasks can be analyzed individually.
+
+  Each task's attributes are appended to a row of the stage's TaskTable as the task is added, and
+  Task objects are only created (as views of their rows) when they're needed.
+  """
+
+  def __init__(self, task_table=None):
+    """ If task_table is given (e.g., a TaskTable loaded from a task_cache), the stage has the
+    tasks that it describes, and no more tasks can be added. """
+    self.start_time = -1
+    self.__task_table_builder = None
+    # TaskTable with the rows added so far, which is created when it's first needed after a task
+    # is added.
+    self.__task_table = task_table
+    if task_table is None:
+      self.__task_table_builder = TaskTableBuilder()
+    elif len(task_table) > 0:
+      self.start_time = int(numpy.min(task_table.columns["start_time"]))
+    # Results of the more expensive aggregations over the tasks, keyed by method name. Cleared
+    # whenever a task is added.
+    self.__cached_results = {}
+
+  def num_tasks(self):
+    if self.__task_table_builder is None:
+      return len(self.__task_table)
+    return self.__task_table_builder.num_tasks
+
+  @property
+  def tasks(self):
+    """ A list of Tasks that are views of the rows of get_task_table(). The list is cached until a
+    task is added, so callers must not modify it. """
+    return self.__get_cached_result("tasks", lambda: [self.get_task_table().get_task(row)
+      for row in xrange(self.num_tasks())])
+
+  def get_task_table(self):
+    """ Returns a TaskTable describing this stage's tasks. """
+    if self.__task_table is None:
+      self.__task_table = self.__task_table_builder.build()
+    return self.__task_table
+
+  def average_task_runtime(self):
+    return numpy.sum(self.get_task_table().runtimes()) * 1.0 / self.num_tasks()
+
+  def max_task_runtime(self):
+    return int(numpy.max(self.get_task_table().runtimes()))
+
+  def get_longest_task(self):
+    """ Returns the task with the longest runtime (the first one to be added, if there's a tie). """
+    task_table = self.get_task_table()
+    return task_table.get_task(int(numpy.argmax(task_table.runtimes())))
+
+  def input_read_method(self):
+    """ Returns "shuffle" if this stage read shuffle data, and otherwise the method that the
+    stage's first task used to read its input. """
+    if self.has_shuffle_read():
+      return "shuffle"
+    return self.get_task_table().get_task_attribute(0, "input_read_method")
+
+  def __get_cached_result(self, name, compute_result):
+    """ Returns the cached result for the given name, calling compute_result if there isn't one.
+    """
+    if name not in self.__cached_results:
+      self.__cached_results[name] = compute_result()
+    return self.__cached_results[name]
+
+  def get_executor_id_to_resource_metrics(self):
+    """Compiles a description of this stage's resource usage on each executor.
+
+    Returns a mapping from executor id to an ExecutorResourceMetrics object containing the
+    executor's CPU, network, and GC resource usage while this stage was running. The result is
+    cached until a task is added, so callers must not modify it.
+    """
+    return self.__get_cached_result(
+      "get_executor_id_to_resource_metrics", self.__compute_executor_id_to_resource_metrics)
+
+  def __compute_executor_id_to_resource_metrics(self):
+    return metrics.ExecutorResourceMetrics.get_resource_metrics_for_task_table(
+      self.get_task_table())
+
+  def get_executor_id_to_tasks(self):
+    """
+    Returns a mapping from executor id to a list of all the tasks from this stage that ran on that
+    executor. The result is cached until a task is added, so callers must not modify it.
+    """
+    return self.__get_cached_result(
+      "get_executor_id_to_tasks", self.__compute_executor_id_to_tasks)
+
+  def __compute_executor_id_to_tasks(self):
+    task_table = self.get_task_table()
+    rows, offsets = task_table.get_executor_groups()
+    rows = rows.tolist()
+    offsets = offsets.tolist()
+    return {executor_id: [self.tasks[row] for row in rows[offsets[i]:offsets[i + 1]]]
+      for i, executor_id in enumerate(task_table.executor_ids)}
+
+  def get_executor_id_to_host(self):
+    task_table = self.get_task_table()
+    return dict(zip(task_table.executor_ids, task_table.executor_hosts))
+
+  def get_executor_monotask_millis(self, executor_id):
+    """
+    Returns a 2-tuple with the total compute and disk monotask time (in milliseconds) of the tasks
+    from this stage that ran on the given executor.
+    """
+    return self.get_executor_id_to_monotask_millis()[executor_id]
+
+  def get_executor_id_to_monotask_millis(self):
+    """
+    Returns a mapping from executor id to the 2-tuple returned by get_executor_monotask_millis. The
+    result is cached until a task is added, so callers must not modify it.
+    """
+    return self.__get_cached_result(
+      "get_executor_id_to_monotask_millis", self.__compute_executor_id_to_monotask_millis)
+
+  def __compute_executor_id_to_monotask_millis(self):
+    task_table = self.get_task_table()
+    return {executor_id: (compute_millis, disk_millis)
+      for executor_id, compute_millis, disk_millis in zip(
+        task_table.executor_ids,
+        task_table.sum_by_executor("compute_monotask_millis").tolist(),
+        task_table.sum_by_executor("disk_monotask_millis").tolist())}
+
+  def get_compute_monotask_distribution(self):
+    """ Returns a weighted_percentiles.WeightedValues with the compute monotask time of each task
+    in this stage. """
+    return weighted_percentiles.WeightedValues(
+      self.get_task_table().columns["compute_monotask_millis"])
+
+  def get_utilization_distributions(self):
+    """
+    Returns a dictionary mapping each of UTILIZATION_DISTRIBUTION_NAMES to a
+    weighted_percentiles.WeightedValues describing the resource utilization while this stage's
+    tasks were running: "task_runtimes" has the (unweighted) runtime of each task, and the others
+    have the utilization of each task weighted by its runtime. "network_utilization" has both the
+    received and transmitted utilization, and "network_utilization_fetch_only" has the same values
+    for the tasks that fetched shuffle data. The disk distributions have an entry for each task and
+    each of the UTILIZATION_DISK_NAMES disks that the task used.
+    """
+    task_table = self.get_task_table()
+    columns = task_table.columns
+    runtimes = task_table.runtimes()
+    disk_utilizations = []
+    disk_throughputs = []
+    disk_runtimes = []
+    for name in UTILIZATION_DISK_NAMES:
+      if name not in task_table.disk_name_to_columns:
+        continue
+      disk_columns = task_table.disk_name_to_columns[name]
+      present = disk_columns["present"]
+      disk_utilizations.append(disk_columns["utilization"][present])
+      disk_throughputs.append(
+        (disk_columns["read_throughput_Bps"] + disk_columns["write_throughput_Bps"])[present])
+      disk_runtimes.append(runtimes[present])
+    disk_runtimes = numpy.concatenate([numpy.zeros(0, dtype=numpy.int64)] + disk_runtimes)
+    received_utilizations = columns["bytes_received_ps"] / NETWORK_BANDWIDTH_BPS
+    transmitted_utilizations = columns["bytes_transmitted_ps"] / NETWORK_BANDWIDTH_BPS
+    has_fetch = columns["has_fetch"]
+    WeightedValues = weighted_percentiles.WeightedValues
+    return {
+      "task_runtimes": WeightedValues(runtimes),
+      "disk_utilization": WeightedValues(
+        numpy.concatenate([numpy.zeros(0)] + disk_utilizations), disk_runtimes),
+      "disk_throughput": WeightedValues(
+        numpy.concatenate([numpy.zeros(0)] + disk_throughputs), disk_runtimes),
+      "network_utilization": WeightedValues(
+        numpy.concatenate([received_utilizations, transmitted_utilizations]),
+        numpy.concatenate([runtimes, runtimes])),
+      "network_utilization_recv": WeightedValues(received_utilizations, runtimes),
+      "network_utilization_fetch_only": WeightedValues(
+        numpy.concatenate([received_utilizations[has_fetch], transmitted_utilizations[has_fetch]]),
+        numpy.concatenate([runtimes[has_fetch], runtimes[has_fetch]])),
+      "cpu_utilization": WeightedValues(columns["total_cpu_utilization"] / NUM_CORES, runtimes),
+      "cpu_process_user_utilization": WeightedValues(
+        columns["process_user_cpu_utilization"] / NUM_CORES, runtimes),
+      "cpu_process_system_utilization": WeightedValues(
+        columns["process_system_cpu_utilization"] / NUM_CORES, runtimes),
+    }
+
+  def load_balancing_badness(self):
+    min_start_times, max_finish_times = self.__get_executor_task_windows()
+    total_time = int(numpy.sum(max_finish_times - min_start_times))
+
+    ideal_time = total_time / len(min_start_times)
+    return float(self.runtime()) / ideal_time
+
+  def get_executor_id_to_task_window(self):
+    """
+    Returns a mapping from executor id to a (start time, finish time) tuple with the time when the
+    first of this stage's tasks on that executor started and the last one finished.
+    """
+    min_start_times, max_finish_times = self.__get_executor_task_windows()
+    return dict(zip(self.get_task_table().executor_ids,
+      zip(min_start_times.tolist(), max_finish_times.tolist())))
+
+  def __get_executor_task_windows(self):
+    """
+    Returns arrays with the earliest task start time and latest task finish time on each executor,
+    in the order of the task table's executor_ids.
+    """
+    task_table = self.get_task_table()
+    num_executors = len(task_table.executor_ids)
+    executor_indices = task_table.columns["executor_index"]
+    min_start_times = numpy.empty(num_executors, dtype=numpy.int64)
+    min_start_times.fill(numpy.iinfo(numpy.int64).max)
+    numpy.minimum.at(min_start_times, executor_indices, task_table.columns["start_time"])
+    max_finish_times = numpy.empty(num_executors, dtype=numpy.int64)
+    max_finish_times.fill(numpy.iinfo(numpy.int64).min)
+    numpy.maximum.at(max_finish_times, executor_indices, task_table.columns["finish_time"])
+    return (min_start_times, max_finish_times)
+
+  def has_shuffle_read(self):
+    return self.__total_shuffle_read_mb() > 0
+
+  def __total_shuffle_read_mb(self):
+    # The shuffle read columns are 0 for tasks that didn't fetch any data.
+    return self.__sum_fetch_column("remote_mb_read") + self.__sum_fetch_column("local_mb_read")
+
+  def __sum_fetch_column(self, name):
+    # Like the streaming StageSummary, return an integer 0 when no tasks fetched data.
+    if not numpy.any(self.get_task_table().columns["has_fetch"]):
+      return 0
+    return self.__sum_column(name)
+
+  def finish_time(self):
+    return self.__get_cached_result("finish_time",
+      lambda: int(numpy.max(self.get_task_table().columns["finish_time"])))
+
+  def total_runtime(self):
+    return int(numpy.sum(self.get_task_table().runtimes()))
+
+  def input_mb(self):
+    """ Returns the total input size for this stage.
+
+    This is only valid if the stage read data from a shuffle.
+    """
+    return self.__total_shuffle_read_mb() + self.__sum_column("input_mb")
+
+  def output_mb(self):
+    """ Returns the total output size for this stage.
+
+    This is only valid if the output data was written for a shuffle.
+    TODO: Add HDFS / in-memory RDD output size.
+    """
+    return self.__sum_column("shuffle_mb_written")
+
+  def get_network_mb(self):
+    return self.__sum_fetch_column("remote_mb_read")
+
+  def total_compute_monotask_millis(self):
+    return self.__sum_column("compute_monotask_millis")
+
+  def total_disk_monotask_millis(self):
+    return self.__sum_column("disk_monotask_millis")
+
+  def total_hdfs_ser_comp_millis(self):
+    return self.__sum_column("hdfs_ser_comp_millis")
+
+  def total_hdfs_deser_decomp_millis(self):
+    return self.__sum_column("hdfs_deser_decomp_millis")
+
+  def __sum_column(self, name):
+    return float(numpy.sum(self.get_task_table().columns[name]))
+
+  def num_executors(self):
+    return len(self.get_task_table().executor_ids)
+
+  def add_task(self, task):
+    if self.__task_table_builder is None:
+      raise ValueError("Tasks can't be added to a Stage that was created from a TaskTable")
+    if self.start_time == -1:
+      self.start_time = task.start_time
+    else:
+      self.start_time = min(self.start_time, task.start_time)
+
+    self.__task_table_builder.add_task(task)
+    self.__task_table = None
+    self.__cached_results = {}
@@ -0,0 +1,288 @@
+"""
+This file contains a streaming alternative to Stage, which updates a fixed set of aggregates as each
+task is read rather than storing every Task.
+"""
+
+import copy
+
+import metrics
+from stage import (BaseStage, NETWORK_BANDWIDTH_BPS, NUM_CORES, UTILIZATION_DISK_NAMES,
+  UTILIZATION_DISTRIBUTION_NAMES)
+from weighted_percentiles import WeightedHistogram
+
+
+class ExecutorSummary(object):
+  """ Aggregates describing all of the tasks from one stage that ran on one executor. """
+
+  def __init__(self, host):
+    self.host = host
+    self.num_tasks = 0
+    # The executor's resource metrics are computed from the counters reported by the first task
+    # to start and the last task to finish, so these are the only tasks that need to be kept.
+    self.first_task_to_start = None
+    self.last_task_to_finish = None
+    self.compute_monotask_millis = 0
+    self.disk_monotask_millis = 0
+    self.hdfs_deser_decomp_millis = 0
+    self.hdfs_ser_comp_millis = 0
+
+  def add_task(self, task):
+    self.num_tasks += 1
+    # Break ties in the same way as the stable sorts in
+    # ExecutorResourceMetrics.get_resource_metrics_for_executor_tasks: the earliest-added task
+    # wins for the start time, and the latest-added task wins for the finish time.
+    if (self.first_task_to_start is None or
+        task.start_time < self.first_task_to_start.start_time):
+      self.first_task_to_start = task
+    if (self.last_task_to_finish is None or
+        task.finish_time >= self.last_task_to_finish.finish_time):
+      self.last_task_to_finish = task
+    self.compute_monotask_millis += task.compute_monotask_millis
+    self.disk_monotask_millis += task.disk_monotask_millis
+    self.hdfs_deser_decomp_millis += task.hdfs_deser_decomp_millis
+    self.hdfs_ser_comp_millis += task.hdfs_ser_comp_millis
+
+  def merge(self, other):
+    """ Adds the tasks summarized by other, which must have been read after this summary's tasks.
+    """
+    self.num_tasks += other.num_tasks
+    if other.first_task_to_start.start_time < self.first_task_to_start.start_time:
+      self.first_task_to_start = other.first_task_to_start
+    if other.last_task_to_finish.finish_time >= self.last_task_to_finish.finish_time:
+      self.last_task_to_finish = other.last_task_to_finish
+    self.compute_monotask_millis += other.compute_monotask_millis
+    self.disk_monotask_millis += other.disk_monotask_millis
+    self.hdfs_deser_decomp_millis += other.hdfs_deser_decomp_millis
+    self.hdfs_ser_comp_millis += other.hdfs_ser_comp_millis
+
+  def get_resource_metrics(self):
+    return metrics.ExecutorResourceMetrics.get_resource_metrics_for_task_range(
+      first_task_to_start=self.first_task_to_start,
+      last_task_to_finish=self.last_task_to_finish,
+      num_tasks=self.num_tasks,
+      hdfs_deser_decomp_millis=self.hdfs_deser_decomp_millis,
+      hdfs_ser_comp_millis=self.hdfs_ser_comp_millis)
+
+
+class StageSummary(BaseStage):
+  """ A stage that does not store its tasks, so it can't provide a TaskTable.
+
+  Memory use is proportional to the number of executors the stage ran on: the distributions used
+  by the utilization reports and the compute monotask CDFs are kept in
+  weighted_percentiles.WeightedHistograms, which keep every value (so their percentiles are the
+  same as a Stage's) for stages with up to a few thousand tasks, and are approximate (to within 1%)
+  for larger stages. Exact percentiles for large stages require parsing the event log without
+  streaming, so that every task is kept.
+  """
+
+  def __init__(self):
+    self.start_time = -1
+    self.__num_tasks = 0
+    self.__finish_time = -1
+    self.__total_runtime = 0
+    self.__shuffle_read_mb = 0
+    self.__input_mb = 0
+    self.__output_mb = 0
+    self.__network_mb = 0
+    self.__compute_monotask_millis = 0
+    self.__disk_monotask_millis = 0
+    self.__hdfs_ser_comp_millis = 0
+    self.__hdfs_deser_decomp_millis = 0
+    self.__longest_task = None
+    self.__first_input_read_method = None
+    self.executor_id_to_summary = {}
+    # Cached result of get_executor_id_to_resource_metrics(); cleared when a task is added.
+    self.__executor_id_to_resource_metrics = None
+
+    # Distributions returned by get_utilization_distributions() and
+    # get_compute_monotask_distribution().
+    self.__name_to_distribution = {
+      name: WeightedHistogram() for name in UTILIZATION_DISTRIBUTION_NAMES}
+    self.__compute_monotask_distribution = WeightedHistogram()
+
+  def add_task(self, task):
+    if self.start_time == -1:
+      self.start_time = task.start_time
+    else:
+      self.start_time = min(self.start_time, task.start_time)
+    self.__finish_time = max(self.__finish_time, task.finish_time)
+    self.__executor_id_to_resource_metrics = None
+
+    if self.__num_tasks == 0:
+      self.__first_input_read_method = task.input_read_method
+    self.__num_tasks += 1
+    self.__total_runtime += task.finish_time - task.start_time
+    if self.__longest_task is None or task.runtime() > self.__longest_task.runtime():
+      self.__longest_task = task
+    if task.has_fetch:
+      self.__shuffle_read_mb += task.remote_mb_read + task.local_mb_read
+      self.__network_mb += task.remote_mb_read
+    self.__input_mb += task.input_mb
+    self.__output_mb += task.shuffle_mb_written
+    self.__compute_monotask_millis += task.compute_monotask_millis
+    self.__disk_monotask_millis += task.disk_monotask_millis
+    self.__hdfs_ser_comp_millis += task.hdfs_ser_comp_millis
+    self.__hdfs_deser_decomp_millis += task.hdfs_deser_decomp_millis
+
+    if task.executor_id not in self.executor_id_to_summary:
+      self.executor_id_to_summary[task.executor_id] = ExecutorSummary(task.executor)
+    self.executor_id_to_summary[task.executor_id].add_task(task)
+
+    self.__add_to_distributions(task)
+
+  def __add_to_distributions(self, task):
+    name_to_distribution = self.__name_to_distribution
+    runtime = task.runtime()
+    name_to_distribution["task_runtimes"].add(runtime)
+    for name in UTILIZATION_DISK_NAMES:
+      if name in task.disk_utilization:
+        disk_utilization = task.disk_utilization[name]
+        name_to_distribution["disk_utilization"].add(disk_utilization.utilization, runtime)
+        name_to_distribution["disk_throughput"].add(
+          disk_utilization.read_throughput_Bps + disk_utilization.write_throughput_Bps, runtime)
+    received_utilization = task.network_utilization.bytes_received_ps / NETWORK_BANDWIDTH_BPS
+    transmitted_utilization = (
+      task.network_utilization.bytes_transmitted_ps / NETWORK_BANDWIDTH_BPS)
+    network_names = ["network_utilization"]
+    if task.has_fetch:
+      network_names.append("network_utilization_fetch_only")
+    for name in network_names:
+      name_to_distribution[name].add(received_utilization, runtime)
+      name_to_distribution[name].add(transmitted_utilization, runtime)
+    name_to_distribution["network_utilization_recv"].add(received_utilization, runtime)
+    name_to_distribution["cpu_utilization"].add(task.total_cpu_utilization / NUM_CORES, runtime)
+    name_to_distribution["cpu_process_user_utilization"].add(
+      task.process_user_cpu_utilization / NUM_CORES, runtime)
+    name_to_distribution["cpu_process_system_utilization"].add(
+      task.process_system_cpu_utilization / NUM_CORES, runtime)
+    self.__compute_monotask_distribution.add(task.compute_monotask_millis)
+
+  def merge(self, other):
+    """ Adds the tasks summarized by other, which must have been read after this stage's tasks.
+
+    This is used to combine the summaries produced when different parts of an event log are parsed
+    separately. The totals may differ from those computed by reading the log sequentially in the
+    last few bits, because floating point additions happen in a different order. other is not
+    modified, and none of its parts are shared with this stage, so it can be merged into more than
+    one stage.
+    """
+    if self.start_time == -1:
+      self.start_time = other.start_time
+    else:
+      self.start_time = min(self.start_time, other.start_time)
+    self.__finish_time = max(self.__finish_time, other.__finish_time)
+    self.__executor_id_to_resource_metrics = None
+
+    if self.__num_tasks == 0:
+      self.__first_input_read_method = other.__first_input_read_method
+    self.__num_tasks += other.__num_tasks
+    if (self.__longest_task is None or
+        other.__longest_task.runtime() > self.__longest_task.runtime()):
+      self.__longest_task = other.__longest_task
+    self.__total_runtime += other.__total_runtime
+    self.__shuffle_read_mb += other.__shuffle_read_mb
+    self.__input_mb += other.__input_mb
+    self.__output_mb += other.__output_mb
+    self.__network_mb += other.__network_mb
+    self.__compute_monotask_millis += other.__compute_monotask_millis
+    self.__disk_monotask_millis += other.__disk_monotask_millis
+    self.__hdfs_ser_comp_millis += other.__hdfs_ser_comp_millis
+    self.__hdfs_deser_decomp_millis += other.__hdfs_deser_decomp_millis
+
+    for executor_id, summary in other.executor_id_to_summary.iteritems():
+      if executor_id in self.executor_id_to_summary:
+        self.executor_id_to_summary[executor_id].merge(summary)
+      else:
+        self.executor_id_to_summary[executor_id] = copy.copy(summary)
+
+    for name, distribution in other.__name_to_distribution.iteritems():
+      self.__name_to_distribution[name].merge(distribution)
+    self.__compute_monotask_distribution.merge(other.__compute_monotask_distribution)
+
+  def num_tasks(self):
+    return self.__num_tasks
+
+  def average_task_runtime(self):
+    return self.__total_runtime * 1.0 / self.__num_tasks
+
+  def max_task_runtime(self):
+    return self.__longest_task.runtime()
+
+  def get_longest_task(self):
+    return self.__longest_task
+
+  def input_read_method(self):
+    if self.has_shuffle_read():
+      return "shuffle"
+    return self.__first_input_read_method
+
+  def get_executor_id_to_resource_metrics(self):
+    if self.__executor_id_to_resource_metrics is None:
+      self.__executor_id_to_resource_metrics = {executor_id: summary.get_resource_metrics()
+        for executor_id, summary in self.executor_id_to_summary.iteritems()}
+    return self.__executor_id_to_resource_metrics
+
+  def get_executor_id_to_host(self):
+    return {executor_id: summary.host
+      for executor_id, summary in self.executor_id_to_summary.iteritems()}
+
+  def get_executor_monotask_millis(self, executor_id):
+    summary = self.executor_id_to_summary[executor_id]
+    return (summary.compute_monotask_millis, summary.disk_monotask_millis)
+
+  def get_executor_id_to_monotask_millis(self):
+    return {executor_id: (summary.compute_monotask_millis, summary.disk_monotask_millis)
+      for executor_id, summary in self.executor_id_to_summary.iteritems()}
+
+  def get_compute_monotask_distribution(self):
+    return self.__compute_monotask_distribution
+
+  def get_utilization_distributions(self):
+    return self.__name_to_distribution
+
+  def load_balancing_badness(self):
+    total_time = 0
+    for summary in self.executor_id_to_summary.itervalues():
+      total_time += (summary.last_task_to_finish.finish_time -
+        summary.first_task_to_start.start_time)
+
+    ideal_time = total_time / len(self.executor_id_to_summary)
+    return float(self.runtime()) / ideal_time
+
+  def get_executor_id_to_task_window(self):
+    return {executor_id: (summary.first_task_to_start.start_time,
+        summary.last_task_to_finish.finish_time)
+      for executor_id, summary in self.executor_id_to_summary.iteritems()}
+
+  def has_shuffle_read(self):
+    return self.__shuffle_read_mb > 0
+
+  def finish_time(self):
+    return self.__finish_time
+
+  def total_runtime(self):
+    return self.__total_runtime
+
+  def input_mb(self):
+    return self.__shuffle_read_mb + self.__input_mb
+
+  def output_mb(self):
+    return self.__output_mb
+
+  def get_network_mb(self):
+    return self.__network_mb
+
+  def total_compute_monotask_millis(self):
+    return self.__compute_monotask_millis
+
+  def total_disk_monotask_millis(self):
+    return self.__disk_monotask_millis
+
+  def total_hdfs_ser_comp_millis(self):
+    return self.__hdfs_ser_comp_millis
+
+  def total_hdfs_deser_decomp_millis(self):
+    return self.__hdfs_deser_decomp_millis
+
+  def num_executors(self):
+    return len(self.executor_id_to_summary)
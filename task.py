@@ -3,19 +3,51 @@ import logging
 import metrics
 
 
-class Task:
+class Task(object):
+  # Shared by all tasks (rather than stored on each one) so that tasks can be pickled.
+  logger = logging.getLogger("Task")
+  # Should be set to true if this task is a straggler and we know the cause of the
+  # straggler behavior.
+  straggler_behavior_explained = False
+
+  @staticmethod
+  def from_table_row(task_table, row):
+    """ Creates a Task that's a view of the given row of a task_table.TaskTable.
+
+    Each attribute is read from the row (and saved on the task) when it's first used, so creating
+    the task is cheap, and only the attributes that are used are converted to Python objects.
+    """
+    task = Task.__new__(Task)
+    task._task_table = task_table
+    task._row = row
+    return task
+
+  def __getattr__(self, name):
+    # This is only called for attributes that aren't set on the task, which for a task created by
+    # from_table_row includes the attributes that haven't been read from its row yet.
+    task_table = self.__dict__.get("_task_table")
+    if task_table is None or name.startswith("__"):
+      raise AttributeError("'Task' object has no attribute '%s'" % name)
+    value = task_table.get_task_attribute(self._row, name)
+    setattr(self, name, value)
+    return value
+
+  def __getstate__(self):
+    # Pickle (and copy) the attributes of a view, rather than the table that it reads them from.
+    if "_task_table" not in self.__dict__:
+      return self.__dict__
+    state = self._task_table.get_task_attributes(self._row)
+    state.update((name, value) for name, value in self.__dict__.iteritems()
+      if name not in ["_task_table", "_row"])
+    return state
+
   def __init__(self, data):
     self.initialize_from_json(data)
 
     self.scheduler_delay = (self.finish_time - self.executor_run_time -
       self.executor_deserialize_time - self.result_serialization_time - self.start_time)
-    # Should be set to true if this task is a straggler and we know the cause of the
-    # straggler behavior.
-    self.straggler_behavior_explained = False
 
   def initialize_from_json(self, json_data):
-    self.logger = logging.getLogger("Task")
-
     task_info = json_data["Task Info"]
     task_metrics = json_data["Task Metrics"]
     self.task_id = task_info["Task ID"]
@@ -199,7 +231,7 @@ class Task:
             "fetch wait: %s, compute time: %s, gc time: %s, shuffle write time: %s, " +
             "result ser: %s, finish: %s, shuffle bytes: %s, input bytes: %s") %
              (self.start_time, self.local_read_time,
-              self.fetch_wait, self.compute_time(), self.gc_time,
+              self.fetch_wait, self.compute_monotask_millis, self.gc_time,
               self.shuffle_write_time, self.result_serialization_time, self.finish_time - base,
               self.local_mb_read + self.remote_mb_read, self.input_mb))
     else:
@@ -0,0 +1,265 @@
+"""
+This file contains utilities to save the stages parsed from an event log to a columnar cache file,
+so that later analyses of the same event log don't need to parse the JSON again.
+
+The cache is stored next to the event log (in "<event log>.taskcache"), and is only used if the
+size, modification time, and a hash of the beginning and end of the event log match the values
+recorded when the cache was written. The file starts with a JSON header that describes the job
+starts, the stages, and the columns, followed by the raw (little-endian) column data.
+
+Each column has the values of one of the columns of the stages' TaskTables, with each stage's rows
+stored together, so when the cache is loaded, each stage's TaskTable is made of slices of the
+memory-mapped columns (and its Tasks are only created, as views of its rows, if they're needed).
+
+NumPy and task_table (which uses NumPy) are imported by the functions that read and write the
+cache, so that scripts that only check whether caches are valid (like experiment_index) start
+quickly.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+
+CACHE_SUFFIX = ".taskcache"
+MAGIC = "MONOTASKS TASK CACHE\n"
+# Should be incremented whenever the format of the cache (or the set of columns in a TaskTable)
+# changes, so that stale caches are ignored.
+VERSION = 3
+# Number of bytes at the beginning and end of the event log to include in its fingerprint.
+FINGERPRINT_BYTES = 1024 * 1024
+# Each column starts at a multiple of this many bytes.
+ALIGNMENT = 64
+
+# Possible results of get_status().
+VALID = "valid"
+STALE = "stale"
+MISSING = "missing"
+
+# Separates the components of the names of the columns for each disk (e.g.,
+# "disk/xvdb/utilization") and of the masks of integer values (e.g., "int_mask/gc_time").
+SEPARATOR = "/"
+DISK_PREFIX = "disk"
+INT_MASK_PREFIX = "int_mask"
+
+
+def get_cache_filename(event_log_filename):
+  return event_log_filename + CACHE_SUFFIX
+
+
+def get_fingerprint(filename):
+  """ Returns a dictionary that identifies the current contents of the given file.
+
+  Hashing a multi-gigabyte event log would take a significant fraction of the time needed to parse
+  it, so only the first and last FINGERPRINT_BYTES are hashed; the size and modification time
+  catch other changes.
+  """
+  stat = os.stat(filename)
+  content_hash = hashlib.sha1()
+  with open(filename, "rb") as f:
+    content_hash.update(f.read(FINGERPRINT_BYTES))
+    if stat.st_size > FINGERPRINT_BYTES:
+      f.seek(max(FINGERPRINT_BYTES, stat.st_size - FINGERPRINT_BYTES))
+      content_hash.update(f.read())
+  return {"size": stat.st_size, "mtime": stat.st_mtime, "hash": content_hash.hexdigest()}
+
+
+class TaskCacheWriter(object):
+  """ Records the job starts read from an event log, and saves them to a cache along with the
+  TaskTables of the stages that the log's tasks were added to. """
+
+  def __init__(self, event_log_filename):
+    self.event_log_filename = event_log_filename
+    # The fingerprint is computed before parsing, so that the cache is not considered valid if the
+    # event log changes while it is being parsed.
+    self.fingerprint = get_fingerprint(event_log_filename)
+    # (job id, job name, stage ids) for each job, in the order the jobs started.
+    self.job_starts = []
+
+  def add_job_start(self, job_id, job_name, stage_ids):
+    self.job_starts.append((job_id, job_name, stage_ids))
+
+  def write(self, stages):
+    """ Writes the cache file, logging a warning (rather than failing) if that isn't possible.
+
+    stages is a list of (stage id, job ids, TaskTable) tuples, with one for each Stage object that
+    tasks were added to, and the ids of the jobs that share it.
+    """
+    cache_filename = get_cache_filename(self.event_log_filename)
+    temp_filename = "{}.{}.tmp".format(cache_filename, os.getpid())
+    try:
+      with open(temp_filename, "wb") as cache_file:
+        self.__write_to_file(cache_file, stages)
+      # Rename the complete file into place so that a partially written cache is never read.
+      os.rename(temp_filename, cache_filename)
+    except (IOError, OSError) as e:
+      logging.getLogger("TaskCache").warning(
+        "Unable to write task cache {}: {}".format(cache_filename, e))
+      if os.path.exists(temp_filename):
+        os.remove(temp_filename)
+
+  def __write_to_file(self, cache_file, stages):
+    import numpy
+    from task_table import ALL_COLUMN_DTYPES, ALL_DISK_COLUMN_DTYPES
+    stage_descriptions = []
+    num_rows = 0
+    for stage_id, job_ids, task_table in stages:
+      stage_descriptions.append({
+        "stage_id": stage_id,
+        "job_ids": job_ids,
+        "start_row": num_rows,
+        "num_tasks": len(task_table),
+        "executor_ids": task_table.executor_ids,
+        "executor_hosts": task_table.executor_hosts,
+        "input_read_methods": task_table.input_read_methods,
+        "disk_names": sorted(task_table.disk_name_to_columns.keys()),
+        "int_mask_names": sorted(task_table.int_masks.keys())})
+      num_rows += len(task_table)
+
+    # Each column is described by its name, its type, and a function that returns the column's
+    # values for one stage (or None if the stage doesn't have the column, in which case it's 0).
+    columns = [(name, dtype, lambda table, name=name: table.columns[name])
+      for name, dtype in ALL_COLUMN_DTYPES]
+    disk_names = sorted(set(disk_name for _, _, task_table in stages
+      for disk_name in task_table.disk_name_to_columns))
+    for disk_name in disk_names:
+      columns.extend([(_get_disk_column_name(disk_name, name), dtype,
+          lambda table, disk_name=disk_name, name=name:
+            table.disk_name_to_columns.get(disk_name, {}).get(name))
+        for name, dtype in ALL_DISK_COLUMN_DTYPES])
+    int_mask_names = sorted(set(name for _, _, task_table in stages
+      for name in task_table.int_masks))
+    columns.extend([(_get_int_mask_column_name(name), numpy.bool_,
+        lambda table, name=name: table.int_masks.get(name))
+      for name in int_mask_names])
+
+    column_descriptions = []
+    offset = 0
+    for name, dtype, _ in columns:
+      dtype = numpy.dtype(dtype).newbyteorder("<")
+      column_descriptions.append({"name": name, "dtype": dtype.str, "offset": offset})
+      offset = _get_aligned_offset(offset + dtype.itemsize * num_rows)
+
+    header = json.dumps({
+      "version": VERSION,
+      "fingerprint": self.fingerprint,
+      "num_rows": num_rows,
+      "job_starts": self.job_starts,
+      "stages": stage_descriptions,
+      "columns": column_descriptions})
+    cache_file.write(MAGIC)
+    cache_file.write(struct.pack("<Q", len(header)))
+    cache_file.write(header)
+    data_start = _get_aligned_offset(cache_file.tell())
+    for (_, _, get_values), description in zip(columns, column_descriptions):
+      cache_file.write("\0" * (data_start + description["offset"] - cache_file.tell()))
+      dtype = numpy.dtype(description["dtype"])
+      for _, _, task_table in stages:
+        values = get_values(task_table)
+        if values is None:
+          values = numpy.zeros(len(task_table), dtype=dtype)
+        cache_file.write(numpy.asarray(values, dtype=dtype).tostring())
+
+
+def _get_aligned_offset(offset):
+  return (offset + ALIGNMENT - 1) / ALIGNMENT * ALIGNMENT
+
+
+def _get_disk_column_name(disk_name, name):
+  return SEPARATOR.join([DISK_PREFIX, disk_name, name])
+
+
+def _get_int_mask_column_name(name):
+  return SEPARATOR.join([INT_MASK_PREFIX, name])
+
+
+class TaskCache(object):
+  """ The contents of a valid cache file, as returned by load(). """
+
+  def __init__(self, header, data):
+    import numpy
+    # (job id, job name, stage ids) for each job, in the order the jobs started.
+    self.job_starts = [tuple(job_start) for job_start in header["job_starts"]]
+    self.__stage_descriptions = header["stages"]
+    # Mapping of column names to memory-mapped arrays with the column's values for every stage.
+    self.__columns = {description["name"]: _get_column(data, description["offset"],
+        numpy.dtype(description["dtype"]), header["num_rows"])
+      for description in header["columns"]}
+
+  def get_stages(self):
+    """ Returns a list of (stage id, job ids, TaskTable) tuples describing the stages saved in the
+    cache (see TaskCacheWriter.write). The TaskTables' columns are slices of the memory-mapped
+    file, so they aren't read until they're used. """
+    return [(description["stage_id"], description["job_ids"], self.__get_task_table(description))
+      for description in self.__stage_descriptions]
+
+  def __get_task_table(self, description):
+    from task_table import ALL_COLUMN_DTYPES, ALL_DISK_COLUMN_DTYPES, TaskTable
+    start = description["start_row"]
+    end = start + description["num_tasks"]
+    columns = {name: self.__columns[name][start:end] for name, _ in ALL_COLUMN_DTYPES}
+    disk_name_to_columns = {disk_name: {
+        name: self.__columns[_get_disk_column_name(disk_name, name)][start:end]
+        for name, _ in ALL_DISK_COLUMN_DTYPES}
+      for disk_name in description["disk_names"]}
+    int_masks = {name: self.__columns[_get_int_mask_column_name(name)][start:end]
+      for name in description["int_mask_names"]}
+    return TaskTable(description["num_tasks"], columns, description["executor_ids"],
+      description["executor_hosts"], description["input_read_methods"], disk_name_to_columns,
+      int_masks)
+
+
+def _get_column(data, offset, dtype, length):
+  return data[offset:offset + dtype.itemsize * length].view(dtype)
+
+
+def _read_header(cache_filename):
+  """ Returns a (header, offset of the column data) tuple for the given cache file, or
+  (None, None) if the file isn't a task cache. """
+  with open(cache_filename, "rb") as cache_file:
+    if cache_file.read(len(MAGIC)) != MAGIC:
+      return (None, None)
+    header_length = struct.unpack("<Q", cache_file.read(8))[0]
+    header = json.loads(cache_file.read(header_length))
+    return (header, _get_aligned_offset(cache_file.tell()))
+
+
+def get_status(event_log_filename):
+  """ Returns VALID if load() would use the cache for the given event log, MISSING if there is no
+  cache, and STALE if the cache can't be used (so the event log will be parsed again). """
+  cache_filename = get_cache_filename(event_log_filename)
+  if not os.path.exists(cache_filename):
+    return MISSING
+  header, _ = _read_header(cache_filename)
+  if (header is None or header["version"] != VERSION or
+      header["fingerprint"] != get_fingerprint(event_log_filename)):
+    return STALE
+  return VALID
+
+
+def load(event_log_filename):
+  """ Returns a TaskCache for the given event log, or None if there is no valid cache. """
+  cache_filename = get_cache_filename(event_log_filename)
+  if not os.path.exists(cache_filename):
+    return None
+  logger = logging.getLogger("TaskCache")
+  header, data_start = _read_header(cache_filename)
+  if header is None:
+    logger.warning("Ignoring task cache {} with an unknown format".format(cache_filename))
+    return None
+  if header["version"] != VERSION:
+    logger.info("Ignoring task cache {} from an old version".format(cache_filename))
+    return None
+  if header["fingerprint"] != get_fingerprint(event_log_filename):
+    logger.info("Ignoring task cache {} because the event log has changed".format(cache_filename))
+    return None
+
+  import numpy
+  if os.path.getsize(cache_filename) <= data_start:
+    # There are no tasks (so the columns are empty), and numpy can't memory-map an empty range.
+    data = numpy.zeros(0, dtype=numpy.uint8)
+  else:
+    data = numpy.memmap(cache_filename, dtype=numpy.uint8, mode="r", offset=data_start)
+  logger.debug("Loading stages from task cache {}".format(cache_filename))
+  return TaskCache(header, data)
@@ -0,0 +1,402 @@
+"""
+This file contains TaskTable, which stores the attributes of a list of tasks in NumPy arrays (one
+per attribute), so that aggregations over the tasks can be done with vectorized operations rather
+than by looping over Task objects.
+
+Stages build their TaskTable with a TaskTableBuilder, which appends each task's attributes to a row
+as the task is parsed, so the Task objects don't need to be kept. A row describes every attribute of
+its task, and TaskTable.get_task returns a Task that reads its attributes from a row.
+"""
+
+import array
+import numpy
+
+import metrics
+from task import Task
+
+# Attributes of Task that are stored in a TaskTable, and the type of each one's column.
+COLUMN_DTYPES = [
+  ("start_time", numpy.int64),
+  ("finish_time", numpy.int64),
+  ("executor_run_time", numpy.int64),
+  ("gc_time", numpy.float64),
+  ("compute_monotask_millis", numpy.float64),
+  ("disk_monotask_millis", numpy.float64),
+  ("hdfs_ser_comp_millis", numpy.float64),
+  ("hdfs_deser_decomp_millis", numpy.float64),
+  ("has_fetch", numpy.bool_),
+  ("input_mb", numpy.float64),
+  ("output_mb", numpy.float64),
+  ("shuffle_mb_written", numpy.float64),
+  ("start_total_cpu_jiffies", numpy.int64),
+  ("end_total_cpu_jiffies", numpy.int64),
+  ("start_gc_millis", numpy.float64),
+  ("end_gc_millis", numpy.float64),
+  ("start_network_transmit_idle_millis", numpy.float64),
+  ("end_network_transmit_idle_millis", numpy.float64),
+  ("total_cpu_utilization", numpy.float64),
+  ("process_user_cpu_utilization", numpy.float64),
+  ("process_system_cpu_utilization", numpy.float64),
+]
+# Attributes of Task that aren't used by aggregations, which are stored so that each row describes
+# every attribute of its task.
+OTHER_COLUMN_DTYPES = [
+  ("task_id", numpy.int64),
+  ("executor_deserialize_time", numpy.int64),
+  ("result_serialization_time", numpy.int64),
+  ("scheduler_delay", numpy.int64),
+  ("process_cpu_utilization", numpy.float64),
+  ("start_cpu_utilization_millis", numpy.int64),
+  ("end_cpu_utilization_millis", numpy.int64),
+  ("shuffle_write_time", numpy.float64),
+  ("input_read_time", numpy.float64),
+  ("output_write_time", numpy.float64),
+  ("output_on_disk", numpy.bool_),
+  ("data_local", numpy.bool_),
+]
+# Attributes that are only set for tasks that read shuffle data. The columns are 0 for other tasks.
+FETCH_COLUMN_DTYPES = [
+  ("remote_mb_read", numpy.float64),
+  ("local_mb_read", numpy.float64),
+  ("fetch_wait", numpy.float64),
+  ("local_blocks_read", numpy.int64),
+  ("remote_blocks_read", numpy.int64),
+  ("local_read_time", numpy.float64),
+  ("total_time_fetching", numpy.float64),
+]
+# Attributes of each task's metrics.NetworkUtilization.
+NETWORK_COLUMN_DTYPES = [
+  ("bytes_received_ps", numpy.float64),
+  ("bytes_transmitted_ps", numpy.float64),
+]
+NETWORK_COUNTER_KEYS = ["Received Bytes", "Transmitted Bytes"]
+# Attributes of each task's metrics.DiskUtilization, for each disk.
+DISK_COLUMN_DTYPES = [
+  ("utilization", numpy.float64),
+  ("read_throughput_Bps", numpy.float64),
+  ("write_throughput_Bps", numpy.float64),
+]
+DISK_COUNTER_KEYS = [
+  metrics.SECTORS_READ_KEY,
+  metrics.SECTORS_WRITTEN_KEY,
+  metrics.MILLIS_READING_KEY,
+  metrics.MILLIS_WRITING_KEY,
+  metrics.TOTAL_IO_MILLIS_KEY,
+]
+# Typecodes of the array.arrays that TaskTableBuilder uses for columns of each type.
+DTYPE_TO_TYPECODE = {
+  numpy.int64: "l",
+  numpy.int32: "i",
+  numpy.float64: "d",
+  numpy.bool_: "b",
+}
+# All of the columns in TaskTable.columns.
+ALL_COLUMN_DTYPES = (COLUMN_DTYPES + OTHER_COLUMN_DTYPES + FETCH_COLUMN_DTYPES +
+  NETWORK_COLUMN_DTYPES +
+  [(prefix + key, numpy.int64) for key in NETWORK_COUNTER_KEYS for prefix in ["start ", "end "]] +
+  [("executor_index", numpy.int32), ("input_read_method_index", numpy.int32)])
+# All of the columns for each disk in TaskTable.disk_name_to_columns.
+ALL_DISK_COLUMN_DTYPES = ([("present", numpy.bool_)] + DISK_COLUMN_DTYPES +
+  [(prefix + key, numpy.int64) for key in DISK_COUNTER_KEYS for prefix in ["start ", "end "]])
+# Attributes of every Task that are stored directly in a column.
+TASK_COLUMN_NAMES = frozenset(name for name, _ in COLUMN_DTYPES + OTHER_COLUMN_DTYPES)
+FETCH_COLUMN_NAMES = [name for name, _ in FETCH_COLUMN_DTYPES]
+# All of the attributes of every Task (see TaskTable.get_task_attribute).
+TASK_ATTRIBUTE_NAMES = ([name for name, _ in COLUMN_DTYPES + OTHER_COLUMN_DTYPES] +
+  ["executor_id", "executor", "input_read_method", "network_utilization", "disk_utilization"])
+
+
+class TaskTable(object):
+  """ Columns describing a list of tasks; row i of each column describes the i-th task.
+
+  The columns are in self.columns, which maps each attribute name in COLUMN_DTYPES,
+  OTHER_COLUMN_DTYPES, FETCH_COLUMN_DTYPES, and NETWORK_COLUMN_DTYPES (as well as the start and
+  end value of each counter in NETWORK_COUNTER_KEYS, e.g., "start Transmitted Bytes") to a NumPy
+  array.
+
+  Executor ids are stored in the executor_index column, as indices into self.executor_ids (which
+  lists the distinct executor ids in the order they were first seen); self.executor_hosts has the
+  host of each executor. Similarly, the input_read_method_index column has indices into
+  self.input_read_methods.
+
+  For each disk that any task reported utilization for, self.disk_name_to_columns maps the disk's
+  name to a dictionary of columns: "present" is True for the tasks that reported information about
+  the disk, and the remaining columns are the attributes in DISK_COLUMN_DTYPES and the start and end
+  value of each counter in DISK_COUNTER_KEYS (e.g., "start Sectors Read"), which are 0 for tasks
+  that didn't report them.
+
+  Some metrics (e.g., the GC time) are integers for some tasks and floats for others, so
+  self.int_masks maps the name of each float column that has any integer values to a boolean array
+  that is True for those values; get_task uses it to recreate the original values.
+  """
+
+  def __init__(self, num_tasks, columns, executor_ids, executor_hosts, input_read_methods,
+      disk_name_to_columns, int_masks):
+    self.num_tasks = num_tasks
+    self.columns = columns
+    self.executor_ids = executor_ids
+    self.executor_hosts = executor_hosts
+    self.input_read_methods = input_read_methods
+    self.disk_name_to_columns = disk_name_to_columns
+    self.int_masks = int_masks
+    # Cached result of get_executor_groups(); tables are never modified after they're created.
+    self.__executor_groups = None
+
+  def __len__(self):
+    return self.num_tasks
+
+  def take(self, rows):
+    """ Returns a TaskTable with the given rows (a boolean mask or an array of row indices). """
+    columns = {name: column[rows] for name, column in self.columns.iteritems()}
+    disk_name_to_columns = {
+      disk_name: {name: column[rows] for name, column in disk_columns.iteritems()}
+      for disk_name, disk_columns in self.disk_name_to_columns.iteritems()}
+    int_masks = {name: int_mask[rows] for name, int_mask in self.int_masks.iteritems()}
+    return TaskTable(len(columns["start_time"]), columns, self.executor_ids, self.executor_hosts,
+      self.input_read_methods, disk_name_to_columns, int_masks)
+
+  def get_task(self, row):
+    """ Returns a Task that reads its attributes from the given row when they're first used. """
+    return Task.from_table_row(self, row)
+
+  def get_task_attribute(self, row, name):
+    """ Returns the value of the given attribute of the Task described by the given row.
+
+    Raises an AttributeError if Tasks don't have the attribute (or if the attribute is one of the
+    FETCH_COLUMN_DTYPES and the task didn't read shuffle data), like a Task would.
+    """
+    if name in TASK_COLUMN_NAMES:
+      return self.__get_value(name, row)
+    if name in FETCH_COLUMN_NAMES:
+      if not self.columns["has_fetch"][row]:
+        raise AttributeError(name)
+      return self.__get_value(name, row)
+    if name == "executor_id":
+      return self.executor_ids[self.columns["executor_index"][row]]
+    if name == "executor":
+      return self.executor_hosts[self.columns["executor_index"][row]]
+    if name == "input_read_method":
+      return self.input_read_methods[self.columns["input_read_method_index"][row]]
+    if name == "network_utilization":
+      return metrics.NetworkUtilization(
+        start_counters=self.__get_counters(self.columns, "start ", NETWORK_COUNTER_KEYS, row),
+        end_counters=self.__get_counters(self.columns, "end ", NETWORK_COUNTER_KEYS, row),
+        bytes_transmitted_ps=self.columns["bytes_transmitted_ps"][row].item(),
+        bytes_received_ps=self.columns["bytes_received_ps"][row].item())
+    if name == "disk_utilization":
+      return {disk_name: metrics.DiskUtilization(
+          start_counters=self.__get_counters(disk_columns, "start ", DISK_COUNTER_KEYS, row),
+          end_counters=self.__get_counters(disk_columns, "end ", DISK_COUNTER_KEYS, row),
+          utilization=disk_columns["utilization"][row].item(),
+          read_throughput_Bps=disk_columns["read_throughput_Bps"][row].item(),
+          write_throughput_Bps=disk_columns["write_throughput_Bps"][row].item())
+        for disk_name, disk_columns in self.disk_name_to_columns.iteritems()
+        if disk_columns["present"][row]}
+    raise AttributeError(name)
+
+  def get_task_attributes(self, row):
+    """ Returns a dictionary with all of the attributes of the Task described by the given row. """
+    names = TASK_ATTRIBUTE_NAMES
+    if self.columns["has_fetch"][row]:
+      names = names + FETCH_COLUMN_NAMES
+    return {name: self.get_task_attribute(row, name) for name in names}
+
+  def __get_value(self, name, row):
+    # item() returns a Python int, float, or bool, depending on the column's type.
+    value = self.columns[name][row].item()
+    if name in self.int_masks and self.int_masks[name][row]:
+      return int(value)
+    return value
+
+  def __get_counters(self, columns, prefix, keys, row):
+    return {key: columns[prefix + key][row].item() for key in keys}
+
+  def runtimes(self):
+    return self.columns["finish_time"] - self.columns["start_time"]
+
+  def get_executor_rows(self, executor_id):
+    """ Returns a boolean mask that is True for the tasks that ran on the given executor. """
+    if executor_id not in self.executor_ids:
+      return numpy.zeros(self.num_tasks, dtype=numpy.bool_)
+    return self.columns["executor_index"] == self.executor_ids.index(executor_id)
+
+  def get_executor_task_counts(self):
+    """ Returns an array with the number of tasks that ran on each executor in executor_ids. """
+    return numpy.bincount(self.columns["executor_index"], minlength=len(self.executor_ids))
+
+  def get_executor_groups(self):
+    """ Returns a (rows, offsets) tuple describing which tasks ran on each executor.
+
+    rows has the row indices of the tasks sorted by executor (in the order of executor_ids), with
+    each executor's tasks in their original order. The rows for the i-th executor are
+    rows[offsets[i]:offsets[i + 1]].
+    """
+    if self.__executor_groups is None:
+      rows = numpy.argsort(self.columns["executor_index"], kind="mergesort")
+      offsets = numpy.zeros(len(self.executor_ids) + 1, dtype=numpy.int64)
+      numpy.cumsum(self.get_executor_task_counts(), out=offsets[1:])
+      self.__executor_groups = (rows, offsets)
+    return self.__executor_groups
+
+  def sum_by_executor(self, name):
+    """ Returns an array with the sum of the given column for each executor in executor_ids. """
+    # bincount adds each executor's values in row order, so the sums are the same as summing a
+    # list of the values.
+    return numpy.bincount(self.columns["executor_index"], weights=self.columns[name],
+      minlength=len(self.executor_ids))
+
+
+class TaskTableBuilder(object):
+  """ Accumulates the rows of a TaskTable as tasks are added, without keeping the Task objects. """
+
+  def __init__(self):
+    self.num_tasks = 0
+    self.__name_to_column = {name: array.array(DTYPE_TO_TYPECODE[dtype])
+      for name, dtype in ALL_COLUMN_DTYPES}
+    # For each float column, whether each value was an integer (see TaskTable.int_masks).
+    self.__name_to_int_flags = {name: array.array("b")
+      for name, dtype in ALL_COLUMN_DTYPES if dtype == numpy.float64}
+    # (name, column) pairs for the attributes in the COLUMN_DTYPES and OTHER_COLUMN_DTYPES that are
+    # integers or booleans, and (name, column, int flags) tuples for the ones that are floats (and
+    # similarly for the FETCH_COLUMN_DTYPES), so that add_task doesn't need to look them up.
+    self.__int_columns, self.__float_columns = self.__split_columns(
+      COLUMN_DTYPES + OTHER_COLUMN_DTYPES)
+    self.__int_fetch_columns, self.__float_fetch_columns = self.__split_columns(
+      FETCH_COLUMN_DTYPES)
+    self.__network_columns = [(name, self.__name_to_column[name])
+      for name, _ in NETWORK_COLUMN_DTYPES]
+    self.__network_counter_columns = [(key, self.__name_to_column["start " + key],
+      self.__name_to_column["end " + key]) for key in NETWORK_COUNTER_KEYS]
+    self.__executor_indices = self.__name_to_column["executor_index"]
+    self.__input_read_method_indices = self.__name_to_column["input_read_method_index"]
+
+    self.__executor_ids = []
+    self.__executor_hosts = []
+    self.__executor_id_to_index = {}
+    self.__input_read_methods = []
+    self.__input_read_method_to_index = {}
+    # Mapping from the name of each disk that any task reported to a ("present" column,
+    # [(attribute name, column)], [(counter key, start column, end column)]) tuple.
+    self.__disk_name_to_columns = {}
+
+  def __split_columns(self, column_dtypes):
+    int_columns = []
+    float_columns = []
+    for name, dtype in column_dtypes:
+      if dtype == numpy.float64:
+        float_columns.append((name, self.__name_to_column[name], self.__name_to_int_flags[name]))
+      else:
+        int_columns.append((name, self.__name_to_column[name]))
+    return (int_columns, float_columns)
+
+  def add_task(self, task):
+    """ Appends a row describing the given Task. """
+    for name, column in self.__int_columns:
+      column.append(getattr(task, name))
+    for name, column, int_flags in self.__float_columns:
+      value = getattr(task, name)
+      column.append(value)
+      int_flags.append(isinstance(value, (int, long)))
+    if task.has_fetch:
+      for name, column in self.__int_fetch_columns:
+        column.append(getattr(task, name))
+      for name, column, int_flags in self.__float_fetch_columns:
+        value = getattr(task, name)
+        column.append(value)
+        int_flags.append(isinstance(value, (int, long)))
+    else:
+      for _, column in self.__int_fetch_columns:
+        column.append(0)
+      for _, column, int_flags in self.__float_fetch_columns:
+        column.append(0)
+        int_flags.append(False)
+
+    network_utilization = task.network_utilization
+    for name, column in self.__network_columns:
+      column.append(getattr(network_utilization, name))
+    for key, start_column, end_column in self.__network_counter_columns:
+      start_column.append(_get_counter(network_utilization.start_counters, key))
+      end_column.append(_get_counter(network_utilization.end_counters, key))
+
+    executor_index = self.__executor_id_to_index.get(task.executor_id)
+    if executor_index is None:
+      executor_index = len(self.__executor_ids)
+      self.__executor_id_to_index[task.executor_id] = executor_index
+      self.__executor_ids.append(task.executor_id)
+      self.__executor_hosts.append(task.executor)
+    self.__executor_indices.append(executor_index)
+    input_read_method_index = self.__input_read_method_to_index.get(task.input_read_method)
+    if input_read_method_index is None:
+      input_read_method_index = len(self.__input_read_methods)
+      self.__input_read_method_to_index[task.input_read_method] = input_read_method_index
+      self.__input_read_methods.append(task.input_read_method)
+    self.__input_read_method_indices.append(input_read_method_index)
+
+    self.__add_disk_utilization(task.disk_utilization)
+    self.num_tasks += 1
+
+  def __add_disk_utilization(self, disk_utilization):
+    for disk_name in disk_utilization:
+      if disk_name not in self.__disk_name_to_columns:
+        self.__add_disk(disk_name)
+    for disk_name, (present, attribute_columns, counter_columns) in (
+        self.__disk_name_to_columns.iteritems()):
+      utilization = disk_utilization.get(disk_name)
+      present.append(utilization is not None)
+      if utilization is None:
+        for _, column in attribute_columns:
+          column.append(0)
+        for _, start_column, end_column in counter_columns:
+          start_column.append(0)
+          end_column.append(0)
+      else:
+        for name, column in attribute_columns:
+          column.append(getattr(utilization, name))
+        for key, start_column, end_column in counter_columns:
+          start_column.append(utilization.start_counters.get(key, 0))
+          end_column.append(utilization.end_counters.get(key, 0))
+
+  def __add_disk(self, disk_name):
+    """ Adds columns for a disk that no task reported until now (so the columns are 0 for the
+    tasks that were already added). """
+    def new_column(dtype):
+      return array.array(DTYPE_TO_TYPECODE[dtype], [0] * self.num_tasks)
+    self.__disk_name_to_columns[disk_name] = (
+      new_column(numpy.bool_),
+      [(name, new_column(dtype)) for name, dtype in DISK_COLUMN_DTYPES],
+      [(key, new_column(numpy.int64), new_column(numpy.int64)) for key in DISK_COUNTER_KEYS])
+
+  def build(self):
+    """ Returns a TaskTable with the rows added so far. """
+    columns = {name: _to_numpy(self.__name_to_column[name], dtype)
+      for name, dtype in ALL_COLUMN_DTYPES}
+    int_masks = {}
+    for name, int_flags in self.__name_to_int_flags.iteritems():
+      int_mask = _to_numpy(int_flags, numpy.bool_)
+      if numpy.any(int_mask):
+        int_masks[name] = int_mask
+    disk_name_to_columns = {}
+    for disk_name, (present, attribute_columns, counter_columns) in (
+        self.__disk_name_to_columns.iteritems()):
+      disk_columns = {"present": _to_numpy(present, numpy.bool_)}
+      for (name, column), (_, dtype) in zip(attribute_columns, DISK_COLUMN_DTYPES):
+        disk_columns[name] = _to_numpy(column, dtype)
+      for key, start_column, end_column in counter_columns:
+        disk_columns["start " + key] = _to_numpy(start_column, numpy.int64)
+        disk_columns["end " + key] = _to_numpy(end_column, numpy.int64)
+      disk_name_to_columns[disk_name] = disk_columns
+    return TaskTable(self.num_tasks, columns, list(self.__executor_ids),
+      list(self.__executor_hosts), list(self.__input_read_methods), disk_name_to_columns,
+      int_masks)
+
+
+def _to_numpy(column, dtype):
+  """ Returns a copy of the given array.array as a NumPy array with the given type. """
+  return numpy.frombuffer(column, dtype=numpy.dtype(column.typecode)).astype(dtype)
+
+
+def _get_counter(network_counters, key):
+  # Tasks that didn't report network utilization have 0 rather than a dictionary of counters.
+  if isinstance(network_counters, dict):
+    return network_counters.get(key, 0)
+  return 0
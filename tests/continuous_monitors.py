@@ -0,0 +1,46 @@
+"""
+This file contains helpers that write small, synthetic continuous monitor logs for the tests.
+
+A log is described by a list of samples, each of which is a (time, cores used, disk name to
+utilization) tuple, where time is in milliseconds since the epoch. The network throughput of each
+sample is the same fraction of a 1Gbps link as the fraction of the 8 cores that were used (and half
+as much data is received as is transmitted), so that every resource's utilization is easy to
+predict.
+"""
+
+import json
+
+import continuous_monitor
+
+
+def write_continuous_monitor(filename, samples):
+  """ Writes a continuous monitor log with the given samples to filename. """
+  with open(filename, "w") as log_file:
+    for time, cores_used, disk_to_utilization in samples:
+      bytes_per_second = (
+        cores_used / continuous_monitor.CORES * continuous_monitor.BYTES_PER_GIGABIT)
+      log_file.write(json.dumps({
+        "Current Time": time,
+        "Cpu Utilization": {"Total User Utilization": cores_used, "Total System Utilization": 0},
+        "Network Utilization": {"Bytes Transmitted Per Second": bytes_per_second,
+          "Bytes Received Per Second": bytes_per_second / 2},
+        "Disk Utilization": {"Device Name To Utilization": [
+          {disk_name: {"Disk Utilization": utilization, "Read Throughput": 0,
+            "Write Throughput": 0}}
+          for disk_name, utilization in sorted(disk_to_utilization.iteritems())]},
+        "Running Macrotasks": int(cores_used),
+      }) + "\n")
+
+
+def get_random_samples(rand, start_time, end_time, disk_names):
+  """ Returns samples recorded about once a second (at random times) from start_time to end_time,
+  with random utilizations. """
+  samples = []
+  time = start_time
+  while time < end_time:
+    samples.append((time, rand.randint(0, 8),
+      {disk_name: rand.random() for disk_name in disk_names}))
+    time += rand.randint(500, 1500)
+  samples.append((end_time, rand.randint(0, 8),
+    {disk_name: rand.random() for disk_name in disk_names}))
+  return samples
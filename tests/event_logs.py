@@ -0,0 +1,149 @@
+"""
+This file contains helpers that write small, synthetic event logs for the tests.
+
+An event log is described by a list of events, each of which is either ("job", job id, stage ids),
+for a SparkListenerJobStart, or ("tasks", stage id, number of tasks), for that many
+SparkListenerTaskEnd events. The tasks' metrics are random (but the same for a given seed), and
+include every metric that the Analyzer's reports use.
+"""
+
+import json
+import random
+
+# Job 1 depends on stage 1, which finished before job 1 started, so job 1 shouldn't include it.
+# Jobs 2 and 3 start together and share stage 3, and job 4 starts in the middle of stage 4, so it
+# only includes the stage's later tasks.
+SHARED_STAGE_EVENTS = [
+  ("job", 0, [0, 1]),
+  ("tasks", 0, 40),
+  ("tasks", 1, 40),
+  ("job", 1, [1, 2]),
+  ("tasks", 2, 40),
+  ("job", 2, [3]),
+  ("job", 3, [3, 4]),
+  ("tasks", 3, 40),
+  ("tasks", 4, 20),
+  ("job", 4, [4, 5]),
+  ("tasks", 4, 20),
+  ("tasks", 5, 40),
+]
+EXECUTORS = [("0", "host0.ec2.internal"), ("1", "host1.ec2.internal"), ("2", "host2.ec2.internal")]
+DISK_NAMES = ["xvdb", "xvdf"]
+
+
+def write_event_log(filename, events, seed=0):
+  """ Writes an event log with the given events to filename. """
+  rand = random.Random(seed)
+  executor_id_to_counters = {executor_id: {"jiffies": 1000, "transmitted": 0, "idle": 0, "gc": 0,
+      "sectors_read": 0, "sectors_written": 0, "millis_reading": 0, "millis_writing": 0,
+      "millis_total": 0}
+    for executor_id, _ in EXECUTORS}
+  time = 100000
+  task_id = 0
+  with open(filename, "w") as event_log:
+    __write_event(event_log, {"Event": "SparkListenerLogStart", "Spark Version": "1.5"})
+    for event in events:
+      if event[0] == "job":
+        _, job_id, stage_ids = event
+        __write_event(event_log, {"Event": "SparkListenerJobStart", "Job ID": job_id,
+          "Stage IDs": stage_ids,
+          "Stage Infos": [{"Stage ID": stage_id, "Stage Name": "stage {}".format(stage_id)}
+            for stage_id in stage_ids]})
+        continue
+      _, stage_id, num_tasks = event
+      # A large event that the Analyzer skips without decoding.
+      __write_event(event_log, {"Event": "SparkListenerStageSubmitted",
+        "Stage Info": {"Stage ID": stage_id, "Details": "x\ny" * 100}})
+      for _ in xrange(num_tasks):
+        executor_id, host = rand.choice(EXECUTORS)
+        start_time = time + rand.randint(0, 2000)
+        finish_time = start_time + rand.randint(50, 3000)
+        start_counters = executor_id_to_counters[executor_id]
+        end_counters = {name: value + rand.randint(0, 1000)
+          for name, value in start_counters.iteritems()}
+        executor_id_to_counters[executor_id] = end_counters
+        __write_event(event_log, __get_task_end(rand, stage_id, task_id, executor_id, host,
+          start_time, finish_time, start_counters, end_counters))
+        task_id += 1
+      time += 5000
+
+
+def describe_jobs(analyzer):
+  """ Returns a dictionary describing the stages of each of the given Analyzer's jobs, which should
+  be the same no matter how the event log was parsed. """
+  return {job_id: (job.runtime(), {stage_id: (stage.num_tasks(), stage.start_time,
+      stage.finish_time(), stage.total_runtime())
+    for stage_id, stage in job.stages.iteritems()})
+    for job_id, job in analyzer.jobs.iteritems()}
+
+
+def __write_event(event_log, event):
+  event_log.write(json.dumps(event) + "\n")
+
+
+def __get_task_end(rand, stage_id, task_id, executor_id, host, start_time, finish_time,
+    start_counters, end_counters):
+  def get_disk_counters(counters):
+    return {"Sectors Read": counters["sectors_read"],
+      "Sectors Written": counters["sectors_written"],
+      "Millis Reading": counters["millis_reading"],
+      "Millis Writing": counters["millis_writing"],
+      "Millis Total": counters["millis_total"]}
+
+  task_metrics = {
+    "Executor Run Time": finish_time - start_time - 5,
+    "Executor Deserialize Time": 2,
+    "Result Serialization Time": 1,
+    "JVM GC Time": end_counters["gc"] - start_counters["gc"],
+    "JVM GC Time Total": end_counters["gc"],
+    "Computation Nanos": rand.randint(0, 10 ** 9),
+    "Disk Nanos": rand.randint(0, 10 ** 9),
+    "HDFS Deserialization/Decompression Millis": rand.randint(0, 100),
+    "HDFS Serialization/Compression Millis": rand.randint(0, 100),
+    "Start Network Transmit Total Idle Millis": start_counters["idle"],
+    "End Network Transmit Total Idle Millis": end_counters["idle"],
+    "Network Utilization": {
+      "Start Counters": {"Transmitted Bytes": start_counters["transmitted"], "Received Bytes": 0},
+      "End Counters": {"Transmitted Bytes": end_counters["transmitted"], "Received Bytes": 0},
+      "Bytes Transmitted Per Second": rand.random() * 1e8,
+      "Bytes Received Per Second": rand.random() * 1e8},
+    "Cpu Utilization": {
+      "Process User Utilization": rand.random(),
+      "Process System Utilization": rand.random(),
+      "Total User Utilization": rand.random() * 7,
+      "Total System Utilization": rand.random(),
+      "Start Counters": {"Total User Jiffies": start_counters["jiffies"],
+        "Total System Jiffies": 0, "Time Milliseconds": start_time},
+      "End Counters": {"Total User Jiffies": end_counters["jiffies"],
+        "Total System Jiffies": 0, "Time Milliseconds": finish_time}},
+    "Disk Utilization": {"Device Name To Utilization": [
+      {disk_name: {
+        "Disk Utilization": rand.choice([0, rand.random()]),
+        "Read Throughput": rand.random() * 1e7,
+        "Write Throughput": rand.random() * 1e7,
+        "Start Counters": get_disk_counters(start_counters),
+        "End Counters": get_disk_counters(end_counters)}}
+      for disk_name in DISK_NAMES]},
+  }
+  # Odd stages read shuffle data, and even stages read input data and write shuffle data.
+  if stage_id % 2 == 1:
+    task_metrics["Shuffle Read Metrics"] = {
+      "Fetch Wait Time": rand.randint(0, 10),
+      "Local Blocks Fetched": 3,
+      "Remote Blocks Fetched": 5,
+      "Remote Bytes Read": rand.randint(0, 10 ** 8),
+      "Local Bytes Read": rand.randint(0, 10 ** 7),
+      "Local Read Time": rand.randint(0, 10 ** 6)}
+  else:
+    task_metrics["Shuffle Write Metrics"] = {
+      "Shuffle Write Time": rand.randint(0, 10 ** 8),
+      "Shuffle Bytes Written": rand.randint(0, 10 ** 8)}
+    task_metrics["Input Metrics"] = {
+      "Data Read Method": "Hadoop",
+      "Bytes Read": 10 ** 6,
+      "Hadoop Bytes Read": rand.randint(0, 10 ** 8),
+      "Read Time Nanos": rand.randint(0, 10 ** 6)}
+  return {"Event": "SparkListenerTaskEnd", "Stage ID": stage_id,
+    "Task Info": {"Task ID": task_id, "Launch Time": start_time, "Finish Time": finish_time,
+      "Host": host, "Executor ID": executor_id, "Locality": rand.choice(["NODE_LOCAL", "ANY"])},
+    "Task Metrics": task_metrics}
@@ -0,0 +1,78 @@
+import math
+from os import path
+import shutil
+import tempfile
+import unittest
+
+import cluster_monitor
+import continuous_monitors
+
+
+class ClusterMonitorTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    # The first executor stops after 2.5 seconds, and the second starts after 1.2 seconds. Only the
+    # first executor has xvdb, and only the second has xvdf.
+    self.filenames = []
+    for name, samples in [
+        ("first", [(10000, 1, {"xvdb": 0.5}), (10500, 2, {"xvdb": 0.25}),
+          (11000, 3, {"xvdb": 1}), (12500, 4, {"xvdb": 0})]),
+        ("second", [(11200, 5, {"xvdf": 0.5}), (12200, 6, {"xvdf": 0.75}),
+          (13700, 7, {"xvdf": 1})])]:
+      filename = path.join(self.directory, name)
+      continuous_monitors.write_continuous_monitor(filename, samples)
+      self.filenames.append(filename)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def __get_statistics(self, column_names, row, metric_name):
+    return [row[column_names.index("{} {}".format(metric_name, statistic))]
+      for statistic in cluster_monitor.STATISTICS]
+
+  def test_merges_latest_sample_from_each_running_executor(self):
+    column_names, rows = cluster_monitor.merge(self.filenames)
+    self.assertEqual(column_names, cluster_monitor.get_column_names(["xvdb", "xvdf"]))
+    rows = list(rows)
+    self.assertEqual([row[:2] for row in rows], [[0, 1], [1000, 2], [2000, 2], [3000, 1]])
+    self.assertEqual([self.__get_statistics(column_names, row, "running macrotasks")
+        for row in rows],
+      [[2, 2, 2, 2], [8, 4, 3, 5], [10, 5, 4, 6], [7, 7, 7, 7]])
+    # The CPU utilization is the fraction of the 8 cores that were used.
+    self.assertEqual(self.__get_statistics(column_names, rows[1], "cpu utilization"),
+      [1, 0.5, 0.375, 0.625])
+    # Executors without a disk are left out of its statistics.
+    self.assertEqual(self.__get_statistics(column_names, rows[1], "xvdb utilization"),
+      [1, 1, 1, 1])
+    self.assertEqual(self.__get_statistics(column_names, rows[2], "xvdf utilization"),
+      [0.75, 0.75, 0.75, 0.75])
+    xvdb_statistics = self.__get_statistics(column_names, rows[3], "xvdb utilization")
+    self.assertEqual(xvdb_statistics[0], 0)
+    self.assertTrue(all(math.isnan(value) for value in xvdb_statistics[1:]))
+
+  def test_interval_length(self):
+    column_names, rows = cluster_monitor.merge(self.filenames, interval_millis=2000)
+    rows = list(rows)
+    # The first executor's last sample is in the second interval, so it's still included.
+    self.assertEqual([row[:2] for row in rows], [[0, 2], [2000, 2]])
+    self.assertEqual(self.__get_statistics(column_names, rows[1], "running macrotasks"),
+      [11, 5.5, 4, 7])
+
+  def test_writes_one_line_per_interval(self):
+    out_filename = path.join(self.directory, "cluster_monitor")
+    column_names = cluster_monitor.write_cluster_monitor(self.filenames, out_filename)
+    with open(out_filename) as out_file:
+      lines = out_file.readlines()
+    self.assertEqual(lines[0], "# {}\n".format("\t".join(column_names)))
+    self.assertEqual(len(lines), 5)
+    self.assertTrue(all(len(line.split("\t")) == len(column_names) for line in lines[1:]))
+
+  def test_no_monitors(self):
+    column_names, rows = cluster_monitor.merge([])
+    self.assertEqual(column_names, cluster_monitor.get_column_names([]))
+    self.assertEqual(list(rows), [])
+
+
+if __name__ == "__main__":
+  unittest.main()
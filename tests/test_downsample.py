@@ -0,0 +1,92 @@
+from os import path
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import continuous_monitor
+import continuous_monitors
+import downsample
+
+
+class DownsampleTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    rand = random.Random(0)
+    samples = continuous_monitors.get_random_samples(rand, 100000, 1100000, ["xvdb"])
+    # A single sample with a spike in CPU utilization, and samples where xvdf was in use.
+    samples[500] = (samples[500][0], 100, samples[500][2])
+    for i in xrange(300, 320):
+      samples[i][2]["xvdf"] = rand.random()
+    self.monitor = self.__parse(samples)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def __parse(self, samples):
+    filename = path.join(self.directory, "continuous_monitor")
+    continuous_monitors.write_continuous_monitor(filename, samples)
+    return continuous_monitor.parse(filename)
+
+  def test_keeps_small_monitors(self):
+    for method in downsample.METHODS:
+      self.assertIs(
+        downsample.downsample(self.monitor, self.monitor.num_samples, method), self.monitor)
+
+  def test_rejects_invalid_arguments(self):
+    self.assertRaises(ValueError, downsample.downsample, self.monitor, 100, "median")
+    self.assertRaises(
+      ValueError, downsample.downsample, self.monitor, downsample.MIN_POINTS - 1)
+
+  def test_selected_samples_include_ends_and_spikes(self):
+    times = self.monitor.get_column("time")
+    for method in [downsample.LTTB, downsample.MIN_MAX]:
+      downsampled_monitor = downsample.downsample(self.monitor, 50, method)
+      self.assertLessEqual(downsampled_monitor.num_samples, 50)
+      downsampled_times = downsampled_monitor.get_column("time")
+      self.assertEqual(downsampled_times[0], times[0])
+      self.assertEqual(downsampled_times[-1], times[-1])
+      self.assertTrue(numpy.all(numpy.diff(downsampled_times) > 0))
+      # Each kept sample has all of its original values.
+      indices = numpy.searchsorted(times, downsampled_times)
+      numpy.testing.assert_array_equal(
+        downsampled_monitor.get_rows(), self.monitor.get_rows()[indices])
+      self.assertEqual(downsampled_monitor.get_column("cpu utilization").max(),
+        self.monitor.get_column("cpu utilization").max())
+
+  def test_unchanging_monitor_keeps_first_and_last_samples(self):
+    monitor = self.__parse([(100000 + 1000 * i, 4, {"xvdb": 0.5}) for i in xrange(100)])
+    for method in [downsample.LTTB, downsample.MIN_MAX]:
+      downsampled_monitor = downsample.downsample(monitor, 10, method)
+      self.assertEqual(downsampled_monitor.get_column("time").tolist(), [0, 99000])
+
+  def test_means_keep_integrals(self):
+    downsampled_monitor = downsample.downsample(self.monitor, 50, downsample.MEAN)
+    self.assertEqual(downsampled_monitor.num_samples, 50)
+    times = self.monitor.get_column("time")
+    downsampled_times = downsampled_monitor.get_column("time")
+    indices = numpy.searchsorted(times, downsampled_times)
+    numpy.testing.assert_array_equal(times[indices], downsampled_times)
+    self.assertEqual(downsampled_times[-1], times[-1])
+    for name in ["cpu utilization", "bytes transmitted", "xvdb utilization", "xvdf utilization"]:
+      integrals = self.__get_integrals(times, self.monitor.get_column(name))
+      downsampled_integrals = self.__get_integrals(
+        downsampled_times, downsampled_monitor.get_column(name))
+      numpy.testing.assert_allclose(downsampled_integrals, integrals[indices], rtol=1e-9)
+    # Buckets without any xvdf samples have no value for xvdf.
+    xvdf_utilizations = downsampled_monitor.get_column("xvdf utilization")
+    self.assertTrue(numpy.isnan(xvdf_utilizations[1]))
+    self.assertTrue(numpy.isnan(xvdf_utilizations[-1]))
+    self.assertLess(numpy.sum(~numpy.isnan(xvdf_utilizations)), 5)
+
+  def __get_integrals(self, times, values):
+    """ Returns the integral of the given step function (see monitor_utilization) up to each
+    sample, counting NaN as 0. """
+    return numpy.append(0, numpy.cumsum(numpy.nan_to_num(values[1:]) * numpy.diff(times)))
+
+
+if __name__ == "__main__":
+  unittest.main()
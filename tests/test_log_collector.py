@@ -0,0 +1,105 @@
+import os
+from os import path
+import shutil
+import stat
+import tempfile
+import unittest
+
+import log_collector
+
+# Stands in for ssh: skips the options and the user@host argument, and runs the command locally
+# (commands that read a file whose name contains "unreadable" fail instead).
+LOCAL_SSH_SCRIPT = """#!/bin/sh
+while [ $# -gt 0 ]; do
+  case "$1" in
+    -o|-i|-O) shift 2;;
+    -*) shift;;
+    *) break;;
+  esac
+done
+shift
+if [ $# -eq 0 ]; then
+  exit 0
+fi
+case "$1" in
+  *unreadable*) echo "Permission denied" >&2; exit 1;;
+esac
+exec sh -c "$1"
+"""
+
+
+class SyncFilesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.remote_dir = path.join(self.directory, "remote")
+    self.local_dir = path.join(self.directory, "local")
+    os.mkdir(self.remote_dir)
+    os.mkdir(self.local_dir)
+    ssh_command = path.join(self.directory, "ssh")
+    with open(ssh_command, "w") as ssh_file:
+      ssh_file.write(LOCAL_SSH_SCRIPT)
+    os.chmod(ssh_command, stat.S_IRWXU)
+    self.collector = log_collector.LogCollector(
+      "identity_file", attempts=1, retry_delay_seconds=0, ssh_command=ssh_command,
+      scp_command=ssh_command)
+    self.list_command = "ls {}/*".format(self.remote_dir)
+
+  def tearDown(self):
+    self.collector.close()
+    shutil.rmtree(self.directory)
+
+  def test_copies_only_new_and_changed_files(self):
+    self.__write_remote_file("a", "first file\n" * 100)
+    self.__write_remote_file("b", "second file\n")
+    self.assertEqual(self.__sync(), self.__get_local_files("a", "b"))
+    self.__check_local_file("a", "first file\n" * 100)
+    self.__check_local_file("b", "second file\n")
+
+    self.assertEqual(self.__sync(), [])
+    self.__write_remote_file("b", "second file, changed\n")
+    self.assertEqual(self.__sync(), self.__get_local_files("b"))
+    self.__check_local_file("b", "second file, changed\n")
+
+  def test_resumes_partial_copy(self):
+    contents = "".join("line {}\n".format(i) for i in xrange(1000))
+    remote_file = self.__write_remote_file("a", contents)
+    local_file = path.join(self.local_dir, "a")
+    manifest = log_collector.Manifest(path.join(self.local_dir, log_collector.MANIFEST_FILENAME))
+    manifest.set("localhost", remote_file, len(contents), int(path.getmtime(remote_file)), None,
+      local_file, False)
+    with open(local_file + log_collector.PARTIAL_SUFFIX, "w") as partial_file:
+      partial_file.write(contents[:1234])
+    self.assertEqual(self.__sync(), [local_file])
+    self.__check_local_file("a", contents)
+    self.assertFalse(path.exists(local_file + log_collector.PARTIAL_SUFFIX))
+
+  def test_raises_if_any_copy_fails(self):
+    self.__write_remote_file("a", "first file\n")
+    self.__write_remote_file("unreadable", "second file\n")
+    self.assertRaises(Exception, self.__sync)
+    # The file that could be copied is still copied, so it's skipped next time.
+    self.__check_local_file("a", "first file\n")
+    self.assertFalse(path.exists(path.join(self.local_dir, "unreadable")))
+    os.remove(path.join(self.remote_dir, "unreadable"))
+    self.assertEqual(self.__sync(), [])
+
+  def __sync(self):
+    return self.collector.sync_files("localhost", self.list_command, self.local_dir)
+
+  def __write_remote_file(self, name, contents):
+    remote_file = path.join(self.remote_dir, name)
+    with open(remote_file, "w") as f:
+      f.write(contents)
+    return remote_file
+
+  def __get_local_files(self, *names):
+    return [path.join(self.local_dir, name) for name in names]
+
+  def __check_local_file(self, name, contents):
+    with open(path.join(self.local_dir, name)) as f:
+      self.assertEqual(f.read(), contents)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,54 @@
+from os import path
+import shutil
+import struct
+import tempfile
+import unittest
+
+import event_logs
+import log_summary
+import parse_event_logs
+
+
+class LogSummaryTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.event_log = path.join(self.directory, "event_log")
+    event_logs.write_event_log(self.event_log, event_logs.SHARED_STAGE_EVENTS)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_loads_ignores_surrounding_output(self):
+    summary = log_summary.summarize(event_log_filename=self.event_log)
+    loaded_summary = log_summary.loads(
+      "Output from the remote shell\n" + log_summary.dumps(summary) + "More output\n")
+    self.assertEqual(loaded_summary.event_log_filename, self.event_log)
+    self.assertIsNone(loaded_summary.continuous_monitor)
+    job_starts, stage_segments, skipped_event_counts = loaded_summary.event_log_summary
+    self.assertEqual([job_start[0] for job_start in job_starts], [0, 1, 2, 3, 4])
+    # Stage 4 has a segment before job 4 started, and one after.
+    self.assertEqual([(position, stage_id, summary.num_tasks())
+        for position, stage_id, summary in stage_segments if stage_id == 4],
+      [(4, 4, 20), (5, 4, 20)])
+    self.assertEqual(skipped_event_counts["SparkListenerStageSubmitted"], 7)
+
+  def test_loads_rejects_other_versions(self):
+    data = log_summary.dumps(log_summary.summarize(event_log_filename=self.event_log))
+    version_start = len(log_summary.MAGIC)
+    old_data = (data[:version_start] + struct.pack("<I", log_summary.VERSION - 1) +
+      data[version_start + 4:])
+    self.assertRaises(ValueError, log_summary.loads, old_data)
+    self.assertRaises(ValueError, log_summary.loads, "Not a summary")
+
+  def test_analyzer_reads_summary_like_event_log(self):
+    summary_file = path.join(self.directory, "event_log" + log_summary.SUMMARY_SUFFIX)
+    log_summary.write(log_summary.summarize(event_log_filename=self.event_log), summary_file)
+    self.assertTrue(log_summary.is_summary_file(summary_file))
+    self.assertFalse(log_summary.is_summary_file(self.event_log))
+    self.assertEqual(event_logs.describe_jobs(parse_event_logs.Analyzer(summary_file)),
+      event_logs.describe_jobs(parse_event_logs.Analyzer(self.event_log, use_cache=False)))
+
+
+if __name__ == "__main__":
+  unittest.main()
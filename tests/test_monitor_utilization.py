@@ -0,0 +1,125 @@
+import math
+from os import path
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+import continuous_monitor
+import continuous_monitors
+import event_logs
+import log_summary
+import monitor_utilization
+import parse_event_logs
+
+
+class MonitorUtilizationTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def __get_time_series(self, samples):
+    filename = path.join(self.directory, "continuous_monitor")
+    continuous_monitors.write_continuous_monitor(filename, samples)
+    return monitor_utilization.MonitorTimeSeries(continuous_monitor.parse(filename))
+
+  def test_integrals_of_step_function(self):
+    time_series = self.__get_time_series([(10000, 0, {"xvdb": 0, "xvdf": 0}),
+      (11000, 4, {"xvdb": 0.5, "xvdf": 0}), (12000, 2, {"xvdb": 1, "xvdf": 0.5}),
+      (13000, 8, {"xvdb": 0, "xvdf": 0})])
+    start_times, end_times = time_series.clip(
+      numpy.array([10500, 9000, 12500, 9000]), numpy.array([12500, 10000, 14000, 14000]))
+    self.assertEqual(start_times.tolist(), [10500, 10000, 12500, 10000])
+    self.assertEqual(end_times.tolist(), [12500, 10000, 13000, 13000])
+    for resource, expected_integrals in [
+        (monitor_utilization.CPU, [1000, 0, 500, 1750]),
+        (monitor_utilization.NETWORK_TRANSMITTED, [1000, 0, 500, 1750]),
+        (monitor_utilization.NETWORK_RECEIVED, [500, 0, 250, 875]),
+        (monitor_utilization.DISK, [875, 0, 0, 1000])]:
+      self.assertEqual(
+        time_series.get_integrals(resource, start_times, end_times).tolist(), expected_integrals)
+
+  def test_integrals_match_sum_over_steps(self):
+    rand = random.Random(0)
+    samples = continuous_monitors.get_random_samples(rand, 10000, 100000, ["xvdb"])
+    time_series = self.__get_time_series(samples)
+    start_times = numpy.array([rand.uniform(0, 110000) for _ in xrange(200)])
+    end_times = start_times + numpy.array([rand.uniform(0, 20000) for _ in xrange(200)])
+    start_times, end_times = time_series.clip(start_times, end_times)
+    integrals = time_series.get_integrals(monitor_utilization.CPU, start_times, end_times)
+    for start, end, integral in zip(start_times, end_times, integrals):
+      expected_integral = 0
+      for (previous_time, _, _), (time, cores_used, _) in zip(samples, samples[1:]):
+        overlap = min(time, end) - max(previous_time, start)
+        if overlap > 0:
+          expected_integral += overlap * cores_used / continuous_monitor.CORES
+      self.assertAlmostEqual(integral, expected_integral, places=6)
+      samples_in_window, durations = time_series.get_step_durations(start, end)
+      self.assertAlmostEqual(numpy.dot(
+        time_series.resource_to_values[monitor_utilization.CPU][samples_in_window], durations),
+        expected_integral, places=6)
+
+  def test_utilization_summary(self):
+    time_series = self.__get_time_series([(10000, 0, {}), (11000, 4, {}), (12000, 2, {}),
+      (13000, 8, {})])
+    summary = monitor_utilization.get_utilization_summary({"host0": time_series},
+      {"0": (10500, 12500), "1": (9000, 10000), "2": (10000, 13000)},
+      {"0": "host0", "1": "host0", "2": "host1"})
+    self.assertEqual(summary.total_millis, 2000)
+    self.assertEqual(summary.get_mean(monitor_utilization.CPU), 0.5)
+    self.assertEqual(summary.get_mean(monitor_utilization.DISK), 0)
+    # 0.25 for half of the time, 0.5 for a quarter, and 1 for a quarter.
+    self.assertEqual(summary.get_percentiles(monitor_utilization.CPU), [0.25, 0.5, 1])
+
+  def test_summary_without_overlapping_windows(self):
+    time_series = self.__get_time_series([(10000, 0, {}), (11000, 4, {})])
+    summary = monitor_utilization.get_utilization_summary(
+      {"host0": time_series}, {"0": (20000, 30000)}, {"0": "host0"})
+    self.assertTrue(math.isnan(summary.get_mean(monitor_utilization.CPU)))
+    self.assertEqual(summary.get_percentiles(monitor_utilization.CPU), [])
+
+  def test_analyzer_reads_monitors_and_summaries(self):
+    event_log = path.join(self.directory, "event_log")
+    event_logs.write_event_log(event_log, event_logs.SHARED_STAGE_EVENTS)
+    analyzer = parse_event_logs.Analyzer(event_log, use_cache=False)
+    rand = random.Random(1)
+    host_to_monitor_filename = {}
+    host_to_summary_filename = {}
+    for _, host in event_logs.EXECUTORS:
+      monitor_filename = path.join(self.directory, "{}_executor_monitor".format(host))
+      continuous_monitors.write_continuous_monitor(monitor_filename,
+        continuous_monitors.get_random_samples(rand, 99000, 160000, event_logs.DISK_NAMES))
+      host_to_monitor_filename[host] = monitor_filename
+      summary_filename = monitor_filename + log_summary.SUMMARY_SUFFIX
+      log_summary.write(log_summary.summarize(continuous_monitor_filename=monitor_filename,
+        max_monitor_points=None), summary_filename)
+      host_to_summary_filename[host] = summary_filename
+
+    outputs = []
+    for name, host_to_filename in [
+        ("monitors", host_to_monitor_filename), ("summaries", host_to_summary_filename)]:
+      prefix = path.join(self.directory, name)
+      analyzer.output_monitor_utilizations(prefix, host_to_filename)
+      with open("{}_stage_monitor_utilization".format(prefix)) as stage_output:
+        with open("{}_job_monitor_utilization".format(prefix)) as job_output:
+          outputs.append((stage_output.read(), job_output.read()))
+    self.assertEqual(outputs[1], outputs[0])
+    stage_lines = outputs[0][0].splitlines()
+    job_lines = outputs[0][1].splitlines()
+    self.assertEqual(len(stage_lines), 8 * len(monitor_utilization.RESOURCES))
+    self.assertEqual(len(job_lines), 5 * len(monitor_utilization.RESOURCES))
+    for line in stage_lines + job_lines:
+      # Windows that only overlap a few samples have fewer percentiles (see
+      # weighted_percentiles.get_weighted_percentiles).
+      values = [float(value) for value in line.split("\t")[2:]]
+      self.assertTrue(2 <= len(values) <= len(monitor_utilization.PERCENTILES) + 1)
+      self.assertTrue(0 <= values[0] <= 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,59 @@
+import os
+from os import path
+import shutil
+import tempfile
+import unittest
+
+import event_logs
+import parse_event_logs
+
+
+class AnalyzerTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.event_log = path.join(self.directory, "event_log")
+    event_logs.write_event_log(self.event_log, event_logs.SHARED_STAGE_EVENTS)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_sequential_parse_attributes_shared_stages(self):
+    analyzer = parse_event_logs.Analyzer(self.event_log, use_cache=False)
+    self.assertEqual(
+      {job_id: sorted(job.stages.keys()) for job_id, job in analyzer.jobs.iteritems()},
+      {0: [0, 1], 1: [2], 2: [3], 3: [3, 4], 4: [4, 5]})
+    self.assertIs(analyzer.jobs[2].stages[3], analyzer.jobs[3].stages[3])
+    self.assertEqual(analyzer.jobs[3].stages[4].num_tasks(), 40)
+    self.assertEqual(analyzer.jobs[4].stages[4].num_tasks(), 20)
+
+  def test_streaming_and_parallel_parses_match_sequential_parse(self):
+    expected_jobs = event_logs.describe_jobs(
+      parse_event_logs.Analyzer(self.event_log, use_cache=False))
+    self.assertEqual(event_logs.describe_jobs(
+      parse_event_logs.Analyzer(self.event_log, streaming=True, use_cache=False)), expected_jobs)
+    for num_processes in [2, 3, 5]:
+      self.assertEqual(event_logs.describe_jobs(parse_event_logs.Analyzer(
+        self.event_log, num_processes=num_processes, use_cache=False)), expected_jobs)
+
+  def test_parallel_parse_writes_same_reports(self):
+    sequential_prefix = path.join(self.directory, "sequential")
+    parallel_prefix = path.join(self.directory, "parallel")
+    for analyzer, prefix in [
+        (parse_event_logs.Analyzer(self.event_log, use_cache=False), sequential_prefix),
+        (parse_event_logs.Analyzer(self.event_log, num_processes=3, use_cache=False),
+          parallel_prefix)]:
+      analyzer.output_utilizations(prefix)
+      analyzer.output_load_balancing_badness(prefix)
+      analyzer.output_runtimes(prefix)
+      analyzer.output_ideal_time_metrics(prefix)
+    for filename in os.listdir(self.directory):
+      if filename.startswith("sequential_"):
+        suffix = filename[len("sequential"):]
+        with open(sequential_prefix + suffix) as sequential_output:
+          with open(parallel_prefix + suffix) as parallel_output:
+            self.assertEqual(parallel_output.read(), sequential_output.read(), suffix)
+
+
+if __name__ == "__main__":
+  unittest.main()
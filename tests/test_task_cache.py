@@ -0,0 +1,97 @@
+import os
+from os import path
+import shutil
+import tempfile
+import unittest
+
+import event_logs
+import parse_event_logs
+import task_cache
+
+
+class TaskCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.event_log = path.join(self.directory, "event_log")
+    event_logs.write_event_log(self.event_log, event_logs.SHARED_STAGE_EVENTS)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_loaded_stages_match_parsed_stages(self):
+    self.assertEqual(task_cache.get_status(self.event_log), task_cache.MISSING)
+    parsed_analyzer = parse_event_logs.Analyzer(self.event_log)
+    self.assertEqual(task_cache.get_status(self.event_log), task_cache.VALID)
+    self.assertIsNotNone(task_cache.load(self.event_log))
+
+    loaded_analyzer = parse_event_logs.Analyzer(self.event_log)
+    self.assertEqual(
+      event_logs.describe_jobs(loaded_analyzer), event_logs.describe_jobs(parsed_analyzer))
+    self.assertIs(loaded_analyzer.jobs[2].stages[3], loaded_analyzer.jobs[3].stages[3])
+    self.assertEqual(loaded_analyzer.jobs[3].stages[4].num_tasks(), 40)
+    self.assertEqual(loaded_analyzer.jobs[4].stages[4].num_tasks(), 20)
+    for stage_id, stage in loaded_analyzer.jobs[3].stages.iteritems():
+      parsed_tasks = parsed_analyzer.jobs[3].stages[stage_id].tasks
+      self.assertEqual([(task.executor_id, task.start_time, task.finish_time,
+          task.compute_monotask_millis, task.input_read_method, task.shuffle_mb_written)
+          for task in stage.tasks],
+        [(task.executor_id, task.start_time, task.finish_time, task.compute_monotask_millis,
+          task.input_read_method, task.shuffle_mb_written) for task in parsed_tasks])
+
+    parsed_prefix = path.join(self.directory, "parsed")
+    loaded_prefix = path.join(self.directory, "loaded")
+    for analyzer, prefix in [(parsed_analyzer, parsed_prefix), (loaded_analyzer, loaded_prefix)]:
+      analyzer.output_utilizations(prefix)
+      analyzer.output_runtimes(prefix)
+      analyzer.output_ideal_time_metrics(prefix, fix_executors=True)
+    for filename in os.listdir(self.directory):
+      if filename.startswith("parsed_"):
+        suffix = filename[len("parsed"):]
+        with open(parsed_prefix + suffix) as parsed_output:
+          with open(loaded_prefix + suffix) as loaded_output:
+            self.assertEqual(loaded_output.read(), parsed_output.read(), suffix)
+
+  def test_cache_without_tasks(self):
+    cache_writer = task_cache.TaskCacheWriter(self.event_log)
+    cache_writer.add_job_start(0, "job 0", [0, 1])
+    cache_writer.write([])
+    cache = task_cache.load(self.event_log)
+    self.assertEqual(cache.job_starts, [(0, "job 0", [0, 1])])
+    self.assertEqual(cache.get_stages(), [])
+
+  def test_changed_event_log_invalidates_cache(self):
+    parse_event_logs.Analyzer(self.event_log)
+    # Rewrite the log with the same events, but different task metrics.
+    event_logs.write_event_log(self.event_log, event_logs.SHARED_STAGE_EVENTS, seed=1)
+    self.assertEqual(task_cache.get_status(self.event_log), task_cache.STALE)
+    self.assertIsNone(task_cache.load(self.event_log))
+
+    # The stale cache is ignored, and replaced with one for the new log.
+    expected_jobs = event_logs.describe_jobs(
+      parse_event_logs.Analyzer(self.event_log, use_cache=False))
+    self.assertEqual(
+      event_logs.describe_jobs(parse_event_logs.Analyzer(self.event_log)), expected_jobs)
+    self.assertEqual(task_cache.get_status(self.event_log), task_cache.VALID)
+    self.assertEqual(
+      event_logs.describe_jobs(parse_event_logs.Analyzer(self.event_log)), expected_jobs)
+
+  def test_cache_from_other_version_is_stale(self):
+    parse_event_logs.Analyzer(self.event_log)
+    version = task_cache.VERSION
+    task_cache.VERSION = version + 1
+    try:
+      self.assertEqual(task_cache.get_status(self.event_log), task_cache.STALE)
+      self.assertIsNone(task_cache.load(self.event_log))
+    finally:
+      task_cache.VERSION = version
+
+  def test_other_file_is_stale(self):
+    with open(task_cache.get_cache_filename(self.event_log), "w") as cache_file:
+      cache_file.write("not a task cache\n")
+    self.assertEqual(task_cache.get_status(self.event_log), task_cache.STALE)
+    self.assertIsNone(task_cache.load(self.event_log))
+
+
+if __name__ == "__main__":
+  unittest.main()
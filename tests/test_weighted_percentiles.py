@@ -0,0 +1,154 @@
+import random
+import unittest
+
+import numpy
+
+import weighted_percentiles
+
+PERCENTILES = [0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def get_percentiles_by_scanning(values, weights, percentiles):
+  """ Returns the weighted percentiles of the given values by scanning the sorted (value, weight)
+  pairs, as the utilization summaries did before they were vectorized. """
+  pairs = sorted(zip(values, weights))
+  total_weight = sum(weight for _, weight in pairs)
+  cumulative_weight = 0
+  output = []
+  for value, weight in pairs:
+    cumulative_weight += weight
+    if float(cumulative_weight) / total_weight > percentiles[len(output)]:
+      output.append(value)
+      if len(output) >= len(percentiles):
+        break
+  return output
+
+
+class GetWeightedPercentilesTest(unittest.TestCase):
+
+  def test_matches_sorted_scan(self):
+    rand = random.Random(0)
+    for _ in xrange(500):
+      num_values = rand.randint(1, 30)
+      # Few distinct values and weights (including weights of 0), so that there are ties.
+      values = [rand.choice([0, 0.25, 0.5, 1, 2, rand.random()]) for _ in xrange(num_values)]
+      weights = [rand.choice([0, 1, 2, 5, rand.randint(1, 1000)]) for _ in xrange(num_values)]
+      if sum(weights) == 0:
+        weights[0] = 1
+      percentile_values, weighted_mean = weighted_percentiles.get_weighted_percentiles(
+        numpy.array(values), numpy.array(weights), PERCENTILES)
+      self.assertEqual(
+        percentile_values, get_percentiles_by_scanning(values, weights, PERCENTILES))
+      self.assertAlmostEqual(weighted_mean, numpy.average(values, weights=weights))
+
+  def test_value_with_large_weight_is_reported_once(self):
+    self.assertEqual(
+      weighted_percentiles.get_weighted_percentiles([1, 2, 3], [100, 1, 1], PERCENTILES)[0],
+      [1, 2, 3])
+
+
+class WeightedValuesTest(unittest.TestCase):
+
+  def setUp(self):
+    rand = random.Random(1)
+    self.value_arrays = [numpy.array([rand.expovariate(1) for _ in xrange(num_values)])
+      for num_values in [7, 1, 20]]
+    self.weight_arrays = [numpy.array([rand.randint(1, 100) for _ in xrange(len(values))])
+      for values in self.value_arrays]
+    self.values = numpy.concatenate(self.value_arrays)
+    self.weights = numpy.concatenate(self.weight_arrays)
+
+  def __get_merged_values(self):
+    merged_values = weighted_percentiles.WeightedValues().new_empty()
+    for values, weights in zip(self.value_arrays, self.weight_arrays):
+      merged_values.merge(weighted_percentiles.WeightedValues(values, weights))
+    return merged_values
+
+  def test_matches_numpy(self):
+    merged_values = self.__get_merged_values()
+    self.assertEqual(len(merged_values), len(self.values))
+    self.assertEqual(merged_values.get_percentiles(PERCENTILES),
+      numpy.percentile(self.values, [100 * p for p in PERCENTILES]).tolist())
+    percentile_values, weighted_mean = merged_values.get_weighted_percentiles(PERCENTILES)
+    self.assertEqual(percentile_values, get_percentiles_by_scanning(
+      self.values.tolist(), self.weights.tolist(), PERCENTILES))
+    self.assertAlmostEqual(weighted_mean, numpy.average(self.values, weights=self.weights))
+    self.assertEqual(merged_values.get_min(), self.values.min())
+    self.assertEqual(merged_values.get_max(), self.values.max())
+    self.assertEqual(merged_values.get_cdf(), list(enumerate(sorted(self.values.tolist()))))
+
+
+class WeightedHistogramTest(unittest.TestCase):
+
+  def setUp(self):
+    rand = random.Random(2)
+    self.values = [rand.lognormvariate(0, 2) * rand.choice([1, 1, 1, -1]) for _ in xrange(5000)]
+    self.values[:10] = [0] * 10
+    self.weights = [rand.randint(1, 1000) for _ in self.values]
+    self.exact_values = weighted_percentiles.WeightedValues(
+      numpy.array(self.values), numpy.array(self.weights, dtype=numpy.float64))
+
+  def __get_histogram(self, max_exact_values, start=0, end=None):
+    histogram = weighted_percentiles.WeightedHistogram(max_exact_values=max_exact_values)
+    for value, weight in zip(self.values[start:end], self.weights[start:end]):
+      histogram.add(value, weight)
+    return histogram
+
+  def __check_exact(self, histogram):
+    self.assertEqual(len(histogram), len(self.values))
+    self.assertEqual(histogram.get_weighted_percentiles(PERCENTILES),
+      self.exact_values.get_weighted_percentiles(PERCENTILES))
+    self.assertEqual(
+      histogram.get_percentiles(PERCENTILES), self.exact_values.get_percentiles(PERCENTILES))
+    self.assertEqual(histogram.get_min(), self.exact_values.get_min())
+    self.assertEqual(histogram.get_max(), self.exact_values.get_max())
+    self.assertEqual(histogram.get_cdf(), self.exact_values.get_cdf())
+
+  def __check_approximate(self, histogram):
+    self.assertEqual(len(histogram), len(self.values))
+    percentile_values, weighted_mean = histogram.get_weighted_percentiles(PERCENTILES)
+    exact_percentile_values, exact_weighted_mean = self.exact_values.get_weighted_percentiles(
+      PERCENTILES)
+    self.assertEqual(len(percentile_values), len(exact_percentile_values))
+    for value, exact_value in zip(percentile_values, exact_percentile_values):
+      self.assertLessEqual(abs(value - exact_value),
+        weighted_percentiles.DEFAULT_RELATIVE_ACCURACY * abs(exact_value) + 1e-12)
+    self.assertAlmostEqual(weighted_mean, exact_weighted_mean)
+    self.assertEqual(histogram.get_min(), min(self.values))
+    self.assertEqual(histogram.get_max(), max(self.values))
+    self.assertLess(len(histogram.get_cdf()), len(self.values) / 2)
+
+  def test_small_histogram_is_exact(self):
+    self.__check_exact(self.__get_histogram(max_exact_values=len(self.values)))
+
+  def test_large_histogram_is_within_relative_accuracy(self):
+    self.__check_approximate(self.__get_histogram(max_exact_values=100))
+
+  def test_merging_exact_histograms_is_exact(self):
+    merged_histogram = weighted_percentiles.WeightedHistogram().new_empty()
+    for start in xrange(0, len(self.values), 1000):
+      merged_histogram.merge(self.__get_histogram(max_exact_values=1000, start=start,
+        end=start + 1000))
+    self.__check_exact(merged_histogram)
+
+  def test_merging_approximate_histogram_is_approximate(self):
+    merged_histogram = weighted_percentiles.WeightedHistogram().new_empty()
+    merged_histogram.merge(self.__get_histogram(max_exact_values=None, end=1000))
+    merged_histogram.merge(self.__get_histogram(max_exact_values=100, start=1000))
+    self.__check_approximate(merged_histogram)
+
+  def test_merging_other_relative_accuracy_fails(self):
+    histogram = weighted_percentiles.WeightedHistogram()
+    self.assertRaises(ValueError, histogram.merge,
+      weighted_percentiles.WeightedHistogram(relative_accuracy=0.05))
+
+  def test_empty_histogram(self):
+    histogram = weighted_percentiles.WeightedHistogram()
+    self.assertEqual(len(histogram), 0)
+    self.assertEqual(histogram.get_percentiles(PERCENTILES), [])
+    self.assertIsNone(histogram.get_min())
+    self.assertEqual(histogram.get_cdf(), [])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,15 +1,20 @@
 """
 This file contains helper functions used by many of the experiment scripts.
+
+Many scripts import this file only for its ssh and formatting helpers, so NumPy and the plotting
+modules are imported by the functions that use them, rather than when this file is imported.
 """
 
-import numpy
+import collections
+import multiprocessing
 from optparse import OptionParser
 import os
 from os import path
 import subprocess
 import sys
+import traceback
 
-import plot_continuous_monitor
+import log_collector
 
 def create_gnuplot_file_from_base(base_filename, new_filename, keyword_to_value):
   """ Creates a new gnuplot file based on the given base file.
@@ -38,28 +43,27 @@ def ssh_get_stdout(host, identity_file, username, command):
   return subprocess.Popen(ssh_command, stdout=subprocess.PIPE, shell=True).communicate()[0]
 
 def copy_latest_zipped_logs(driver_hostname, identity_file, output_prefix, num_experiments,
-                            username):
-  list_filenames_command = "ls -t /mnt/experiment_log_*gz | head -n " + num_experiments
-  event_log_filenames = ssh_get_stdout(
-    driver_hostname,
-    identity_file,
-    username,
-    list_filenames_command).strip("\n").strip("\r")
-  print "Copying data from directories: " + event_log_filenames
-
-  for event_log_filename in event_log_filenames.split("\n"):
-    event_log_filename = event_log_filename.strip("\r")
-    basename = os.path.basename(event_log_filename)
-    local_zipped_logs_name = os.path.join(output_prefix, basename)
-    print ("Copying event log from file %s back to %s" %
-      (event_log_filename, local_zipped_logs_name))
-    scp_from(
-      driver_hostname,
-      identity_file,
-      username,
-      event_log_filename,
-      local_zipped_logs_name)
+                            username, extract=True):
+  """ Copies the latest num_experiments log bundles from the driver to output_prefix, and
+  extracts them (unless extract is false; the logs in a bundle can also be read without extracting
+  it, using paths inside the bundle, as described in log_files).
 
+  Bundles that were already copied (and haven't changed since) are skipped, and bundles that were
+  partially copied are resumed; see log_collector.LogCollector.sync_files. Raises an exception
+  (without extracting any of the bundles) if any of the bundles couldn't be copied.
+  """
+  # The bundles are copied at once, over one SSH connection.
+  collector = log_collector.LogCollector(identity_file, username)
+  try:
+    list_filenames_command = "ls -t /mnt/experiment_log_*gz | head -n " + num_experiments
+    local_zipped_logs_names = collector.sync_files(
+      driver_hostname, list_filenames_command, output_prefix)
+  finally:
+    collector.close()
+  if not extract:
+    return
+
+  for local_zipped_logs_name in local_zipped_logs_names:
     # Unzip the file.
     subprocess.check_call(
       "tar -xvzf %s -C %s" % (local_zipped_logs_name, output_prefix),
@@ -97,15 +101,91 @@ def copy_latest_continuous_monitor(hostname, identity_file, filename_prefix, use
     local_continuous_monitor_file)
 
   print "Plotting continuous monitor"
+  import plot_continuous_monitor
   plot_continuous_monitor.plot_continuous_monitor(local_continuous_monitor_file, open_graphs=True)
   return local_continuous_monitor_file
 
-def plot_continuous_monitors(log_dir):
-  """ Plots all of the continuous monitors in the provided directory. """
-  for log_filename in os.listdir(log_dir):
-    if log_filename.endswith("executor_monitor"):
-      plot_continuous_monitor.plot_continuous_monitor(
-        path.join(log_dir, log_filename), use_gnuplot=True)
+def plot_continuous_monitors(log_dir, num_processes=1):
+  """ Plots all of the continuous monitors in the provided directory, as well as the combined
+  utilization of all of the executors. """
+  return plot_continuous_monitors_in_dirs([log_dir], num_processes)
+
+def plot_continuous_monitors_in_dirs(log_dirs, num_processes=None, max_in_flight=None):
+  """ Plots all of the continuous monitors in each of the provided directories, as well as the
+  combined utilization of the executors in each directory.
+
+  The plots are made by a pool of num_processes worker processes (by default, one per core), and at
+  most max_in_flight plots (by default, twice the number of processes) are waiting for or being
+  plotted by a worker at once. A plot that fails doesn't stop the remaining plots; instead, a
+  summary of all of the failures is printed at the end. Returns a list of (plot description, error)
+  tuples describing the failures.
+  """
+  import plot_continuous_monitor
+  plots = []
+  for log_dir in log_dirs:
+    monitor_filenames = sorted([path.join(log_dir, log_filename)
+      for log_filename in os.listdir(log_dir) if log_filename.endswith("executor_monitor")])
+    for monitor_filename in monitor_filenames:
+      plots.append((monitor_filename, plot_continuous_monitor.plot_continuous_monitor,
+        (monitor_filename, False, True)))
+    if monitor_filenames:
+      cluster_filename = path.join(log_dir, "cluster_utilization")
+      plots.append((cluster_filename, plot_cluster_monitor, (monitor_filenames, cluster_filename)))
+
+  if num_processes is None:
+    num_processes = multiprocessing.cpu_count()
+  failures = []
+  if num_processes == 1:
+    for description, function, args in plots:
+      error = __run_plot(function, args)
+      if error is not None:
+        failures.append((description, error))
+  else:
+    if max_in_flight is None:
+      max_in_flight = 2 * num_processes
+    pool = multiprocessing.Pool(num_processes)
+    try:
+      in_flight = collections.deque()
+      for description, function, args in plots:
+        if len(in_flight) >= max_in_flight:
+          __wait_for_plot(in_flight, failures)
+        in_flight.append((description, pool.apply_async(__run_plot, (function, args))))
+      while in_flight:
+        __wait_for_plot(in_flight, failures)
+      pool.close()
+    except:
+      pool.terminate()
+      raise
+    finally:
+      pool.join()
+
+  if failures:
+    print "{} of {} continuous monitor plots failed:".format(len(failures), len(plots))
+    for description, error in failures:
+      print "  {}: {}".format(description, error.strip().split("\n")[-1])
+  return failures
+
+def __wait_for_plot(in_flight, failures):
+  """ Waits for the oldest plot in in_flight to finish, and records it in failures if it failed. """
+  description, result = in_flight.popleft()
+  error = result.get()
+  if error is not None:
+    failures.append((description, error))
+
+def __run_plot(function, args):
+  """ Calls function with args, and returns the traceback if it raised an exception. """
+  try:
+    function(*args)
+    return None
+  except Exception:
+    return traceback.format_exc()
+
+def plot_cluster_monitor(monitor_filenames, out_filename, open_graphs=False):
+  """ Plots the combined utilization of the executors with the given continuous monitors. """
+  import cluster_monitor
+  import plot_gnuplot
+  column_names = cluster_monitor.write_cluster_monitor(sorted(monitor_filenames), out_filename)
+  plot_gnuplot.plot_cluster_utilization(out_filename, column_names, open_graphs)
 
 def find_index_of_shuffles(jobs):
   """ Returns the ids in jobs of jobs that do a shuffle.
@@ -128,6 +208,7 @@ def get_min_med_max_string(runtimes_list):
   value in the returned string will be in seconds). This function is useful for
   writing data to plot.
   """
+  import numpy
   return "{} {} {}".format(
       min(runtimes_list) / 1000.,
       numpy.percentile(runtimes_list, 50) / 1000.,
@@ -0,0 +1,327 @@
+"""
+This file contains utilities to summarize the distribution of a set of values that each have a
+weight (e.g., the utilization while each task was running, weighted by the task's runtime).
+
+WeightedValues keeps every value, so its percentiles are exact, and WeightedHistogram keeps a
+bounded number of buckets once it has more than a few thousand values, so its percentiles are
+approximate for large sets of values; both have the same methods, and can be merged with others of
+the same kind.
+"""
+
+import array
+import math
+
+import numpy
+
+# Default relative accuracy of the percentiles reported by a WeightedHistogram.
+DEFAULT_RELATIVE_ACCURACY = 0.01
+# Number of values that a WeightedHistogram collects before adding them to its buckets.
+BUFFER_SIZE = 1024
+# Default number of values that a WeightedHistogram keeps (so that its percentiles are exact) before
+# it starts adding values to its buckets.
+DEFAULT_MAX_EXACT_VALUES = 10000
+
+
+def get_weighted_percentiles(values, weights, percentiles):
+  """ Returns a (percentile values, weighted mean) tuple describing the given values.
+
+  values and weights should be equal-length sequences (preferably NumPy arrays), and percentiles
+  should be an increasing list of fractions between 0 and 1. The values are sorted (by value, and
+  then by weight), and the value reported for each percentile is the first one at which the
+  cumulative fraction of the total weight exceeds the percentile. Each value is reported for at
+  most one percentile: when a single value's weight spans several percentiles, the later
+  percentiles are reported using the following values, and any percentiles left over when the
+  values run out are omitted from the returned list.
+  """
+  values = numpy.asarray(values, dtype=numpy.float64)
+  weights = numpy.asarray(weights)
+  order = __get_sort_order(values, weights)
+  sorted_values = values[order]
+  sorted_weights = weights[order]
+
+  cumulative_weights = numpy.cumsum(sorted_weights)
+  cumulative_fractions = cumulative_weights / float(cumulative_weights[-1])
+  # Index of the first value where the cumulative fraction of the weight exceeds each percentile.
+  first_indices = numpy.searchsorted(cumulative_fractions, percentiles, side="right").tolist()
+  indices = []
+  for index in first_indices:
+    if indices:
+      index = max(index, indices[-1] + 1)
+    if index >= len(sorted_values):
+      break
+    indices.append(index)
+
+  weighted_mean = numpy.average(sorted_values, weights=sorted_weights)
+  return (sorted_values[indices].tolist(), weighted_mean)
+
+
+def __get_sort_order(values, weights):
+  """ Returns the indices that sort the given arrays by value, and then by weight.
+
+  This is equivalent to numpy.lexsort((weights, values)), but much faster when most values are
+  distinct (as is typical for utilizations), because only the runs of equal values are sorted by
+  weight.
+  """
+  order = numpy.argsort(values)
+  sorted_values = values[order]
+  equal_to_next = sorted_values[1:] == sorted_values[:-1]
+  tied = numpy.zeros(len(values), dtype=numpy.bool_)
+  tied[1:] |= equal_to_next
+  tied[:-1] |= equal_to_next
+  tied_positions = numpy.flatnonzero(tied)
+  if len(tied_positions) > 0:
+    tied_indices = order[tied_positions]
+    order[tied_positions] = tied_indices[
+      numpy.lexsort((weights[tied_indices], values[tied_indices]))]
+  return order
+
+
+class WeightedValues(object):
+  """ A set of weighted values, which are all kept so that their percentiles are exact.
+
+  This is the exact counterpart of WeightedHistogram, with the same methods, for callers (like
+  stage.Stage) that already store every value.
+  """
+
+  def __init__(self, values=None, weights=None):
+    """ values and weights should be NumPy arrays; weights is None for values that aren't weighted
+    (see get_percentiles()). """
+    self.__values = []
+    self.__weights = []
+    if values is not None:
+      self.__values.append(values)
+      self.__weights.append(weights)
+
+  def __len__(self):
+    return sum(len(values) for values in self.__values)
+
+  def merge(self, other):
+    self.__values.extend(other.__values)
+    self.__weights.extend(other.__weights)
+
+  def new_empty(self):
+    """ Returns an empty WeightedValues, to merge others into. """
+    return WeightedValues()
+
+  def __get_values(self):
+    return numpy.concatenate([numpy.zeros(0)] + self.__values)
+
+  def get_weighted_percentiles(self, percentiles):
+    """ Returns the (percentile values, weighted mean) tuple described in get_weighted_percentiles.
+    """
+    return get_weighted_percentiles(self.__get_values(), numpy.concatenate(self.__weights),
+      percentiles)
+
+  def get_percentiles(self, percentiles):
+    """ Returns the given percentiles (fractions between 0 and 1) of the values, ignoring their
+    weights, interpolated in the same way as numpy.percentile. """
+    return numpy.percentile(self.__get_values(), [100 * p for p in percentiles]).tolist()
+
+  def get_min(self):
+    return min(values.min() for values in self.__values if len(values) > 0)
+
+  def get_max(self):
+    return max(values.max() for values in self.__values if len(values) > 0)
+
+  def get_cdf(self):
+    """ Returns a list of (rank, value) pairs with each value and its position in the sorted values.
+    """
+    return list(enumerate(sorted(self.__get_values().tolist())))
+
+
+class WeightedHistogram(object):
+  """ A summary of the distribution of a set of weighted values, which uses a bounded amount of
+  memory no matter how many values are added, and can be merged with other histograms.
+
+  Until it has more than max_exact_values values, the histogram keeps every value, and reports the
+  same (exact) results as a WeightedValues with the same values. After that, values are added to
+  logarithmically sized buckets, so that each percentile is reported as a value within
+  relative_accuracy of the value that get_weighted_percentiles would report. The minimum, maximum,
+  and weighted mean are always exact. With a relative accuracy of 1%, values between 0.001 and
+  10^12 use at most about 1,700 buckets.
+  """
+
+  def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+      max_exact_values=DEFAULT_MAX_EXACT_VALUES):
+    """ If max_exact_values is None, every value is kept (unless a histogram that has buckets is
+    merged into this one). """
+    self.relative_accuracy = relative_accuracy
+    self.max_exact_values = max_exact_values
+    self.__gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    self.__log_gamma = math.log(self.__gamma)
+    # Whether the histogram still has every value (in the buffer), rather than buckets.
+    self.__is_exact = True
+    # Total weight of the values in each bucket. Bucket i has the values in
+    # (gamma ** (i - 1), gamma ** i]; negative values are bucketed by their absolute value.
+    self.__bucket_to_weight = {}
+    self.__negative_bucket_to_weight = {}
+    self.__zero_weight = 0
+    self.__num_values = 0
+    self.__total_weight = 0
+    self.__weighted_sum = 0
+    self.__min = None
+    self.__max = None
+    # Values (and their weights) that haven't been added to the buckets yet: every value, while the
+    # histogram is exact, and otherwise up to BUFFER_SIZE values, which are added to the buckets
+    # together (which is much faster than adding each one).
+    self.__buffered_values = array.array("d")
+    self.__buffered_weights = array.array("d")
+
+  def __len__(self):
+    return self.__num_values + len(self.__buffered_values)
+
+  def add(self, value, weight=1):
+    self.__buffered_values.append(value)
+    self.__buffered_weights.append(weight)
+    self.__add_buffered_values_if_full()
+
+  def __add_buffered_values_if_full(self):
+    if self.__is_exact:
+      if (self.max_exact_values is not None and
+          len(self.__buffered_values) > self.max_exact_values):
+        self.__is_exact = False
+        self.__add_buffered_values()
+    elif len(self.__buffered_values) >= BUFFER_SIZE:
+      self.__add_buffered_values()
+
+  def __add_buffered_values(self):
+    if not self.__buffered_values:
+      return
+    values = numpy.frombuffer(self.__buffered_values, dtype=numpy.float64)
+    weights = numpy.frombuffer(self.__buffered_weights, dtype=numpy.float64)
+    self.__num_values += len(values)
+    self.__update_min_max(values.min(), values.max())
+    # Values with no weight don't affect the percentiles or the weighted mean.
+    values = values[weights != 0]
+    weights = weights[weights != 0]
+    self.__total_weight += weights.sum()
+    self.__weighted_sum += numpy.dot(values, weights)
+    self.__zero_weight += weights[values == 0].sum()
+    for bucket_to_weight, sign in [
+        (self.__bucket_to_weight, 1), (self.__negative_bucket_to_weight, -1)]:
+      in_buckets = sign * values > 0
+      buckets = numpy.ceil(
+        numpy.log(sign * values[in_buckets]) / self.__log_gamma).astype(numpy.int64)
+      unique_buckets, bucket_indices = numpy.unique(buckets, return_inverse=True)
+      bucket_weights = numpy.bincount(bucket_indices, weights=weights[in_buckets])
+      for bucket, weight in zip(unique_buckets.tolist(), bucket_weights.tolist()):
+        bucket_to_weight[bucket] = bucket_to_weight.get(bucket, 0) + weight
+    # The arrays above are views of the buffers, so new buffers are created rather than clearing
+    # these ones.
+    self.__buffered_values = array.array("d")
+    self.__buffered_weights = array.array("d")
+
+  def __update_min_max(self, min_value, max_value):
+    if min_value is not None and (self.__min is None or min_value < self.__min):
+      self.__min = min_value
+    if max_value is not None and (self.__max is None or max_value > self.__max):
+      self.__max = max_value
+
+  def merge(self, other):
+    """ Adds the values in other, which must have the same relative accuracy. The result is only
+    exact if both histograms are exact, and they have at most max_exact_values values in total. """
+    if other.relative_accuracy != self.relative_accuracy:
+      raise ValueError("Can't merge histograms with relative accuracies {} and {}".format(
+        self.relative_accuracy, other.relative_accuracy))
+    if self.__is_exact and not other.__is_exact:
+      self.__is_exact = False
+      self.__add_buffered_values()
+    self.__buffered_values.extend(other.__buffered_values)
+    self.__buffered_weights.extend(other.__buffered_weights)
+    self.__add_buffered_values_if_full()
+    for bucket_to_weight, other_bucket_to_weight in [
+        (self.__bucket_to_weight, other.__bucket_to_weight),
+        (self.__negative_bucket_to_weight, other.__negative_bucket_to_weight)]:
+      for bucket, weight in other_bucket_to_weight.iteritems():
+        bucket_to_weight[bucket] = bucket_to_weight.get(bucket, 0) + weight
+    self.__zero_weight += other.__zero_weight
+    self.__num_values += other.__num_values
+    self.__total_weight += other.__total_weight
+    self.__weighted_sum += other.__weighted_sum
+    self.__update_min_max(other.__min, other.__max)
+
+  def new_empty(self):
+    """ Returns an empty histogram with the same relative accuracy, to merge others into.
+
+    The new histogram keeps every value for as long as the histograms merged into it do (which
+    already keep those values), so, e.g., combining the histograms of many small stages gives
+    exact results.
+    """
+    return WeightedHistogram(self.relative_accuracy, max_exact_values=None)
+
+  def __get_exact_values(self):
+    """ Returns a WeightedValues with every value, or None if the histogram isn't exact (or is
+    empty). """
+    if not self.__is_exact or not self.__buffered_values:
+      return None
+    return WeightedValues(numpy.frombuffer(self.__buffered_values, dtype=numpy.float64),
+      numpy.frombuffer(self.__buffered_weights, dtype=numpy.float64))
+
+  def __get_buckets(self):
+    """ Returns a list of (value, weight) pairs describing the buckets in increasing order of value,
+    where each bucket's value is the one with the smallest relative error for its values (clipped
+    to the minimum and maximum value). """
+    self.__add_buffered_values()
+    buckets = [(-2 * self.__gamma ** bucket / (self.__gamma + 1), weight)
+      for bucket, weight in sorted(self.__negative_bucket_to_weight.iteritems(), reverse=True)]
+    if self.__zero_weight > 0:
+      buckets.append((0, self.__zero_weight))
+    buckets.extend([(2 * self.__gamma ** bucket / (self.__gamma + 1), weight)
+      for bucket, weight in sorted(self.__bucket_to_weight.iteritems())])
+    return [(min(max(value, self.__min), self.__max), weight) for value, weight in buckets]
+
+  def get_weighted_percentiles(self, percentiles):
+    """ Returns a (percentile values, weighted mean) tuple like get_weighted_percentiles. If the
+    histogram isn't exact, each percentile's value is approximate (and a value can be reported for
+    more than one percentile). """
+    exact_values = self.__get_exact_values()
+    if exact_values is not None:
+      return exact_values.get_weighted_percentiles(percentiles)
+    buckets = self.__get_buckets()
+    if not buckets:
+      return ([], float("nan"))
+    values = [value for value, _ in buckets]
+    cumulative_fractions = numpy.cumsum([weight for _, weight in buckets]) / float(
+      self.__total_weight)
+    # The first bucket where the cumulative fraction of the weight exceeds each percentile.
+    indices = numpy.minimum(numpy.searchsorted(cumulative_fractions, percentiles, side="right"),
+      len(values) - 1)
+    return ([values[index] for index in indices.tolist()],
+      numpy.float64(self.__weighted_sum) / self.__total_weight)
+
+  def get_percentiles(self, percentiles):
+    """ Returns the given percentiles of the values. If the histogram is exact, the values' weights
+    are ignored, like WeightedValues.get_percentiles; otherwise, the percentiles are approximate,
+    and weighted by the values' weights (which are usually all 1 for histograms that use this). """
+    exact_values = self.__get_exact_values()
+    if exact_values is not None:
+      return exact_values.get_percentiles(percentiles)
+    return self.get_weighted_percentiles(percentiles)[0]
+
+  def get_min(self):
+    exact_values = self.__get_exact_values()
+    if exact_values is not None:
+      return exact_values.get_min()
+    self.__add_buffered_values()
+    return self.__min
+
+  def get_max(self):
+    exact_values = self.__get_exact_values()
+    if exact_values is not None:
+      return exact_values.get_max()
+    self.__add_buffered_values()
+    return self.__max
+
+  def get_cdf(self):
+    """ Returns a list of (rank, value) pairs like WeightedValues.get_cdf if the histogram is exact,
+    and otherwise with the value of each bucket and the position in the sorted values of the last
+    value in the bucket (assuming each value has a weight of 1). """
+    exact_values = self.__get_exact_values()
+    if exact_values is not None:
+      return exact_values.get_cdf()
+    cdf = []
+    cumulative_weight = 0
+    for value, weight in self.__get_buckets():
+      cumulative_weight += weight
+      cdf.append((int(cumulative_weight) - 1, value))
+    return cdf